@@ -0,0 +1,13 @@
+from .synthetic import make_dataset,SDFWriter,SIZES
+from .sdf_helper_standin import getdata,install
+
+
+# from your_package import *
+
+__all__ = [
+    "make_dataset",
+    "SDFWriter",
+    "SIZES",
+    "getdata",
+    "install"
+]
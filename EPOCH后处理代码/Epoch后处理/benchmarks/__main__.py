@@ -0,0 +1,57 @@
+import argparse
+
+from .sdf_helper_standin import install
+from .synthetic import SIZES
+
+
+def main(argv=None):
+    """
+    命令行入口:
+        python -m benchmarks run --sizes small medium --output bench-$(git rev-parse --short HEAD).json
+        python -m benchmarks compare bench-old.json bench-new.json --threshold 1.2
+        python -m benchmarks generate /tmp/epoch_synth --size large --n-dumps 5
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="EPOCH 后处理代码的基准测试")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="在合成数据上运行基准测试")
+    p_run.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=list(SIZES))
+    p_run.add_argument("--backends", nargs="+", default=["lazy", "sdf_helper"], choices=["lazy", "sdf_helper"])
+    p_run.add_argument("--repeat", type=int, default=3, help="每个测试计时的次数")
+    p_run.add_argument("--select", nargs="+", default=None, help="只运行名称包含这些字符串的测试")
+    p_run.add_argument("--data-dir", default=None, help="合成数据目录（默认 ~/.cache/epoch_bench）")
+    p_run.add_argument("--n-dumps", type=int, default=3, help="density 与 field 输出的个数")
+    p_run.add_argument("--seed", type=int, default=0)
+    p_run.add_argument("--output", default=None, help="JSON 结果文件")
+
+    p_cmp = sub.add_parser("compare", help="比较两次运行的 JSON 结果")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--threshold", type=float, default=1.2, help="时间或峰值内存之比超过此值视为退化")
+
+    p_gen = sub.add_parser("generate", help="只生成合成数据")
+    p_gen.add_argument("out_dir")
+    p_gen.add_argument("--size", default="small", choices=list(SIZES))
+    p_gen.add_argument("--kinds", nargs="+", default=["density", "field", "distfun", "idall"])
+    p_gen.add_argument("--n-dumps", type=int, default=1)
+    p_gen.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        from .synthetic import make_dataset
+        ds = make_dataset(args.out_dir, args.size, tuple(args.kinds), args.n_dumps, args.seed)
+        print(f"已生成 {args.size} 数据（网格 {ds['shape']}，粒子 {ds['n_particles']}）：{args.out_dir}")
+        return 0
+
+    from .suite import run_benchmarks, compare_reports
+    if args.command == "run":
+        install()
+        run_benchmarks(args.sizes, tuple(args.backends), args.data_dir, args.repeat, args.select,
+                       args.n_dumps, args.seed, args.output)
+        return 0
+    rows = compare_reports(args.base, args.new, args.threshold)
+    return 1 if any(r["regression"] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,435 @@
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import subprocess
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from .sdf_helper_standin import install
+from .synthetic import make_dataset
+
+from data_loading import (sdf_cache, result_cache, peak_memory, load_xyz_grid, load_ne, load_ek, load_ne_energy,
+                          load_efields, load_bfields, load_pm, load_ppos, load_region, load_ne_region,
+                          load_ek_region, iter_particles, particle_table, extract_probes, DumpSeries, LazySDF,
+                          ScaledArray)
+from spectrum import load_spectrum
+
+# data_loading 导出的 sdf_cache 是缓存实例，切换后端需要修改模块中的 SDF_BACKEND
+_sdf_cache_module = importlib.import_module("data_loading.sdf_cache")
+
+DEFAULT_SIZES = ("small", "medium")
+BACKENDS = ("lazy", "sdf_helper")
+X_WINDOW = (18.0, 22.0)
+CORE = (-2.0, 2.0)
+
+Benchmark = namedtuple("Benchmark", ["name", "group", "per_backend", "setup"])
+BENCHMARKS = []
+
+
+def benchmark(name, group, per_backend=None):
+    """
+    注册一个基准测试。被装饰的函数接收数据集 dict，完成不计时的准备工作后返回被计时的无参函数。
+    per_backend 为 True 的测试按每个 SDF 后端分别运行，且每次调用前清空 sdf_cache；
+    默认 data_loading 与 spectrum 的测试为 True，utils_3d 的测试（输入已在准备阶段读入内存）为 False。
+    """
+    def register(setup):
+        BENCHMARKS.append(Benchmark(name, group, group != "utils_3d" if per_backend is None else per_backend,
+                                    setup))
+        return setup
+    return register
+
+
+def _consume(result):
+    """读取返回的全部数组（lazy 后端下的内存映射只有被访问时才从磁盘读取）"""
+    if isinstance(result, (np.ndarray, ScaledArray)):
+        return float(np.sum(result))
+    if isinstance(result, (tuple, list)):
+        return sum(_consume(r) for r in result)
+    if isinstance(result, dict):
+        return sum(_consume(r) for r in result.values())
+    return 0.0
+
+
+def _plot(func, *args, **kwargs):
+    """在新图上调用绘图函数并完成渲染，计时包含 matplotlib 的绘制"""
+    fig, ax = plt.subplots(figsize=(6, 5), dpi=100)
+    try:
+        func(*args, ax=ax, **kwargs)
+        fig.canvas.draw()
+    finally:
+        plt.close(fig)
+
+
+# ---------------------------------------------------------------- data_loading
+
+@benchmark("open_sdf", "data_loading")
+def _bench_open_sdf(ds):
+    return lambda: sdf_cache.get(ds["density"][0])
+
+
+@benchmark("LazySDF.parse", "data_loading", per_backend=False)
+def _bench_lazysdf_parse(ds):
+    return lambda: LazySDF(ds["density"][0])
+
+
+@benchmark("load_xyz_grid", "data_loading")
+def _bench_load_xyz_grid(ds):
+    return lambda: load_xyz_grid(ds["density"][0])
+
+
+@benchmark("load_ne", "data_loading")
+def _bench_load_ne(ds):
+    return lambda: load_ne(ds["density"][0])
+
+
+@benchmark("load_ne[float32]", "data_loading")
+def _bench_load_ne_float32(ds):
+    return lambda: load_ne(ds["density"][0], dtype=np.float32)
+
+
+@benchmark("load_ek", "data_loading")
+def _bench_load_ek(ds):
+    return lambda: _consume(load_ek(ds["density"][0]))
+
+
+@benchmark("load_ne_energy", "data_loading")
+def _bench_load_ne_energy(ds):
+    return lambda: load_ne_energy(ds["density"][0])
+
+
+@benchmark("load_efields", "data_loading")
+def _bench_load_efields(ds):
+    return lambda: _consume(load_efields(ds["field"][0]))
+
+
+@benchmark("load_bfields", "data_loading")
+def _bench_load_bfields(ds):
+    return lambda: _consume(load_bfields(ds["field"][0]))
+
+
+@benchmark("load_region", "data_loading")
+def _bench_load_region(ds):
+    return lambda: load_region(ds["density"][0], "Derived_Number_Density_Photon", X_WINDOW, CORE, CORE)
+
+
+@benchmark("load_ne_region", "data_loading")
+def _bench_load_ne_region(ds):
+    return lambda: load_ne_region(ds["density"][0], "Photon", X_WINDOW, CORE, CORE)
+
+
+@benchmark("load_ek_region", "data_loading")
+def _bench_load_ek_region(ds):
+    return lambda: load_ek_region(ds["density"][0], "Photon", X_WINDOW, CORE, CORE)
+
+
+@benchmark("load_pm", "data_loading")
+def _bench_load_pm(ds):
+    return lambda: _consume(load_pm(ds["idall"][0], "Photon"))
+
+
+@benchmark("load_ppos", "data_loading")
+def _bench_load_ppos(ds):
+    return lambda: _consume(load_ppos(ds["idall"][0], "Photon"))
+
+
+@benchmark("iter_particles", "data_loading")
+def _bench_iter_particles(ds):
+    return lambda: sum(len(b["x"]) for b in iter_particles(ds["idall"][0], "Photon"))
+
+
+@benchmark("iter_particles[where]", "data_loading")
+def _bench_iter_particles_where(ds):
+    return lambda: sum(len(b["x"]) for b in iter_particles(ds["idall"][0], "Photon", columns=("x", "px"),
+                                                           where={"x": X_WINDOW}))
+
+
+@benchmark("particle_table", "data_loading")
+def _bench_particle_table(ds):
+    return lambda: particle_table(ds["idall"][0], ds["idall"][0], "Photon")
+
+
+@benchmark("extract_probes", "data_loading", per_backend=False)
+def _bench_extract_probes(ds):
+    nx, ny, nz = ds["shape"]
+    probes = [(i, ny // 2, nz // 2) for i in np.linspace(0, nx - 1, 16).astype(int)]
+    return lambda: extract_probes(ds["dir"], range(len(ds["field"])), probes, n_workers=1)
+
+
+@benchmark("DumpSeries", "data_loading")
+def _bench_dumpseries(ds):
+    series = DumpSeries("density{:04d}.sdf", range(len(ds["density"])), ["Derived_Number_Density_Photon"],
+                        base_path=ds["dir"])
+    return lambda: sum(float(frame.data["Derived_Number_Density_Photon"].sum()) for frame in series)
+
+
+# ---------------------------------------------------------------- spectrum
+
+@benchmark("load_spectrum", "spectrum")
+def _bench_load_spectrum(ds):
+    return lambda: load_spectrum(ds["distfun"][0], "Photon", "allenergy0", step=2)
+
+
+# ---------------------------------------------------------------- utils_3d
+# utils_3d 在导入时需要 sdf_helper（run_benchmarks 先调用 install），因此在各测试的准备阶段才导入
+
+def _density_inputs(ds):
+    path = ds["density"][0]
+    x, y, z = load_xyz_grid(path)
+    return np.array(load_ne(path)), np.array(load_ek(path)), x, y, z
+
+
+@benchmark("nd_plot_xy", "utils_3d")
+def _bench_nd_plot_xy(ds):
+    from utils_3d import nd_plot_xy
+    ne, _, x, y, z = _density_inputs(ds)
+    return lambda: _plot(nd_plot_xy, ne, x, y, z, z_pos=0.0)
+
+
+@benchmark("nd_plot_yz[x_value]", "utils_3d")
+def _bench_nd_plot_yz_x_value(ds):
+    from utils_3d import nd_plot_yz
+    ne, _, x, y, z = _density_inputs(ds)
+    return lambda: _plot(nd_plot_yz, ne, x, y, z, x_value=20.0)
+
+
+@benchmark("nd_plot_yz[x_range]", "utils_3d")
+def _bench_nd_plot_yz_x_range(ds):
+    from utils_3d import nd_plot_yz
+    ne, _, x, y, z = _density_inputs(ds)
+    return lambda: _plot(nd_plot_yz, ne, x, y, z, x_range=X_WINDOW)
+
+
+@benchmark("nd_plot_xsum", "utils_3d")
+def _bench_nd_plot_xsum(ds):
+    from utils_3d import nd_plot_xsum
+    ne, _, x, y, z = _density_inputs(ds)
+    return lambda: _plot(nd_plot_xsum, ne, x, y, z, y_range=CORE, z_range=CORE)
+
+
+@benchmark("ek_stats", "utils_3d")
+def _bench_ek_stats(ds):
+    from utils_3d import ek_stats
+    _, ek, x, y, z = _density_inputs(ds)
+    return lambda: ek_stats(ek, x, y, z, X_WINDOW, CORE, CORE)
+
+
+@benchmark("region_stats", "utils_3d")
+def _bench_region_stats(ds):
+    from utils_3d import region_stats
+    ne, ek, x, y, z = _density_inputs(ds)
+    regions = [dict(name=f"pulse{k}", x_range=(xc - 1, xc + 1), y_range=CORE, z_range=CORE)
+               for k, xc in enumerate((16.0, 18.0, 20.0, 22.0, 24.0))]
+    return lambda: region_stats(ek, x, y, z, regions, weights=ne)
+
+
+@benchmark("ef_plot_xy", "utils_3d")
+def _bench_ef_plot_xy(ds):
+    from utils_3d import ef_plot_xy
+    x, y, z = load_xyz_grid(ds["field"][0])
+    ey = np.array(load_efields(ds["field"][0])[1])
+    return lambda: _plot(ef_plot_xy, x, y, z, field_data=ey, field_name="Ey")
+
+
+@benchmark("calc_angmom_x", "utils_3d")
+def _bench_calc_angmom_x(ds):
+    from utils_3d import calc_angmom_x
+    x, y, z = (np.asarray(p) for p in load_ppos(ds["idall"][0], "Photon"))
+    _, py, pz = (np.array(p) for p in load_pm(ds["idall"][0], "Photon"))
+    return lambda: calc_angmom_x(py, pz, x, y, z, x_range=X_WINDOW)
+
+
+@benchmark("beam_core_profile", "utils_3d")
+def _bench_beam_core_profile(ds):
+    from utils_3d import beam_core_profile
+    ranges = [(xc - 1, xc + 1) for xc in (16.0, 18.0, 20.0, 22.0, 24.0)]
+    return lambda: beam_core_profile(ds["density"][0], radii=(0.5, 1.0, 2.0), x_ranges=ranges)
+
+
+@benchmark("dump_pulse_widths", "utils_3d")
+def _bench_dump_pulse_widths(ds):
+    from utils_3d import dump_pulse_widths
+    ranges = [(xc - 1, xc + 1) for xc in (16.0, 18.0, 20.0, 22.0, 24.0)]
+    return lambda: dump_pulse_widths(ds["density"][0], ranges)
+
+
+# ---------------------------------------------------------------- 运行与比较
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _measure(bench, ds, repeat, cold):
+    """运行一个测试：repeat 次计时（不启用 tracemalloc），再单独运行一次测量峰值内存"""
+    def prepare():
+        if cold:
+            sdf_cache.close()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        call = bench.setup(ds)
+        times = []
+        for _ in range(repeat):
+            prepare()
+            start = time.perf_counter()
+            call()
+            times.append(time.perf_counter() - start)
+        prepare()
+        with peak_memory(bench.name) as m:
+            call()
+    return times, m.peak, m.retained
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, backends=BACKENDS, data_dir=None, repeat=3, select=None,
+                   n_dumps=3, seed=0, output=None, verbose=True):
+    """
+    在不同规模的合成数据上运行全部（或选定的）基准测试，并保存为 JSON。
+
+    运行期间关闭分析结果缓存（data_loading.result_cache），每次加载前清空 sdf_cache，
+    测得的时间因此是重新打开文件的开销（文件仍可能位于操作系统的页缓存中）。
+
+    参数:
+    - sizes: tuple of str，数据规模，见 benchmarks.synthetic.SIZES
+    - backends: tuple of str，data_loading 测试使用的 SDF 后端，'lazy' 与/或 'sdf_helper'
+    - data_dir: str 或 None，合成数据目录，默认为 ~/.cache/epoch_bench；同一目录中的数据会被复用
+    - repeat: int，每个测试计时的次数
+    - select: list of str 或 None，只运行名称包含其中任一字符串的测试
+    - n_dumps: int，density 与 field 输出的个数（DumpSeries 与 extract_probes 使用）
+    - seed: int，合成数据的随机数种子
+    - output: str 或 None，JSON 结果文件
+    - verbose: bool，是否逐项打印结果
+
+    返回:
+    - report: dict，包含 meta（提交、环境与参数）与 results（每个 测试 × 规模 × 后端 一项）
+    """
+    data_dir = data_dir or os.path.join(os.path.expanduser("~"), ".cache", "epoch_bench")
+    # 未安装 sdf_helper 时用本地替代，utils_3d 中的 `import sdf_helper as sh` 与 sdf_helper 后端才能使用
+    install()
+    for backend in backends:
+        if backend not in BACKENDS:
+            raise ValueError(f"不支持的后端：{backend}，可选值为 {list(BACKENDS)}")
+    benches = [b for b in BENCHMARKS if not select or any(s in b.name for s in select)]
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "sizes": list(sizes),
+            "backends": list(backends),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": [],
+    }
+    saved = (_sdf_cache_module.SDF_BACKEND, result_cache.enabled)
+    result_cache.enabled = False
+    try:
+        for size in sizes:
+            size_dir = os.path.join(data_dir, f"{size}-seed{seed}")
+            if verbose:
+                print(f"准备 {size} 数据：{size_dir}")
+            ds = make_dataset(size_dir, size, ("density", "field"), n_dumps, seed)
+            ds.update({k: v for k, v in make_dataset(size_dir, size, ("distfun", "idall"), 1, seed).items()
+                       if k in ("distfun", "idall")})
+
+            for bench in benches:
+                per_backend = bench.per_backend
+                for backend in (backends if per_backend else backends[:1]):
+                    _sdf_cache_module.SDF_BACKEND = backend
+                    sdf_cache.close()
+                    row = {"name": bench.name, "group": bench.group, "size": size,
+                           "backend": backend if per_backend else None,
+                           "shape": list(ds["shape"]), "n_particles": ds["n_particles"]}
+                    try:
+                        times, peak, retained = _measure(bench, ds, repeat, per_backend)
+                        row.update(times=times, min=min(times), median=float(np.median(times)),
+                                   peak_bytes=peak, retained_bytes=retained)
+                    except Exception as exc:
+                        row["error"] = f"{type(exc).__name__}: {exc}"
+                    report["results"].append(row)
+                    if verbose:
+                        _print_row(row)
+    finally:
+        _sdf_cache_module.SDF_BACKEND, result_cache.enabled = saved
+        sdf_cache.close()
+
+    if output is not None:
+        save_report(report, output)
+    return report
+
+
+def _print_row(row):
+    label = f"{row['size']:<7} {row['backend'] or '-':<10} {row['name']:<24}"
+    if "error" in row:
+        print(f"{label} 失败：{row['error']}")
+    else:
+        print(f"{label} {row['min'] * 1e3:10.2f} ms {row['median'] * 1e3:10.2f} ms "
+              f"{row['peak_bytes'] / 2 ** 20:10.1f} MiB")
+
+
+def save_report(report, path):
+    """保存结果为 JSON"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    print(f"基准测试结果已保存为 {path}")
+
+
+def load_report(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_reports(base, new, threshold=1.2, verbose=True):
+    """
+    比较两次基准测试的结果（如两个提交），按 测试 × 规模 × 后端 逐项给出时间与峰值内存之比。
+
+    参数:
+    - base, new: dict 或 str，run_benchmarks 的结果或其 JSON 文件
+    - threshold: float，新旧中位时间或峰值内存之比超过此值时视为退化
+    - verbose: bool，是否打印比较表
+
+    返回:
+    - rows: list of dict，每项包含 name、size、backend、time_ratio、peak_ratio 与 regression
+    """
+    base = load_report(base) if isinstance(base, str) else base
+    new = load_report(new) if isinstance(new, str) else new
+
+    def key(r):
+        return r["name"], r["size"], r["backend"]
+
+    old = {key(r): r for r in base["results"] if "error" not in r}
+    rows = []
+    for r in new["results"]:
+        o = old.get(key(r))
+        if o is None or "error" in r:
+            continue
+        time_ratio = r["median"] / o["median"] if o["median"] > 0 else float("nan")
+        peak_ratio = (r["peak_bytes"] + 1) / (o["peak_bytes"] + 1)
+        rows.append({"name": r["name"], "size": r["size"], "backend": r["backend"],
+                     "time_ratio": time_ratio, "peak_ratio": peak_ratio,
+                     "regression": time_ratio > threshold or peak_ratio > threshold})
+
+    if verbose:
+        print(f"基准：{base['meta'].get('commit')}  对比：{new['meta'].get('commit')}  阈值：{threshold}")
+        for row in rows:
+            flag = "  <-- 退化" if row["regression"] else ""
+            print(f"{row['size']:<7} {row['backend'] or '-':<10} {row['name']:<24} "
+                  f"时间 x{row['time_ratio']:.2f}  峰值内存 x{row['peak_ratio']:.2f}{flag}")
+        print(f"共 {len(rows)} 项，退化 {sum(r['regression'] for r in rows)} 项")
+    return rows
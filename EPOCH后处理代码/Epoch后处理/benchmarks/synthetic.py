@@ -0,0 +1,286 @@
+import os
+import struct
+
+import numpy as np
+
+from data_loading.region_data import NC
+
+# SDF 文件格式常量，与 data_loading.sdf_lazy 的解析一致
+SDF_MAGIC = b"SDF1"
+SDF_ENDIANNESS = 16911887
+ID_LENGTH = 32
+STRING_LENGTH = 64
+HEADER_LENGTH = 112
+BLOCK_HEADER_LENGTH = 8 + 8 + ID_LENGTH + 8 + 4 + 4 + 4 + STRING_LENGTH + 4
+
+BLOCKTYPE_PLAIN_MESH = 1
+BLOCKTYPE_POINT_MESH = 2
+BLOCKTYPE_PLAIN_VARIABLE = 3
+BLOCKTYPE_POINT_VARIABLE = 4
+DATATYPE_INT64 = 2
+DATATYPE_FLOAT64 = 4
+
+# 各规模的网格点数 (nx, ny, nz) 与粒子数
+SIZES = {
+    "tiny": ((64, 24, 24), 20_000),
+    "small": ((160, 48, 48), 200_000),
+    "medium": ((320, 96, 96), 1_000_000),
+    "large": ((640, 192, 192), 4_000_000),
+}
+
+# 模拟区域（单位：μm），与 densit_plot 等函数的典型使用范围一致
+X_SPAN = (0.0, 40.0)
+YZ_SPAN = (-6.0, 6.0)
+PULSE_CENTERS = (16.0, 18.0, 20.0, 22.0, 24.0)
+KINDS = ("density", "field", "distfun", "idall")
+
+
+def _id(text):
+    return text.encode()[:ID_LENGTH].ljust(ID_LENGTH, b"\0")
+
+
+def _string(text):
+    return text.encode()[:STRING_LENGTH].ljust(STRING_LENGTH, b"\0")
+
+
+def _mesh_info(axes, extra):
+    nd = len(axes)
+    return (struct.pack(f"<{nd}d", *[1.0] * nd)
+            + b"".join(_id(label) for label in "xyz"[:nd])
+            + b"".join(_id("m") for _ in range(nd))
+            + struct.pack("<i", 1)
+            + struct.pack(f"<{nd}d", *[float(np.min(a)) for a in axes])
+            + struct.pack(f"<{nd}d", *[float(np.max(a)) for a in axes])
+            + extra)
+
+
+class SDFWriter:
+    """
+    写出可被 LazySDF（以及 benchmarks.sdf_helper_standin）读取的 SDF 文件。
+
+    只支持基准测试需要的块类型：规则网格、粒子网格、网格变量与粒子变量，
+    变量按块顺序写出，网格变量为 Fortran 顺序，与 EPOCH 输出一致。
+
+    用法:
+        with SDFWriter(path, step=100, time=1e-13) as w:
+            w.plain_mesh('Grid/Grid', 'grid', (xe, ye, ze))
+            w.plain_variable('Derived/Number_Density/Photon', 'grid', n)
+
+    参数:
+    - path: str，输出文件
+    - step: int，时间步
+    - time: float，模拟时间（s）
+    """
+
+    def __init__(self, path, step=0, time=0.0):
+        self.path = path
+        self.step = int(step)
+        self.time = float(time)
+        self._f = open(path + ".tmp", "wb")
+        self._f.write(b"\0" * HEADER_LENGTH)
+        self._nblocks = 0
+
+    def _block(self, name, block_id, blocktype, datatype, ndims, info, arrays):
+        start = self._f.tell()
+        data_location = start + BLOCK_HEADER_LENGTH + len(info)
+        data_length = sum(a.nbytes for a in arrays)
+        header = (struct.pack("<qq", data_location + data_length, data_location)
+                  + _id(block_id)
+                  + struct.pack("<qiii", data_length, blocktype, datatype, ndims)
+                  + _string(name)
+                  + struct.pack("<i", len(info)))
+        self._f.write(header + info)
+        for a in arrays:
+            # 按 x 分块写出，避免再复制一份整个数组
+            if a.ndim > 1:
+                for i in range(0, a.shape[-1], 8):
+                    self._f.write(np.asfortranarray(a[..., i:i + 8]).tobytes(order="F"))
+            else:
+                self._f.write(a.tobytes())
+        self._nblocks += 1
+
+    def plain_mesh(self, name, block_id, axes):
+        """规则网格，axes 为各方向的格点边界坐标（单位：m）"""
+        axes = [np.asarray(a, dtype="<f8") for a in axes]
+        info = _mesh_info(axes, struct.pack(f"<{len(axes)}i", *[len(a) for a in axes]))
+        self._block(name, block_id, BLOCKTYPE_PLAIN_MESH, DATATYPE_FLOAT64, len(axes), info, axes)
+
+    def point_mesh(self, name, block_id, coords, species):
+        """粒子网格，coords 为各粒子的 (x, y, z) 坐标（单位：m）"""
+        coords = [np.asarray(a, dtype="<f8") for a in coords]
+        info = _mesh_info(coords, struct.pack("<q", len(coords[0])) + _id(species))
+        self._block(name, block_id, BLOCKTYPE_POINT_MESH, DATATYPE_FLOAT64, len(coords), info, coords)
+
+    def plain_variable(self, name, mesh_id, values):
+        """网格变量，values 的形状为网格单元数"""
+        values = np.asarray(values, dtype="<f8")
+        info = (struct.pack("<d", 1.0) + _id("u") + _id(mesh_id)
+                + struct.pack(f"<{values.ndim}i", *values.shape) + struct.pack("<i", 0))
+        self._block(name, name, BLOCKTYPE_PLAIN_VARIABLE, DATATYPE_FLOAT64, values.ndim, info, [values])
+
+    def point_variable(self, name, mesh_id, values, species):
+        """粒子变量，整数（如 ID）写为 int64，其余写为 float64"""
+        values = np.asarray(values)
+        datatype = DATATYPE_INT64 if values.dtype.kind in "iu" else DATATYPE_FLOAT64
+        values = values.astype("<i8" if datatype == DATATYPE_INT64 else "<f8", copy=False)
+        info = struct.pack("<d", 1.0) + _id("u") + _id(mesh_id) + struct.pack("<q", len(values)) + _id(species)
+        self._block(name, name, BLOCKTYPE_POINT_VARIABLE, datatype, 1, info, [values])
+
+    def close(self):
+        head = (SDF_MAGIC + struct.pack("<iii", SDF_ENDIANNESS, 1, 4) + _id("Epoch3d")
+                + struct.pack("<qqiiii", HEADER_LENGTH, 0, 0, self._nblocks, BLOCK_HEADER_LENGTH, self.step)
+                + struct.pack("<d", self.time)
+                + struct.pack("<iiii", 0, 0, STRING_LENGTH, 1))
+        self._f.seek(0)
+        self._f.write(head)
+        self._f.close()
+        os.replace(self.path + ".tmp", self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self._f.close()
+            os.remove(self.path + ".tmp")
+        return False
+
+
+def _grid(shape):
+    """格点边界（单位：m）与中心坐标（单位：μm）"""
+    spans = (X_SPAN, YZ_SPAN, YZ_SPAN)
+    edges = [np.linspace(lo, hi, n + 1) for (lo, hi), n in zip(spans, shape)]
+    mids = [0.5 * (e[1:] + e[:-1]) for e in edges]
+    return [e * 1e-6 for e in edges], mids
+
+
+def _pulse_train(x, phase):
+    """沿 x 的脉冲串包络，各脉冲随 phase 平移"""
+    env = np.zeros_like(x)
+    for k, xc in enumerate(PULSE_CENTERS):
+        env += (1.0 - 0.1 * k) * np.exp(-((x - xc - phase) / 0.6) ** 2)
+    return env
+
+
+def write_density(path, shape, step=0, seed=0):
+    """光子与电子的数密度、平均能量，光子为沿轴线传播的脉冲串"""
+    edges, (x, y, z) = _grid(shape)
+    rng = np.random.default_rng(seed)
+    phase = 0.5 * step
+    r2 = y[:, None] ** 2 + z[None, :] ** 2
+    with SDFWriter(path, step=step, time=step * 1e-15) as w:
+        w.plain_mesh("Grid/Grid", "grid", edges)
+        for species, n0, e0, width in (("Photon", 50.0, 1.6e-15, 1.0), ("Electron", 5.0, 8e-14, 3.0)):
+            core = np.exp(-r2 / width ** 2)
+            n = n0 * NC * _pulse_train(x, phase)[:, None, None] * core[None]
+            n *= 1.0 + 0.05 * rng.standard_normal(shape)
+            np.maximum(n, 0.0, out=n)
+            w.plain_variable(f"Derived/Number_Density/{species}", "grid", n)
+            del n
+            E = e0 * (1.0 + 0.5 * np.cos(x / 3.0))[:, None, None] * (1.0 + r2)[None]
+            w.plain_variable(f"Derived/Average_Particle_Energy/{species}", "grid",
+                             np.broadcast_to(E, shape))
+    return path
+
+
+def write_field(path, shape, step=0, seed=0):
+    """高斯包络的圆偏振激光场（Ey、Ez 相差 π/2），纵向场为小量噪声"""
+    edges, (x, y, z) = _grid(shape)
+    rng = np.random.default_rng(seed)
+    phase = 0.5 * step
+    env = np.exp(-((x - 20.0 - phase) / 4.0) ** 2)[:, None, None] \
+        * np.exp(-(y[:, None] ** 2 + z[None, :] ** 2) / 9.0)[None]
+    k = 2 * np.pi
+    amplitude = 4e12
+    with SDFWriter(path, step=step, time=step * 1e-15) as w:
+        w.plain_mesh("Grid/Grid", "grid", edges)
+        w.plain_variable("Electric Field/Ex", "grid", 1e9 * rng.standard_normal(shape))
+        w.plain_variable("Electric Field/Ey", "grid", amplitude * env * np.cos(k * x)[:, None, None])
+        w.plain_variable("Electric Field/Ez", "grid", amplitude * env * np.sin(k * x)[:, None, None])
+        w.plain_variable("Magnetic Field/Bx", "grid", 1.0 * rng.standard_normal(shape))
+        w.plain_variable("Magnetic Field/By", "grid", -amplitude / 3e8 * env * np.sin(k * x)[:, None, None])
+        w.plain_variable("Magnetic Field/Bz", "grid", amplitude / 3e8 * env * np.cos(k * x)[:, None, None])
+    return path
+
+
+def write_distfun(path, n_bins=2000, step=0, seed=0, variable="allenergy0"):
+    """Photon 与 Electron 的能谱分布函数（指数谱加噪声）"""
+    rng = np.random.default_rng(seed)
+    energy = np.linspace(1e-3, 50.0, n_bins) * 1.602176634e-13  # 0.001–50 MeV，单位 J
+    with SDFWriter(path, step=step, time=step * 1e-15) as w:
+        for species, T in (("Photon", 2.0), ("Electron", 8.0)):
+            mesh_id = f"grid/{variable}/{species}"
+            w.plain_mesh(f"Grid/{variable}/{species}", mesh_id, (energy,))
+            counts = 1e10 * np.exp(-energy / (T * 1.602176634e-13)) * rng.uniform(0.8, 1.2, n_bins)
+            w.plain_variable(f"dist_fn/{variable}/{species}", mesh_id, counts)
+    return path
+
+
+def write_idall(path, n_particles, step=0, seed=0):
+    """测试粒子子集的位置、动量、权重与 ID（Photon 与 Electron 各 n_particles 个）"""
+    rng = np.random.default_rng(seed)
+    with SDFWriter(path, step=step, time=step * 1e-15) as w:
+        for species, subset in (("Photon", "subset_testp"), ("Electron", "subset_teste")):
+            mesh_id = f"grid/{subset}/{species}"
+            x = rng.uniform(*X_SPAN, n_particles) * 1e-6
+            y, z = (rng.normal(0.0, 1.5, n_particles) * 1e-6 for _ in range(2))
+            w.point_mesh(f"Grid/Particles/{subset}/{species}", mesh_id, (x, y, z), species)
+            for comp, scale in (("Px", 1e-21), ("Py", 1e-23), ("Pz", 1e-23)):
+                w.point_variable(f"Particles/{comp}/{subset}/{species}", mesh_id,
+                                 scale * rng.standard_normal(n_particles), species)
+            w.point_variable(f"Particles/Weight/{subset}/{species}", mesh_id,
+                             rng.uniform(0.5, 1.5, n_particles) * 1e6, species)
+            w.point_variable(f"Particles/ID/{subset}/{species}", mesh_id,
+                             rng.permutation(n_particles).astype(np.int64) + 1, species)
+    return path
+
+
+def make_dataset(out_dir, size="small", kinds=KINDS, n_dumps=1, seed=0, overwrite=False):
+    """
+    生成一组合成的 EPOCH 输出，文件名与真实输出一致（如 density0000.sdf）。
+
+    数据由 seed 唯一确定，相同参数再次调用时直接复用已存在的文件，
+    不同提交之间的基准测试因此使用完全相同的输入。
+
+    参数:
+    - out_dir: str，输出目录
+    - size: str 或 tuple，SIZES 中的规模名，或 ((nx, ny, nz), n_particles)
+    - kinds: tuple of str，要生成的输出类型，可选 'density'、'field'、'distfun'、'idall'
+    - n_dumps: int，每种类型的输出个数（编号 0 到 n_dumps-1，脉冲随编号向 +x 移动）
+    - seed: int，随机数种子
+    - overwrite: bool，是否覆盖已存在的文件
+
+    返回:
+    - dataset: dict，包含 dir、size、shape、n_particles 与各类型的文件列表（如 dataset['density']）
+    """
+    if isinstance(size, str):
+        if size not in SIZES:
+            raise ValueError(f"不支持的规模：{size}，可选值为 {list(SIZES)}")
+        shape, n_particles = SIZES[size]
+    else:
+        shape, n_particles = size
+        size = "x".join(map(str, shape))
+    for kind in kinds:
+        if kind not in KINDS:
+            raise ValueError(f"不支持的输出类型：{kind}，可选值为 {list(KINDS)}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    dataset = {"dir": out_dir, "size": size, "shape": tuple(shape), "n_particles": n_particles}
+    for kind in kinds:
+        paths = []
+        for step in range(n_dumps):
+            path = os.path.join(out_dir, f"{kind}{step:04d}.sdf")
+            if overwrite or not os.path.exists(path):
+                if kind == "density":
+                    write_density(path, shape, step, seed + step)
+                elif kind == "field":
+                    write_field(path, shape, step, seed + step)
+                elif kind == "distfun":
+                    write_distfun(path, step=step, seed=seed + step)
+                else:
+                    write_idall(path, n_particles, step, seed + step)
+            paths.append(path)
+        dataset[kind] = paths
+    return dataset
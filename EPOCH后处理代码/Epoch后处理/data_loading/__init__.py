@@ -1,6 +1,18 @@
-from .density_data import load_xyz_grid,load_ne,load_ek
+from .density_data import load_xyz_grid,load_ne,load_ek,load_ne_energy
 from .field_data import load_efields,load_bfields
-from .idall_data import load_pm,load_ppos
+from .idall_data import load_pm,load_ppos,ScaledArray
+from .sdf_cache import SDFCache,sdf_cache,get_sdf
+from .sdf_lazy import LazySDF
+from .region_data import load_region,load_ne_region,load_ek_region,range_to_slice,grid_axes
+from .probe_series import extract_probes,probe_indices
+from .array_store import convert_run,ArrayStore
+from .manifest import build_manifest,RunManifest
+from .particle_iter import iter_particles,ParticleReader
+from .particle_table import particle_table,join_by_id,TrackIndex
+from .series import DumpSeries,iter_series
+from .result_cache import ResultCache,result_cache,cached_result
+from .memory import peak_memory,set_memory_report,memory_reports
+from .instrument import tracing,span,traced,Tracer
 
 
 # from your_package import *
@@ -14,8 +26,42 @@ __all__ = [
     "load_xyz_grid",
     "load_ne",
     "load_ek",
+    "load_ne_energy",
     "load_efields",
     "load_bfields",
     "load_pm",
-    "load_ppos"
+    "load_ppos",
+    "ScaledArray",
+    "SDFCache",
+    "sdf_cache",
+    "get_sdf",
+    "LazySDF",
+    "load_region",
+    "load_ne_region",
+    "load_ek_region",
+    "range_to_slice",
+    "grid_axes",
+    "extract_probes",
+    "probe_indices",
+    "convert_run",
+    "ArrayStore",
+    "build_manifest",
+    "RunManifest",
+    "iter_particles",
+    "ParticleReader",
+    "particle_table",
+    "join_by_id",
+    "TrackIndex",
+    "DumpSeries",
+    "iter_series",
+    "ResultCache",
+    "result_cache",
+    "cached_result",
+    "peak_memory",
+    "set_memory_report",
+    "memory_reports",
+    "tracing",
+    "span",
+    "traced",
+    "Tracer"
 ]
\ No newline at end of file
@@ -0,0 +1,321 @@
+import json
+import os
+import re
+
+import numpy as np
+
+from .sdf_lazy import LazySDF, BLOCKTYPE_CONSTANT
+
+STORE_VERSION = 1
+INDEX_NAME = "index.json"
+DEFAULT_KINDS = ("density", "field", "distfun", "idall")
+
+
+def _dump_files(run_dir, kinds):
+    """按 (前缀, 编号) 排序列出运行目录中的 SDF 输出文件"""
+    pattern = re.compile(rf"^({'|'.join(map(re.escape, kinds))})(\d+)\.sdf$")
+    found = []
+    for fname in os.listdir(run_dir):
+        m = pattern.match(fname)
+        if m:
+            found.append((m.group(1), int(m.group(2)), fname))
+    return sorted(found)
+
+
+def _save(path, arr):
+    np.save(path, np.ascontiguousarray(arr))
+    return os.path.basename(path)
+
+
+def _write_array(dump_dir, name, arr, chunk_x):
+    """写入单个数组：多维数组沿第 0 维（x）分块，一维数组整体保存"""
+    arr = np.asarray(arr)
+    entry = {"shape": list(arr.shape), "dtype": arr.dtype.str, "chunks": []}
+    step = chunk_x if arr.ndim > 1 and chunk_x else max(arr.shape[0], 1)
+    for start in range(0, max(arr.shape[0], 1), step):
+        stop = min(start + step, arr.shape[0])
+        fname = _save(os.path.join(dump_dir, f"{name}.{start}.npy"), arr[start:stop])
+        entry["chunks"].append([start, stop, fname])
+    return entry
+
+
+def _write_index(store_dir, index):
+    tmp = os.path.join(store_dir, INDEX_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, os.path.join(store_dir, INDEX_NAME))
+
+
+def _read_index(store_dir):
+    path = os.path.join(store_dir, INDEX_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def convert_run(run_dir, store_dir, kinds=DEFAULT_KINDS, chunk_x=64, verbose=True):
+    """
+    将一个运行目录中的 SDF 输出一次性转换为分块的 .npy 数组仓库。
+
+    每个输出文件对应仓库中的一个子目录，网格变量沿 x 方向按 chunk_x 分块保存，
+    变量名、形状、单位、step 与 time 记录在 index.json 中。
+    转换是增量的：源文件大小与 mtime 未变化的输出会被跳过。
+
+    参数:
+    - run_dir: str，EPOCH 运行目录，如 '.../epoch3d/ju2024ab+2/10kev25磁场'
+    - store_dir: str，数组仓库目录（不存在时自动创建）
+    - kinds: tuple of str，要转换的文件前缀，默认 density/field/distfun/idall
+    - chunk_x: int，网格变量沿 x 方向的分块大小
+    - verbose: bool，是否打印进度
+
+    返回:
+    - converted: list of str，本次新转换的输出名，如 ['density0018', ...]
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    index = _read_index(store_dir)
+    if index is None or index.get("version") != STORE_VERSION or index.get("chunk_x") != chunk_x:
+        index = {"version": STORE_VERSION, "chunk_x": chunk_x, "run_dir": os.path.abspath(run_dir), "dumps": {}}
+
+    converted = []
+    for kind, number, fname in _dump_files(run_dir, kinds):
+        src = os.path.join(run_dir, fname)
+        st = os.stat(src)
+        dump = os.path.splitext(fname)[0]
+        old = index["dumps"].get(dump)
+        if old is not None and old["size"] == st.st_size and old["mtime"] == st.st_mtime_ns:
+            continue
+
+        data = LazySDF(src)
+        dump_dir = os.path.join(store_dir, dump)
+        os.makedirs(dump_dir, exist_ok=True)
+        # 删除上次转换留下的分块：chunk_x 改变后文件名不同，旧文件不会被覆盖
+        for old_file in os.listdir(dump_dir):
+            if old_file.endswith(".npy"):
+                os.remove(os.path.join(dump_dir, old_file))
+        variables = {}
+        for name, block in data.blocks.items():
+            if block.blocktype == BLOCKTYPE_CONSTANT:
+                if block.value is not None:
+                    value = block.value.item()
+                    if isinstance(value, bytes):
+                        value = value.decode("latin-1")
+                    variables[name] = {"value": value, "units": block.units}
+                continue
+            values = block.data
+            if values is None:
+                continue
+            if isinstance(values, tuple):
+                entry = {"components": [_write_array(dump_dir, f"{name}.{c}", a, chunk_x)
+                                        for c, a in enumerate(values)]}
+            else:
+                entry = _write_array(dump_dir, name, values, chunk_x)
+            entry["units"] = block.units if isinstance(block.units, str) else list(block.units)
+            variables[name] = entry
+            block.release()
+
+        index["dumps"][dump] = {
+            "kind": kind,
+            "number": number,
+            "source": src,
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "step": data.header["step"],
+            "time": data.header["time"],
+            "variables": variables,
+        }
+        _write_index(store_dir, index)
+        converted.append(dump)
+        if verbose:
+            print(f"已转换 {fname}（{len(variables)} 个变量）")
+    return converted
+
+
+class ChunkedArray:
+    """
+    沿第 0 维（x）分块保存的数组的只读视图。
+
+    切片时只打开并读取与 x 范围相交的块，因此 load_region 等按区域读取的函数不会读入整个网格；
+    np.asarray(arr) 时才拼接全部块。
+    """
+
+    def __init__(self, dump_dir, entry):
+        self.dump_dir = dump_dir
+        self.chunks = entry["chunks"]
+        self.shape = tuple(entry["shape"])
+        self.dtype = np.dtype(entry["dtype"])
+        self.ndim = len(self.shape)
+        self.size = int(np.prod(self.shape))
+        self.nbytes = self.size * self.dtype.itemsize
+
+    def __repr__(self):
+        return f"<ChunkedArray shape={self.shape} dtype={self.dtype} chunks={len(self.chunks)}>"
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _chunk(self, n):
+        return np.load(os.path.join(self.dump_dir, self.chunks[n][2]), mmap_mode="r")
+
+    def __array__(self, dtype=None, copy=None):
+        out = np.empty(self.shape, dtype=dtype or self.dtype)
+        for n, (start, stop, _) in enumerate(self.chunks):
+            out[start:stop] = self._chunk(n)
+        return out
+
+    def __getitem__(self, key):
+        key = key if isinstance(key, tuple) else (key,)
+        first, rest = (key[0], key[1:]) if key else (slice(None), ())
+        if isinstance(first, (int, np.integer)):
+            i = int(first) + self.shape[0] if first < 0 else int(first)
+            if not 0 <= i < self.shape[0]:
+                raise IndexError(f"索引 {first} 超出范围（长度 {self.shape[0]}）")
+            for n, (start, stop, _) in enumerate(self.chunks):
+                if start <= i < stop:
+                    return self._chunk(n)[(i - start,) + rest]
+        if not isinstance(first, slice):
+            # 花式索引、Ellipsis 等不常用的情形：读入整个数组
+            return np.asarray(self)[key]
+
+        start, stop, step = first.indices(self.shape[0])
+        idx = np.arange(start, stop, step)
+        order = range(len(self.chunks)) if step > 0 else reversed(range(len(self.chunks)))
+        parts = []
+        for n in order:
+            c0, c1, _ = self.chunks[n]
+            local = idx[(idx >= c0) & (idx < c1)] - c0
+            if local.size == 0:
+                continue
+            end = local[-1] + (1 if step > 0 else -1)
+            parts.append(self._chunk(n)[(slice(local[0], end if end >= 0 else None, step),) + rest])
+        if not parts:
+            return self._chunk(0)[(slice(0, 0),) + rest]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts, axis=0)
+
+
+class StoreBlock:
+    """
+    仓库中的一个变量，接口与 LazySDF 的数据块一致（.data、.dims、.units）。
+
+    只有一块时 .data 为只读内存映射；x 方向分块多于一块时为 ChunkedArray，
+    切片只读取相交的块，也可用 .chunks() 逐块遍历。
+    """
+
+    def __init__(self, dump_dir, name, entry):
+        self.dump_dir = dump_dir
+        self.name = name
+        self.entry = entry
+        self.units = entry.get("units", "")
+        self.value = entry.get("value")
+        if "components" in entry:
+            self.dims = tuple(c["shape"][0] for c in entry["components"])
+        else:
+            self.dims = tuple(entry.get("shape", ()))
+        self._data = None
+
+    def __repr__(self):
+        return f"<StoreBlock {self.name} dims={self.dims}>"
+
+    def _load(self, entry):
+        if len(entry["chunks"]) == 1:
+            return np.load(os.path.join(self.dump_dir, entry["chunks"][0][2]), mmap_mode="r")
+        return ChunkedArray(self.dump_dir, entry)
+
+    def chunks(self):
+        """逐块返回 (x 起始索引, x 结束索引, 内存映射数组)"""
+        for start, stop, fname in self.entry["chunks"]:
+            yield start, stop, np.load(os.path.join(self.dump_dir, fname), mmap_mode="r")
+
+    @property
+    def data(self):
+        if self._data is None:
+            if self.value is not None:
+                self._data = self.value
+            elif "components" in self.entry:
+                self._data = tuple(self._load(c) for c in self.entry["components"])
+            else:
+                self._data = self._load(self.entry)
+        return self._data
+
+
+class StoreDump:
+    """
+    仓库中的一个输出文件，可直接传给 load_ne、load_efields 等加载函数，
+    用法同 sh.getdata 返回的对象。
+    """
+
+    def __init__(self, store_dir, name, meta):
+        self.name = name
+        self.meta = meta
+        self.header = {"step": meta["step"], "time": meta["time"]}
+        self.blocks = {var: StoreBlock(os.path.join(store_dir, name), var, entry)
+                       for var, entry in meta["variables"].items()}
+
+    def __getattr__(self, name):
+        blocks = self.__dict__.get("blocks", {})
+        if name in blocks:
+            return blocks[name]
+        raise AttributeError(f"{self.__dict__.get('name')} 中没有变量 {name}")
+
+    def __contains__(self, name):
+        return name in self.blocks
+
+    def keys(self):
+        return list(self.blocks)
+
+    def list_variables(self):
+        for name, block in self.blocks.items():
+            print(f"{name} {block.dims}")
+
+
+class ArrayStore:
+    """
+    打开 convert_run 生成的数组仓库。只读取 index.json，打开耗时为毫秒级。
+
+    用法:
+        store = ArrayStore(store_dir)
+        ne = load_ne(store['density0018'], 'Photon')
+
+    参数:
+    - store_dir: str，仓库目录
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.index = _read_index(store_dir)
+        if self.index is None:
+            raise FileNotFoundError(f"{store_dir} 不是数组仓库（缺少 {INDEX_NAME}）")
+
+    @property
+    def dumps(self):
+        """按前缀与编号排序的全部输出名"""
+        dumps = self.index["dumps"]
+        return sorted(dumps, key=lambda d: (dumps[d]["kind"], dumps[d]["number"]))
+
+    def select(self, kind):
+        """返回指定前缀的输出名列表，如 store.select('density')"""
+        return [d for d in self.dumps if self.index["dumps"][d]["kind"] == kind]
+
+    def open(self, dump):
+        """
+        打开一个输出。
+
+        参数:
+        - dump: str 或 tuple，输出名 'density0018' 或 ('density', 18)
+
+        返回:
+        - StoreDump
+        """
+        if isinstance(dump, tuple):
+            dump = f"{dump[0]}{dump[1]:04d}"
+        if dump not in self.index["dumps"]:
+            raise KeyError(f"仓库中没有输出 {dump}")
+        return StoreDump(self.store_dir, dump, self.index["dumps"][dump])
+
+    __getitem__ = open
+
+    def __contains__(self, dump):
+        return dump in self.index["dumps"]
+
+    def __len__(self):
+        return len(self.index["dumps"])
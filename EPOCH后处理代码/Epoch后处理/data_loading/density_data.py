@@ -1,69 +1,109 @@
 import numpy as np
-import sdf_helper as sh
+from .sdf_cache import get_sdf
+from .region_data import NC
+from .memory import as_array, private_array, report_memory
+from .instrument import traced
 
-def load_xyz_grid(file_path):
+def _axis_um(axis, dtype):
+    axis = np.asarray(axis) / 1e-6
+    return axis if dtype is None else axis.astype(dtype, copy=False)
+
+@traced(cat='load')
+@report_memory
+def load_xyz_grid(file_path, dtype=None):
     """
     从 SDF 文件中提取坐标轴 x, y, z（单位：μm）
 
     参数:
     - file_path: str，SDF 文件路径
+    - dtype: numpy dtype 或 None，坐标的数据类型，None 为保持文件中的类型
 
     返回:
     - x, y: ndarray，单位：μm（二维数据）或
     - x, y, z: ndarray，单位：μm（三维数据）
     """
-    data = sh.getdata(file_path)
+    data = get_sdf(file_path)
     
     # 获取坐标数据
-    x = data.Grid_Grid_mid.data[0] / 1e-6
-    y = data.Grid_Grid_mid.data[1] / 1e-6
+    x = _axis_um(data.Grid_Grid_mid.data[0], dtype)
+    y = _axis_um(data.Grid_Grid_mid.data[1], dtype)
 
     # 检查是否有 z 轴数据
     if len(data.Grid_Grid_mid.data) == 3:  # 如果有三个数组，认为是三维数据
-        z = data.Grid_Grid_mid.data[2] / 1e-6
+        z = _axis_um(data.Grid_Grid_mid.data[2], dtype)
         return x, y, z
     else:
         # 如果是二维数据，不返回 z
         return x, y
 
-def load_ne(file_path, species='Photon'):
+def _check_species(species):
+    valid_species = ['Photon', 'Electron']
+    if species not in valid_species:
+        raise ValueError(f"不支持的粒子类型：{species}，可选值为 {valid_species}")
+
+@traced(cat='load')
+@report_memory
+def load_ne(file_path, species='Photon', dtype=None, copy=True, out=None):
     """
     加载指定粒子的归一化数密度数据（单位：ne / nc）
 
+    数据只读入一次，归一化在该数组上原地完成，不再额外分配一份同样大小的数组。
+
     参数:
     - file_path: str，SDF 文件路径
     - species: str，粒子种类，如 'Photon'、'Electron'
+    - dtype: numpy dtype 或 None，结果类型，如 np.float32 可使内存减半，None 为保持文件中的类型
+    - copy: bool，False 时（sdf_helper 后端）直接在已读入的数组上归一化，并将该文件移出 sdf_cache
+    - out: ndarray 或 None，写入结果的缓冲区（形状与数据相同），循环处理多个文件时可重复使用
 
     返回:
     - ne: ndarray，归一化密度数据
     """
-    valid_species = ['Photon', 'Electron']
-    if species not in valid_species:
-        raise ValueError(f"不支持的粒子类型：{species}，可选值为 {valid_species}")
-
-    data = sh.getdata(file_path)
-    nc = 0.17419597124e28  # 临界密度，单位 m⁻³（对应 1 μm 波长）
-
-    ne = getattr(data, f"Derived_Number_Density_{species}").data / nc
+    _check_species(species)
+    data = get_sdf(file_path)
+    ne = private_array(getattr(data, f"Derived_Number_Density_{species}").data, file_path, dtype, copy, out)
+    ne /= NC
     return ne
 
-def load_ek(file_path, species='Photon'):
+@traced(cat='load')
+@report_memory
+def load_ek(file_path, species='Photon', dtype=None, copy=False, out=None):
     """
-    加载指定粒子的归一化数密度数据（单位：ne / nc）
+    加载指定粒子的平均粒子能量（单位：J）
 
     参数:
     - file_path: str，SDF 文件路径
     - species: str，粒子种类，如 'Photon'、'Electron'
+    - dtype: numpy dtype 或 None，结果类型，None 为保持文件中的类型
+    - copy: bool，False 时直接返回变量数据（lazy 后端下为只读内存映射，不读入内存）
+    - out: ndarray 或 None，写入结果的缓冲区
 
     返回:
-    - ne: ndarray，归一化密度数据
+    - ek: ndarray，平均粒子能量
     """
-    valid_species = ['Photon', 'Electron']
-    if species not in valid_species:
-        raise ValueError(f"不支持的粒子类型：{species}，可选值为 {valid_species}")
+    _check_species(species)
+    data = get_sdf(file_path)
+    return as_array(getattr(data, f"Derived_Average_Particle_Energy_{species}").data, dtype, copy, out)
 
-    data = sh.getdata(file_path)
+@traced(cat='load')
+@report_memory
+def load_ne_energy(file_path, species='Photon', dtype=None, copy=True, out=None):
+    """
+    加载能量密度 ne * Ek（单位：J · nc），代替 ne = load_ne(...); ne = ne * E。
 
+    乘积直接写入归一化密度所在的数组，整个过程只分配一份网格大小的内存（给出 out 时不分配）。
+
+    参数:
+    - file_path, species, dtype, copy, out: 同 load_ne
+
+    返回:
+    - w: ndarray，能量密度
+    """
+    _check_species(species)
+    data = get_sdf(file_path)
     ek = getattr(data, f"Derived_Average_Particle_Energy_{species}").data
-    return ek
+    w = private_array(getattr(data, f"Derived_Number_Density_{species}").data, file_path, dtype, copy, out)
+    w /= NC
+    np.multiply(w, ek, out=w, casting="same_kind")
+    return w
 
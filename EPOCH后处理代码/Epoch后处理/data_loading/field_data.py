@@ -1,36 +1,44 @@
 import numpy as np
-import sdf_helper as sh
+from .sdf_cache import get_sdf
+from .memory import as_array, report_memory
+from .instrument import traced
 
-def load_efields(file_path):
+@traced(cat='load')
+@report_memory
+def load_efields(file_path, dtype=None, copy=False):
     """
-    加载指定粒子的归一化数密度数据（单位：ne / nc）
+    加载电场三个分量（单位：V/m）
 
     参数:
     - file_path: str，SDF 文件路径
-    - species: str，粒子种类，如 'Photon'、'Electron'
+    - dtype: numpy dtype 或 None，结果类型，None 为保持文件中的类型
+    - copy: bool，False 时直接返回变量数据（lazy 后端下为只读内存映射，不读入内存）
 
     返回:
-    - ne: ndarray，归一化密度数据
+    - ex, ey, ez: ndarray，电场分量
     """
-    data = sh.getdata(file_path)
-    ex = getattr(data, f"Electric_Field_Ex").data 
-    ey = getattr(data, f"Electric_Field_Ey").data 
-    ez = getattr(data, f"Electric_Field_Ez").data 
+    data = get_sdf(file_path)
+    ex = as_array(getattr(data, f"Electric_Field_Ex").data, dtype, copy)
+    ey = as_array(getattr(data, f"Electric_Field_Ey").data, dtype, copy)
+    ez = as_array(getattr(data, f"Electric_Field_Ez").data, dtype, copy)
     return ex,ey,ez
 
-def load_bfields(file_path):
+@traced(cat='load')
+@report_memory
+def load_bfields(file_path, dtype=None, copy=False):
     """
-    加载指定粒子的归一化数密度数据（单位：ne / nc）
+    加载磁场三个分量（单位：T）
 
     参数:
     - file_path: str，SDF 文件路径
-    - species: str，粒子种类，如 'Photon'、'Electron'
+    - dtype: numpy dtype 或 None，结果类型，None 为保持文件中的类型
+    - copy: bool，False 时直接返回变量数据（lazy 后端下为只读内存映射，不读入内存）
 
     返回:
-    - ne: ndarray，归一化密度数据
+    - bx, by, bz: ndarray，磁场分量
     """
-    data = sh.getdata(file_path)
-    bx = getattr(data, f"Magnetic_Field_Bx").data 
-    by = getattr(data, f"Magnetic_Field_By").data 
-    bz = getattr(data, f"Magnetic_Field_Bz").data 
+    data = get_sdf(file_path)
+    bx = as_array(getattr(data, f"Magnetic_Field_Bx").data, dtype, copy)
+    by = as_array(getattr(data, f"Magnetic_Field_By").data, dtype, copy)
+    bz = as_array(getattr(data, f"Magnetic_Field_Bz").data, dtype, copy)
     return bx,by,bz
\ No newline at end of file
@@ -1,61 +1,116 @@
 import numpy as np
-import sdf_helper as sh
+from .sdf_cache import get_sdf
 import pandas as pd
+from .memory import as_array, private_array, report_memory
+from .instrument import traced
 
-def load_ppos(file_path, species):
+SUBSET_PREFIX = {'Photon': 'subset_testp', 'Electron': 'subset_teste'}
+
+
+def particle_prefix(species):
+    """返回粒子子集名，如 'Photon' -> 'subset_testp'"""
+    if species not in SUBSET_PREFIX:
+        raise ValueError(f"不支持的粒子类型: {species}")
+    return SUBSET_PREFIX[species]
+
+
+class ScaledArray(np.lib.mixins.NDArrayOperatorsMixin):
+    """
+    按需换算单位的一维数组视图：x[start:stop] 只读取这一段并除以 scale，不会读入整个数组。
+
+    由 load_ppos(..., lazy=True) 返回，angmom_stats 等分块遍历的函数因此可以直接处理大于内存的 idall 文件；
+    运算、np.* 函数与 .min()、.mean() 等方法会先换算出完整数组（与普通 ndarray 的结果相同）。
+
+    参数:
+    - values: ndarray 或内存映射，原始数据
+    - scale: float，单位，结果为 values / scale
+    - dtype: numpy dtype 或 None，换算结果的类型，None 为与 values / scale 相同
+    """
+
+    def __init__(self, values, scale, dtype=None):
+        self.values = values
+        self.scale = scale
+        self.dtype = np.dtype(dtype) if dtype is not None else np.divide(values[:0], scale).dtype
+        self.shape = values.shape
+        self.ndim = values.ndim
+        self.size = values.size
+
+    def __repr__(self):
+        return f"<ScaledArray shape={self.shape} dtype={self.dtype} scale={self.scale}>"
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, key):
+        return np.divide(self.values[key], self.scale, dtype=self.dtype)
+
+    def __array__(self, dtype=None, copy=None):
+        arr = np.divide(self.values, self.scale, dtype=self.dtype)
+        return arr if dtype is None else arr.astype(dtype, copy=False)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = tuple(np.asarray(a) if isinstance(a, ScaledArray) else a for a in inputs)
+        if "out" in kwargs:
+            kwargs["out"] = tuple(np.asarray(a) if isinstance(a, ScaledArray) else a for a in kwargs["out"])
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __getattr__(self, name):
+        # min、max、mean、reshape 等 ndarray 方法作用在换算后的完整数组上
+        if name.startswith("__") or name in ("values", "scale"):
+            raise AttributeError(name)
+        return getattr(np.asarray(self), name)
+
+@traced(cat='load')
+@report_memory
+def load_ppos(file_path, species, dtype=None, copy=True, out=None, lazy=False):
     """
     加载指定粒子的空间位置 (x, y, z)。
 
+    每个分量只读入一次，单位换算在读入的数组上原地完成。
+    lazy=True 时返回按需换算的视图（ScaledArray），不读入全部粒子，
+    供 calc_angmom_x、angmom_stats 等分块计算处理大于内存的文件。
+
     参数:
     - file_path: str，SDF 文件路径
     - species: str，粒子类型，如 'Photon' 或 'Electron'
+    - dtype: numpy dtype 或 None，结果类型，如 np.float32 可使内存减半，None 为保持文件中的类型
+    - copy: bool，False 时（sdf_helper 后端）直接在已读入的数组上换算，并将该文件移出 sdf_cache
+    - out: tuple of ndarray 或 None，三个分量的缓冲区，给出时忽略 dtype 与 copy
+    - lazy: bool，是否返回 ScaledArray 视图（忽略 copy 与 out）
 
     返回:
-    - x, y, z: ndarray，单位为微米 (um)
+    - x, y, z: ndarray（lazy=True 时为 ScaledArray），单位为微米 (um)
     """
-    data = sh.getdata(file_path)
-    
-    if species == "Photon":
-        key = "Grid_Particles_subset_testp_Photon"
-    elif species == "Electron":
-        key = "Grid_Particles_subset_teste_Electron"
-    else:
-        raise ValueError(f"不支持的粒子类型: {species}")
-
-    grid = getattr(data, key).data
-    x, y, z = grid[0] / 1e-6, grid[1] / 1e-6, grid[2] / 1e-6  # 转换为微米
+    data = get_sdf(file_path)
+    prefix = particle_prefix(species)
+    grid = getattr(data, f"Grid_Particles_{prefix}_{species}").data
+    if lazy:
+        x, y, z = (ScaledArray(grid[d], 1e-6, dtype) for d in range(3))  # 转换为微米
+        return x, y, z
+    x, y, z = (private_array(grid[d], file_path, dtype, copy, None if out is None else out[d]) for d in range(3))
+    for arr in (x, y, z):
+        arr /= 1e-6  # 转换为微米
     return x, y, z
 
-def load_pm(file_path, species='Photon'):
+@traced(cat='load')
+@report_memory
+def load_pm(file_path, species='Photon', dtype=None, copy=False, out=None):
     """
     加载指定粒子的动量 (px, py, pz)。
 
     参数:
     - file_path: str，SDF 文件路径
     - species: str，粒子类型，如 'Photon' 或 'Electron'
+    - dtype: numpy dtype 或 None，结果类型，None 为保持文件中的类型
+    - copy: bool，False 时直接返回变量数据（lazy 后端下为只读内存映射，不读入内存）
+    - out: tuple of ndarray 或 None，三个分量的缓冲区
 
     返回:
     - px, py, pz: ndarray
     """
-    data = sh.getdata(file_path)
-
-    # 根据粒子种类确定前缀
-    if species == 'Photon':
-        prefix = 'subset_testp'
-    elif species == 'Electron':
-        prefix = 'subset_teste'
-    else:
-        raise ValueError(f"不支持的粒子类型: {species}")
-
-    px = getattr(data, f"Particles_Px_{prefix}_{species}").data
-    py = getattr(data, f"Particles_Py_{prefix}_{species}").data
-    pz = getattr(data, f"Particles_Pz_{prefix}_{species}").data
+    data = get_sdf(file_path)
+    prefix = particle_prefix(species)
+    px, py, pz = (as_array(getattr(data, f"Particles_{c}_{prefix}_{species}").data, dtype, copy,
+                           None if out is None else out[d])
+                  for d, c in enumerate(("Px", "Py", "Pz")))
     return px, py, pz
-
-
-
-
-
-
-
-
@@ -0,0 +1,288 @@
+import atexit
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# EPOCH_TRACE=1 在导入时开启计时（memory 时同时用 tracemalloc 统计数组分配），
+# EPOCH_TRACE_FILE 给出时在进程退出前写出 Chrome trace，否则打印汇总表
+TRACE = os.environ.get("EPOCH_TRACE", "0")
+TRACE_FILE = os.environ.get("EPOCH_TRACE_FILE")
+
+CATEGORIES = ("decode", "load", "select", "reduce", "render", "analysis")
+
+# 当前的 Tracer；为 None 时被 traced 装饰的函数直接调用，只多一次全局变量判断
+_tracer = None
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _io_counters():
+    """本进程累计读取的字节数 (rchar, read_bytes)：前者包括页缓存命中，后者为实际从存储设备读取（含内存映射缺页）"""
+    try:
+        with open("/proc/self/io", "rb") as f:
+            fields = dict(line.split(b":") for line in f.read().splitlines())
+        return int(fields[b"rchar"]), int(fields[b"read_bytes"])
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+
+def _rss():
+    """(当前 RSS, 进程启动以来的峰值 RSS)，单位字节"""
+    current = 0
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            current = int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 if resource is not None else 0
+    return current, peak
+
+
+class _Span:
+    """一次计时区间，由 Tracer.span 创建"""
+
+    __slots__ = ("tracer", "name", "cat", "args", "start", "io", "child", "mem")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.child = 0
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        stack.append(self)
+        self.mem = None
+        if self.tracer.memory:
+            # 延迟导入：sdf_lazy、sdf_cache 也使用本模块，memory 又依赖 sdf_cache
+            from .memory import peak_memory
+            self.mem = peak_memory(self.name).__enter__()
+        self.io = _io_counters()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        io = _io_counters()
+        if self.mem is not None:
+            self.mem.__exit__(*exc)
+        stack = self.tracer._stack()
+        stack.pop()
+        dur = end - self.start
+        if stack:
+            stack[-1].child += dur
+        rss, max_rss = _rss()
+        record = {
+            "name": self.name, "cat": self.cat, "tid": threading.get_ident(), "depth": len(stack),
+            "start": self.start, "dur": dur, "self": dur - self.child,
+            "rchar": io[0] - self.io[0], "read_bytes": io[1] - self.io[1],
+            "rss": rss, "max_rss": max_rss,
+        }
+        if self.mem is not None:
+            record["alloc_peak"] = self.mem.peak
+            record["alloc_retained"] = self.mem.retained
+        if self.args:
+            record["args"] = self.args
+        self.tracer.events.append(record)
+        return False
+
+
+class _NullSpan:
+    """未开启记录时 span() 返回的空操作对象"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    记录一组嵌套的计时区间（span），如 analysis → load → decode、select、reduce → render。
+
+    每个区间记录墙钟时间、自身时间（扣除子区间）、读取的字节数、结束时的 RSS 与峰值 RSS；
+    memory=True 时另用 tracemalloc 统计区间内数组分配的峰值与保留量（会明显拖慢纯 Python 循环）。
+    子进程（ProcessPoolExecutor）中的调用不会被记录。
+
+    参数:
+    - memory: bool，是否统计数组分配
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.events = []
+        self.pid = os.getpid()
+        self.origin = time.perf_counter_ns()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name, cat="user", **args):
+        return _Span(self, name, cat, args)
+
+    def clear(self):
+        self.events = []
+
+    def summary(self):
+        """
+        按区间名称汇总。
+
+        返回:
+        - table: pandas.DataFrame，列为 name、cat、calls、total(ms)、self(ms)、mean(ms)、max(ms)、
+          read(MiB)（rchar 之和）、disk(MiB)（read_bytes 之和）、max_rss(MiB)，
+          memory=True 时另有 alloc_peak(MiB)（单次调用的最大值）；按 total 降序排列
+        """
+        columns = ["name", "cat", "calls", "total(ms)", "self(ms)", "mean(ms)", "max(ms)",
+                   "read(MiB)", "disk(MiB)", "max_rss(MiB)"]
+        if not self.events:
+            return pd.DataFrame(columns=columns)
+        df = pd.DataFrame(self.events)
+        if "alloc_peak" not in df:
+            df["alloc_peak"] = float("nan")
+        g = df.groupby(["name", "cat"], sort=False)
+        table = pd.DataFrame({
+            "calls": g.size(),
+            "total(ms)": g["dur"].sum() / 1e6,
+            "self(ms)": g["self"].sum() / 1e6,
+            "mean(ms)": g["dur"].mean() / 1e6,
+            "max(ms)": g["dur"].max() / 1e6,
+            "read(MiB)": g["rchar"].sum() / 2 ** 20,
+            "disk(MiB)": g["read_bytes"].sum() / 2 ** 20,
+            "max_rss(MiB)": g["max_rss"].max() / 2 ** 20,
+        })
+        if self.memory:
+            table["alloc_peak(MiB)"] = g["alloc_peak"].max() / 2 ** 20
+        return table.reset_index().sort_values("total(ms)", ascending=False, ignore_index=True)
+
+    def print_summary(self, limit=40):
+        """打印汇总表（最多 limit 行）"""
+        table = self.summary()
+        if table.empty:
+            print("没有记录到任何调用")
+            return table
+        with pd.option_context("display.max_rows", limit, "display.width", 200,
+                               "display.float_format", "{:.2f}".format):
+            print(table.head(limit).to_string(index=False))
+        return table
+
+    def chrome_trace(self):
+        """返回 Chrome trace 格式（chrome://tracing、Perfetto 可直接打开）的 dict"""
+        events = []
+        for e in self.events:
+            args = {k: e[k] for k in ("rchar", "read_bytes", "rss", "max_rss", "alloc_peak", "alloc_retained")
+                    if k in e}
+            args.update({k: str(v) for k, v in e.get("args", {}).items()})
+            events.append({"name": e["name"], "cat": e["cat"], "ph": "X", "pid": self.pid, "tid": e["tid"],
+                           "ts": (e["start"] - self.origin) / 1e3, "dur": e["dur"] / 1e3, "args": args})
+        events.sort(key=lambda ev: ev["ts"])
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        """将记录写为 Chrome trace JSON 文件"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+        print(f"trace 已保存为 {path}（{len(self.events)} 个区间）")
+
+
+def span(name, cat="user", **args):
+    """
+    在当前 Tracer 中记录一段代码，未开启记录时为空操作。
+
+    用法:
+        with span('mask', 'select'):
+            mask = ...
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, cat, **args)
+
+
+def traced(func=None, cat="call", name=None):
+    """
+    装饰器：开启记录时，每次调用记录为一个区间；未开启时只多一次判断。
+
+    参数:
+    - cat: str，区间类别，如 'load'、'select'、'reduce'、'render'、'analysis'
+    - name: str 或 None，区间名称，默认为函数的 __qualname__
+    """
+    def decorate(f):
+        label = name or f.__qualname__
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return f(*args, **kwargs)
+            with _Span(_tracer, label, cat, None):
+                return f(*args, **kwargs)
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+@contextlib.contextmanager
+def tracing(memory=False, chrome_trace=None, summary=True):
+    """
+    上下文管理器：在代码块内开启记录，结束时打印汇总表并（可选）写出 Chrome trace。
+
+    用法:
+        with tracing(chrome_trace='trace.json') as tracer:
+            ne = load_ne(file_path)
+            nd_plot_xy(ne, x, y, z, z_pos=0)
+        table = tracer.summary()
+
+    参数:
+    - memory: bool，是否用 tracemalloc 统计数组分配
+    - chrome_trace: str 或 None，Chrome trace 文件路径
+    - summary: bool，是否打印汇总表
+
+    产出:
+    - tracer: Tracer
+    """
+    global _tracer
+    previous = _tracer
+    tracer = _tracer = Tracer(memory)
+    try:
+        yield tracer
+    finally:
+        _tracer = previous
+        if summary:
+            tracer.print_summary()
+        if chrome_trace is not None:
+            tracer.write_chrome_trace(chrome_trace)
+
+
+def active_tracer():
+    """返回当前的 Tracer，未开启记录时为 None"""
+    return _tracer
+
+
+def _finish():
+    if _tracer is None:
+        return
+    if TRACE_FILE:
+        _tracer.write_chrome_trace(TRACE_FILE)
+    else:
+        _tracer.print_summary()
+
+
+if TRACE not in ("", "0"):
+    _tracer = Tracer(memory=TRACE == "memory")
+    atexit.register(_finish)
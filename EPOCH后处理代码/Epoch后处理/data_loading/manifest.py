@@ -0,0 +1,166 @@
+import json
+import os
+import re
+import struct
+
+from .sdf_lazy import LazySDF
+
+MANIFEST_VERSION = 1
+MANIFEST_NAME = ".epoch_manifest.json"
+_DUMP_PATTERN = re.compile(r"^(.+?)(\d+)\.sdf$")
+
+
+def _scan_file(file_path):
+    """只读取 SDF 文件头与块头，返回该输出的元数据"""
+    data = LazySDF(file_path)
+    variables = {}
+    for name, block in data.blocks.items():
+        units = block.units if isinstance(block.units, str) else list(block.units)
+        variables[name] = {
+            "shape": list(block.dims),
+            "dtype": block.dtype.str if block.dtype is not None else None,
+            "units": units,
+        }
+    return {"step": data.header["step"], "time": data.header["time"], "variables": variables}
+
+
+class RunManifest:
+    """
+    运行目录的元数据清单：记录每个输出文件的类型、step/time、变量名、形状与数据类型。
+
+    扫描时只读取 SDF 文件头（不读取任何变量数据），结果缓存在磁盘上，
+    再次打开时只对新增或被修改的文件重新扫描。
+
+    用法:
+        m = RunManifest(run_dir)
+        m.query(variable='dist_fn_en_Photon', t_min=1e-13, t_max=2e-13)
+
+    参数:
+    - run_dir: str，EPOCH 运行目录
+    - cache_path: str 或 None，清单缓存文件，默认 run_dir/.epoch_manifest.json
+    - verbose: bool，是否打印扫描进度
+    """
+
+    def __init__(self, run_dir, cache_path=None, verbose=False):
+        self.run_dir = os.path.abspath(run_dir)
+        self.cache_path = cache_path or os.path.join(self.run_dir, MANIFEST_NAME)
+        self.verbose = verbose
+        self.entries = {}
+        self._load()
+        self.update()
+
+    def _load(self):
+        if not os.path.exists(self.cache_path):
+            return
+        with open(self.cache_path, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("version") == MANIFEST_VERSION:
+            self.entries = cached["entries"]
+
+    def _save(self):
+        tmp = self.cache_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": MANIFEST_VERSION, "run_dir": self.run_dir, "entries": self.entries},
+                          f, ensure_ascii=False)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            print(f"无法写入清单缓存 {self.cache_path}：{e}")
+
+    def update(self):
+        """
+        增量更新清单：扫描新增或大小/mtime 变化的文件，移除已删除的文件。
+
+        返回:
+        - changed: list of str，本次重新扫描的文件名
+        """
+        changed = []
+        present = set()
+        for fname in sorted(os.listdir(self.run_dir)):
+            m = _DUMP_PATTERN.match(fname)
+            if not m:
+                continue
+            present.add(fname)
+            st = os.stat(os.path.join(self.run_dir, fname))
+            old = self.entries.get(fname)
+            if old is not None and old["size"] == st.st_size and old["mtime"] == st.st_mtime_ns:
+                continue
+            try:
+                entry = _scan_file(os.path.join(self.run_dir, fname))
+            except (ValueError, OSError, struct.error) as e:
+                # 正在写入或已损坏的文件，下次 update 时重试
+                print(f"跳过 {fname}：{e}")
+                continue
+            entry.update(kind=m.group(1), number=int(m.group(2)), size=st.st_size, mtime=st.st_mtime_ns)
+            self.entries[fname] = entry
+            changed.append(fname)
+            if self.verbose:
+                print(f"已扫描 {fname}")
+
+        removed = set(self.entries) - present
+        for fname in removed:
+            del self.entries[fname]
+        if changed or removed or not os.path.exists(self.cache_path):
+            self._save()
+        return changed
+
+    def query(self, variable=None, kind=None, t_min=None, t_max=None, step_min=None, step_max=None):
+        """
+        按条件查询输出文件，不打开任何数据。
+
+        参数:
+        - variable: str 或 None，必须包含的变量名，如 'dist_fn_en_Photon'
+        - kind: str 或 None，文件类型（文件名前缀），如 'density'、'distfun'、'idall'、'weight'
+        - t_min, t_max: float 或 None，模拟时间范围（单位：s，闭区间）
+        - step_min, step_max: int 或 None，时间步范围（闭区间）
+
+        返回:
+        - list of dict，按 (kind, number) 排序，每项包含 file、kind、number、step、time、variables
+        """
+        result = []
+        for fname, e in self.entries.items():
+            if kind is not None and e["kind"] != kind:
+                continue
+            if variable is not None and variable not in e["variables"]:
+                continue
+            if t_min is not None and e["time"] < t_min:
+                continue
+            if t_max is not None and e["time"] > t_max:
+                continue
+            if step_min is not None and e["step"] < step_min:
+                continue
+            if step_max is not None and e["step"] > step_max:
+                continue
+            result.append(dict(e, file=os.path.join(self.run_dir, fname)))
+        return sorted(result, key=lambda e: (e["kind"], e["number"]))
+
+    def files(self, **conditions):
+        """返回满足 query 条件的文件完整路径列表"""
+        return [e["file"] for e in self.query(**conditions)]
+
+    def kinds(self):
+        """返回目录中出现的全部文件类型"""
+        return sorted({e["kind"] for e in self.entries.values()})
+
+    def variables(self, kind=None):
+        """返回指定类型（或全部）文件中出现过的变量名"""
+        names = set()
+        for e in self.entries.values():
+            if kind is None or e["kind"] == kind:
+                names.update(e["variables"])
+        return sorted(names)
+
+
+def build_manifest(run_dir, cache_path=None, verbose=False):
+    """
+    扫描运行目录并返回（增量更新后的）清单，等价于 RunManifest(run_dir, cache_path, verbose)。
+
+    参数:
+    - run_dir: str，EPOCH 运行目录
+    - cache_path: str 或 None，清单缓存文件路径
+    - verbose: bool，是否打印扫描进度
+
+    返回:
+    - RunManifest
+    """
+    return RunManifest(run_dir, cache_path, verbose)
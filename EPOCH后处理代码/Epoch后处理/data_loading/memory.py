@@ -0,0 +1,156 @@
+import functools
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+from .sdf_cache import sdf_cache
+
+# 设为 1 时，被 report_memory 装饰的加载函数每次调用都打印峰值内存
+REPORT = os.environ.get("EPOCH_MEMORY_REPORT", "0") == "1"
+
+# 嵌套测量的栈，每项为 [起始占用, 目前为止的峰值]（字节，均为 tracemalloc 的绝对值）
+_STACK = []
+# 最近的测量结果，最多保留 _MAX_RECORDS 条
+_RECORDS = []
+_MAX_RECORDS = 1000
+
+
+class peak_memory:
+    """
+    上下文管理器：用 tracemalloc 测量代码块内的峰值内存（numpy 数组的分配会被计入，内存映射的页面不计入）。
+
+    可以嵌套使用，内层测量不会影响外层的峰值；tracemalloc 未启动时自动启动，最外层结束时停止。
+
+    用法:
+        with peak_memory('ne*E') as m:
+            w = load_ne_energy(file_path, dtype=np.float32)
+        print(m.peak / 2**20, 'MiB')
+
+    属性（退出后可用）:
+    - label: str，名称
+    - peak: int，代码块内相对起始时的峰值增量（字节）
+    - retained: int，结束时仍占用的增量（字节），通常即返回数组的大小
+    - elapsed: float，耗时（s）
+    """
+
+    def __init__(self, label=""):
+        self.label = label
+        self.peak = 0
+        self.retained = 0
+        self.elapsed = 0.0
+        self._started = False
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        current, peak = tracemalloc.get_traced_memory()
+        if _STACK:
+            _STACK[-1][1] = max(_STACK[-1][1], peak)
+        tracemalloc.reset_peak()
+        _STACK.append([current, current])
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self._t0
+        current, peak = tracemalloc.get_traced_memory()
+        start, inner_peak = _STACK.pop()
+        peak = max(peak, inner_peak)
+        self.peak = peak - start
+        self.retained = current - start
+        if _STACK:
+            _STACK[-1][1] = max(_STACK[-1][1], peak)
+        if self._started:
+            tracemalloc.stop()
+        _RECORDS.append(self.as_dict())
+        del _RECORDS[:-_MAX_RECORDS]
+        return False
+
+    def as_dict(self):
+        return {"label": self.label, "peak": self.peak, "retained": self.retained, "elapsed": self.elapsed}
+
+    def __str__(self):
+        return (f"{self.label}: 峰值 {self.peak / 2 ** 20:.1f} MiB，"
+                f"保留 {self.retained / 2 ** 20:.1f} MiB，耗时 {self.elapsed:.2f} s")
+
+
+def set_memory_report(enabled=True):
+    """开启或关闭加载函数的逐次峰值内存报告（也可设置环境变量 EPOCH_MEMORY_REPORT=1）"""
+    global REPORT
+    REPORT = bool(enabled)
+
+
+def memory_reports(clear=False):
+    """
+    返回最近的峰值内存测量结果。
+
+    参数:
+    - clear: bool，返回后是否清空
+
+    返回:
+    - records: list of dict，每项包含 label、peak、retained（字节）与 elapsed（s）
+    """
+    records = list(_RECORDS)
+    if clear:
+        _RECORDS.clear()
+    return records
+
+
+def report_memory(func):
+    """装饰器：报告开启时（见 set_memory_report），每次调用都测量并打印峰值内存"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not REPORT:
+            return func(*args, **kwargs)
+        with peak_memory(func.__name__) as m:
+            result = func(*args, **kwargs)
+        print(m)
+        return result
+    return wrapper
+
+
+def as_array(values, dtype=None, copy=True, out=None):
+    """
+    将变量数据转换为指定类型的数组，只在必要时复制。
+
+    参数:
+    - values: ndarray 或内存映射，SDF 变量的 .data
+    - dtype: numpy dtype 或 None，结果类型，None 为保持原类型
+    - copy: bool，False 时尽量直接返回原数组（内存映射保持不读取）
+    - out: ndarray 或 None，写入结果的缓冲区，给出时忽略 dtype 与 copy
+
+    返回:
+    - arr: ndarray
+    """
+    if out is not None:
+        np.copyto(out, values, casting="same_kind")
+        return out
+    if copy:
+        return np.array(values, dtype=dtype, order="K")
+    return np.asarray(values, dtype=dtype)
+
+
+def private_array(values, file_path=None, dtype=None, copy=True, out=None):
+    """
+    返回可以原地修改（如单位归一化）的数组，只分配一次内存。
+
+    - 内存映射（lazy 后端）：读入一个新数组，数据类型转换在读取时完成，不会修改映射本身；
+    - 已在内存中的数组（sdf_helper 后端）且 copy=False：直接复用该数组，
+      并将 file_path 从 sdf_cache 中移除，避免其他调用读到修改后的数据；
+    - 其他情况（包括已打开的数据对象）复制一份。
+
+    参数:
+    - values: ndarray 或内存映射，SDF 变量的 .data
+    - file_path: str 或 None，values 所属的文件，copy=False 时用于使缓存失效
+    - dtype, copy, out: 同 as_array
+
+    返回:
+    - arr: ndarray，不与 SDF 对象共享内存（copy=False 且为内存数组时除外）
+    """
+    if out is not None or copy or isinstance(values, np.memmap) or not isinstance(file_path, (str, os.PathLike)):
+        return as_array(values, dtype, True, out)
+    sdf_cache.invalidate(file_path)
+    return np.asarray(values, dtype=dtype)
@@ -0,0 +1,159 @@
+import numpy as np
+
+from .sdf_cache import get_sdf
+from .idall_data import particle_prefix
+from .instrument import traced
+
+COLUMNS = ("x", "y", "z", "px", "py", "pz", "weight", "id")
+POSITION_COLUMNS = ("x", "y", "z")
+DEFAULT_BUDGET = 256 * 1024 ** 2  # 每批数据的内存上限，256 MiB
+
+_VARIABLES = {"px": "Px", "py": "Py", "pz": "Pz", "weight": "Weight", "id": "ID"}
+
+
+def _has_variable(data, name):
+    if hasattr(data, "blocks"):
+        return name in data.blocks
+    return hasattr(data, name)
+
+
+class ParticleReader:
+    """
+    分批读取 idall 文件中的粒子数据，适用于无法整体载入内存的大文件。
+
+    每批为 dict（列名 -> 一维数组），列为 x, y, z（单位：μm）、px, py, pz、weight、id 中的所需部分。
+    数据以内存映射方式访问，只有被请求的列会被读取；
+    给出 where 时先读取筛选列，再只取出满足条件的行（谓词下推）。
+
+    用法:
+        for batch in ParticleReader(file_path, 'Photon', columns=('x', 'px'), where={'x': (18, 20)}):
+            ...
+
+    参数:
+    - file_path: str，SDF 文件路径
+    - species: str，'Photon' 或 'Electron'
+    - columns: tuple of str 或 None，要读取的列，None 为文件中存在的全部列
+    - where: dict 或 None，范围筛选条件，如 {'x': (18, 20), 'pz': (0, None)}（闭区间，None 表示不限）
+    - memory_budget: int，每批数据占用内存的上限（字节）
+    - pos_unit: float，位置的单位，默认 1e-6（μm）
+    - start, stop: int 或 None，只遍历 [start, stop) 范围内的粒子（多进程分段读取时使用）
+    """
+
+    def __init__(self, file_path, species="Photon", columns=None, where=None,
+                 memory_budget=DEFAULT_BUDGET, pos_unit=1e-6, start=0, stop=None):
+        self.file_path = file_path
+        self.species = species
+        self.pos_unit = pos_unit
+        self.where = dict(where or {})
+
+        data = get_sdf(file_path)
+        self.header = getattr(data, "header", None) or {}
+        prefix = particle_prefix(species)
+        grid_name = f"Grid_Particles_{prefix}_{species}"
+        # weight 等输出可能不包含粒子位置
+        self._grid = getattr(data, grid_name) if _has_variable(data, grid_name) else None
+        self._blocks = {}
+        for col, var in _VARIABLES.items():
+            name = f"Particles_{var}_{prefix}_{species}"
+            if _has_variable(data, name):
+                self._blocks[col] = getattr(data, name)
+
+        positions = POSITION_COLUMNS if self._grid is not None else ()
+        self.available = positions + tuple(c for c in COLUMNS if c in self._blocks)
+        if not self.available:
+            raise ValueError(f"{file_path} 中没有 {species} 的粒子数据")
+        self.columns = tuple(columns) if columns is not None else self.available
+        for col in set(self.columns) | set(self.where):
+            if col not in self.available:
+                raise ValueError(f"{file_path} 中没有 {species} 的 {col} 数据，可用列为 {list(self.available)}")
+
+        self.n_particles = len(self._column(self.available[0]))
+        self.start = start
+        self.stop = self.n_particles if stop is None else min(stop, self.n_particles)
+        row_bytes = 8 * max(len(set(self.columns) | set(self.where)), 1)
+        # 切片与筛选后的副本各占一份
+        self.batch_size = max(int(memory_budget // (2 * row_bytes)), 1)
+
+    def _column(self, col):
+        """返回列的（内存映射）数组，只在首次访问时建立映射"""
+        if col in POSITION_COLUMNS:
+            return self._grid.data[POSITION_COLUMNS.index(col)]
+        return self._blocks[col].data
+
+    def _read(self, col, start, stop, rows=None):
+        values = self._column(col)[start:stop]
+        if rows is not None:
+            values = values[rows]
+        if col in POSITION_COLUMNS:
+            values = values / self.pos_unit
+        return np.asarray(values)
+
+    def _mask(self, start, stop, cache):
+        mask = None
+        for col, (lo, hi) in self.where.items():
+            values = cache[col] = self._read(col, start, stop)
+            cond = np.ones(len(values), dtype=bool) if mask is None else mask
+            if lo is not None:
+                cond &= values >= lo
+            if hi is not None:
+                cond &= values <= hi
+            mask = cond
+        return mask
+
+    @traced(cat="load")
+    def read(self, columns=None, rows=None):
+        """
+        一次读取整列（或指定行），不分批。
+
+        参数:
+        - columns: tuple of str 或 None，默认为 self.columns
+        - rows: 整数索引数组或 None，只读取这些行（内存映射上只会读入相应的页）
+
+        返回:
+        - dict，列名 -> 一维数组
+        """
+        columns = self.columns if columns is None else columns
+        return {col: self._read(col, 0, self.n_particles, rows) for col in columns}
+
+    def __len__(self):
+        """批数（不考虑筛选）"""
+        return -(-max(self.stop - self.start, 0) // self.batch_size)
+
+    def __iter__(self):
+        for start in range(self.start, self.stop, self.batch_size):
+            stop = min(start + self.batch_size, self.stop)
+            cache = {}
+            mask = self._mask(start, stop, cache)
+            rows = None
+            if mask is not None:
+                if not mask.any():
+                    continue
+                if not mask.all():
+                    rows = np.flatnonzero(mask)
+            batch = {}
+            for col in self.columns:
+                if col in cache:
+                    batch[col] = cache[col] if rows is None else cache[col][rows]
+                else:
+                    batch[col] = self._read(col, start, stop, rows)
+            yield batch
+
+    def count(self):
+        """满足筛选条件的粒子数（只读取筛选列）"""
+        if not self.where:
+            return max(self.stop - self.start, 0)
+        total = 0
+        for start in range(self.start, self.stop, self.batch_size):
+            total += int(np.count_nonzero(self._mask(start, min(start + self.batch_size, self.stop), {})))
+        return total
+
+
+def iter_particles(file_path, species="Photon", columns=None, where=None,
+                   memory_budget=DEFAULT_BUDGET, pos_unit=1e-6):
+    """
+    逐批产出粒子数据，参数含义同 ParticleReader。
+
+    产出:
+    - batch: dict，列名 -> 一维数组
+    """
+    return iter(ParticleReader(file_path, species, columns, where, memory_budget, pos_unit))
@@ -0,0 +1,244 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from .particle_iter import ParticleReader, COLUMNS
+from .instrument import traced
+
+TRACK_INDEX_VERSION = 1
+TRACK_INDEX_DIR = ".epoch_tracks"
+
+
+def join_by_id(left, right, on="id", how="inner"):
+    """
+    按粒子 ID 对齐两组列数据（排序 + searchsorted 连接）。
+
+    参数:
+    - left, right: dict，列名 -> 一维数组，均须包含 on 列；同名列以 left 为准
+    - on: str，ID 列名
+    - how: 'inner' 只保留两侧都有的粒子，'left' 保留 left 的全部粒子（缺失值为 NaN）
+
+    返回:
+    - dict，按 left 的顺序排列的合并列
+    """
+    if how not in ("inner", "left"):
+        raise ValueError(f"不支持的连接方式：{how}，可选值为 ['inner', 'left']")
+    left_ids = np.asarray(left[on])
+    right_ids = np.asarray(right[on])
+    order = np.argsort(right_ids, kind="stable")
+    sorted_ids = right_ids[order]
+
+    if len(sorted_ids) == 0:
+        found = np.zeros(len(left_ids), dtype=bool)
+        right_rows = np.zeros(len(left_ids), dtype=np.intp)
+    else:
+        pos = np.minimum(np.searchsorted(sorted_ids, left_ids), len(sorted_ids) - 1)
+        found = sorted_ids[pos] == left_ids
+        right_rows = order[pos]
+
+    if how == "inner":
+        keep = np.flatnonzero(found)
+        merged = {col: np.asarray(values)[keep] for col, values in left.items()}
+        for col, values in right.items():
+            if col not in merged:
+                merged[col] = np.asarray(values)[right_rows[keep]]
+        return merged
+
+    merged = {col: np.asarray(values) for col, values in left.items()}
+    for col, values in right.items():
+        if col in merged:
+            continue
+        out = np.full(len(left_ids), np.nan)
+        out[found] = np.asarray(values)[right_rows[found]]
+        merged[col] = out
+    return merged
+
+
+@traced(cat="load")
+def particle_table(idall_path, weight_path=None, species="Photon", columns=None, how="inner"):
+    """
+    读取 idall 输出中的位置与动量，并按粒子 ID 与 weight 输出中的权重对齐。
+
+    参数:
+    - idall_path: str，idall SDF 文件路径
+    - weight_path: str 或 None，weight SDF 文件路径，None 时只使用 idall 中已有的列
+    - species: str，'Photon' 或 'Electron'
+    - columns: tuple of str 或 None，idall 中要读取的列（自动包含 id），None 为全部可用列
+    - how: 'inner' 或 'left'，见 join_by_id
+
+    返回:
+    - table: pandas.DataFrame，每个粒子一行，列为 x, y, z（μm）、px, py, pz、weight、id 中的可用部分
+    """
+    reader = ParticleReader(idall_path, species)
+    columns = tuple(columns) if columns is not None else reader.available
+    if "id" not in columns:
+        columns += ("id",)
+    if "id" not in reader.available:
+        raise ValueError(f"{idall_path} 中没有 {species} 的粒子 ID，无法按 ID 对齐")
+    table = reader.read(columns)
+
+    if weight_path is not None:
+        weights = ParticleReader(weight_path, species)
+        if "id" not in weights.available or "weight" not in weights.available:
+            raise ValueError(f"{weight_path} 中缺少 {species} 的 ID 或权重")
+        table.pop("weight", None)
+        table = join_by_id(table, weights.read(("id", "weight")), how=how)
+
+    ordered = [c for c in COLUMNS if c in table]
+    return pd.DataFrame({c: table[c] for c in ordered})
+
+
+class TrackIndex:
+    """
+    一系列 idall 输出的持久化粒子 ID 索引，用于提取被追踪粒子的轨迹。
+
+    每个输出只需扫描一次 ID 列，排序后的 ID 与对应行号保存为 .npy；
+    之后提取任意粒子的轨迹时，只对每个输出做 searchsorted 并按行号读取所需的值，
+    不再扫描整个文件。索引是增量的：大小与 mtime 未变化的输出不会重新扫描。
+
+    用法:
+        tracks = TrackIndex(run_dir, 'Electron')
+        traj = tracks.trajectories(ids[:1000])
+
+    参数:
+    - run_dir: str，运行目录
+    - species: str，'Photon' 或 'Electron'
+    - file_prefix: str，文件名前缀，默认 'idall'
+    - index_dir: str 或 None，索引目录，默认 run_dir/.epoch_tracks/<prefix>_<species>
+    - verbose: bool，是否打印扫描进度
+    """
+
+    def __init__(self, run_dir, species="Photon", file_prefix="idall", index_dir=None, verbose=False):
+        self.run_dir = os.path.abspath(run_dir)
+        self.species = species
+        self.file_prefix = file_prefix
+        self.index_dir = index_dir or os.path.join(self.run_dir, TRACK_INDEX_DIR, f"{file_prefix}_{species}")
+        self.verbose = verbose
+        self.entries = {}
+        self._load()
+        self.update()
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.index_dir, "index.json")
+
+    def _load(self):
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") == TRACK_INDEX_VERSION:
+            self.entries = meta["entries"]
+
+    def _save(self):
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": TRACK_INDEX_VERSION, "run_dir": self.run_dir, "entries": self.entries},
+                      f, ensure_ascii=False)
+        os.replace(tmp, self._meta_path)
+
+    def update(self):
+        """
+        增量更新索引：扫描新增或被修改的输出，移除已删除的输出。
+
+        返回:
+        - changed: list of str，本次重新索引的文件名
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        pattern = re.compile(rf"^{re.escape(self.file_prefix)}(\d+)\.sdf$")
+        changed, present = [], set()
+        for fname in sorted(os.listdir(self.run_dir)):
+            m = pattern.match(fname)
+            if not m:
+                continue
+            present.add(fname)
+            path = os.path.join(self.run_dir, fname)
+            st = os.stat(path)
+            old = self.entries.get(fname)
+            if old is not None and old["size"] == st.st_size and old["mtime"] == st.st_mtime_ns:
+                continue
+            try:
+                reader = ParticleReader(path, self.species, columns=("id",))
+            except ValueError as e:
+                print(f"跳过 {fname}：{e}")
+                continue
+            ids = reader.read()["id"].astype(np.int64)
+            order = np.argsort(ids, kind="stable")
+            stem = os.path.splitext(fname)[0]
+            np.save(os.path.join(self.index_dir, f"{stem}.ids.npy"), ids[order])
+            np.save(os.path.join(self.index_dir, f"{stem}.rows.npy"), order.astype(np.int64))
+            step, time = reader.header.get("step"), reader.header.get("time")
+            self.entries[fname] = {
+                "number": int(m.group(1)), "size": st.st_size, "mtime": st.st_mtime_ns, "count": int(len(ids)),
+                "step": None if step is None else int(step), "time": None if time is None else float(time),
+            }
+            changed.append(fname)
+            if self.verbose:
+                print(f"已索引 {fname}（{len(ids)} 个粒子）")
+
+        removed = set(self.entries) - present
+        for fname in removed:
+            del self.entries[fname]
+        if changed or removed or not os.path.exists(self._meta_path):
+            self._save()
+        return changed
+
+    @property
+    def files(self):
+        """按编号排序的已索引文件名"""
+        return sorted(self.entries, key=lambda f: self.entries[f]["number"])
+
+    def locate(self, fname, ids):
+        """
+        在一个输出中查找粒子所在的行号。
+
+        返回:
+        - rows: ndarray，与 ids 等长，不存在的粒子为 -1
+        """
+        stem = os.path.splitext(fname)[0]
+        sorted_ids = np.load(os.path.join(self.index_dir, f"{stem}.ids.npy"), mmap_mode="r")
+        order = np.load(os.path.join(self.index_dir, f"{stem}.rows.npy"), mmap_mode="r")
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(sorted_ids) == 0:
+            return np.full(len(ids), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        return np.where(sorted_ids[pos] == ids, order[pos], -1)
+
+    def trajectories(self, ids, columns=("x", "y", "z", "px", "py", "pz"), file_numbers=None):
+        """
+        提取一组粒子在各输出中的轨迹。
+
+        参数:
+        - ids: 一维整数数组，要追踪的粒子 ID
+        - columns: tuple of str，要读取的列
+        - file_numbers: 可迭代的文件编号或 None（全部已索引的输出）
+
+        返回:
+        - table: pandas.DataFrame，长表格式，按 (id, number) 排序，列为 number、step、time、id 与 columns；
+          某输出中不存在的粒子不出现在该输出的行中
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        wanted = None if file_numbers is None else set(file_numbers)
+        frames = []
+        for fname in self.files:
+            entry = self.entries[fname]
+            if wanted is not None and entry["number"] not in wanted:
+                continue
+            rows = self.locate(fname, ids)
+            hit = rows >= 0
+            if not hit.any():
+                continue
+            # 按行号升序读取，内存映射上的访问更连续
+            order = np.argsort(rows[hit])
+            reader = ParticleReader(os.path.join(self.run_dir, fname), self.species, columns=columns)
+            values = reader.read(rows=rows[hit][order])
+            frame = {"number": entry["number"], "step": entry["step"], "time": entry["time"],
+                     "id": ids[hit][order]}
+            frame.update(values)
+            frames.append(pd.DataFrame(frame))
+        if not frames:
+            return pd.DataFrame(columns=["number", "step", "time", "id", *columns])
+        return pd.concat(frames).sort_values(["id", "number"], kind="stable").reset_index(drop=True)
@@ -0,0 +1,153 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .sdf_lazy import LazySDF
+from .instrument import traced
+
+DEFAULT_VARIABLES = ("Electric_Field_Ex", "Electric_Field_Ey", "Electric_Field_Ez")
+
+
+def probe_indices(file_path, probes, coords='index'):
+    """
+    将探针位置转换为网格索引。
+
+    参数:
+    - file_path: str，用于读取坐标的 SDF 文件
+    - probes: 探针列表，每个元素为 (i, j[, k]) 索引或 (x, y[, z]) 坐标
+    - coords: 'index' 表示 probes 为网格索引，'um' 表示坐标（单位：μm），取最近网格点
+
+    返回:
+    - idx: ndarray，形状 (n_probes, ndim) 的整数索引
+    """
+    probes = np.atleast_2d(np.asarray(probes))
+    if coords == 'index':
+        return probes.astype(np.intp)
+    if coords != 'um':
+        raise ValueError(f"不支持的坐标类型：{coords}，可选值为 ['index', 'um']")
+
+    axes = [np.asarray(a) / 1e-6 for a in LazySDF(file_path).Grid_Grid_mid.data]
+    idx = np.empty(probes.shape, dtype=np.intp)
+    for d in range(probes.shape[1]):
+        idx[:, d] = np.abs(axes[d][None, :] - probes[:, d, None]).argmin(axis=1)
+    return idx
+
+
+def _read_chunk(file_paths, variables, idx):
+    """子进程任务：读取一组文件中所有探针点的值，返回 (数值, 文件是否存在)"""
+    out = np.full((len(file_paths), len(idx), len(variables)), np.nan)
+    found = np.zeros(len(file_paths), dtype=bool)
+    index = tuple(idx.T)
+    for n, file_path in enumerate(file_paths):
+        if not os.path.exists(file_path):
+            print(f"File {os.path.basename(file_path)} not found.")
+            continue
+        found[n] = True
+        data = LazySDF(file_path)
+        for c, name in enumerate(variables):
+            # 内存映射上的花式索引只会读入探针所在的页
+            out[n, :, c] = getattr(data, name).data[index]
+        data.release()
+    return out, found
+
+
+def _open_checkpoint(checkpoint, shape, key):
+    """
+    打开（或新建）断点文件：结果数组与已完成标记。
+
+    key（探针索引、变量名、文件路径）另存为 .json，与已有断点不一致时重新开始，
+    避免换了探针或文件范围后沿用旧的结果。
+    """
+    result_path = checkpoint + ".npy"
+    done_path = checkpoint + ".done.npy"
+    key_path = checkpoint + ".json"
+    if os.path.exists(result_path) and os.path.exists(done_path):
+        try:
+            with open(key_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = None
+        result = np.load(result_path, mmap_mode="r+")
+        done = np.load(done_path, mmap_mode="r+")
+        if saved == key and result.shape == shape and done.shape == shape[:1]:
+            return result, done
+        print(f"断点文件与当前的探针、变量或文件列表不一致，重新开始：{result_path}")
+        del result, done
+    result = np.lib.format.open_memmap(result_path, mode="w+", dtype=np.float64, shape=shape)
+    result[:] = np.nan
+    done = np.lib.format.open_memmap(done_path, mode="w+", dtype=bool, shape=shape[:1])
+    done[:] = False
+    result.flush()
+    done.flush()
+    with open(key_path, "w", encoding="utf-8") as f:
+        json.dump(key, f, ensure_ascii=False)
+    return result, done
+
+
+@traced(cat="load")
+def extract_probes(base_path, file_indices, probes, variables=DEFAULT_VARIABLES,
+                   file_prefix='field', file_suffix='.sdf', coords='index',
+                   n_workers=None, chunk_size=64, checkpoint=None):
+    """
+    从一系列 SDF 文件中并行提取探针点的时间序列（用于 FFT 分析）。
+
+    每个文件只读取探针所在的元素，不解析整个文件；结果写入预分配数组。
+    给定 checkpoint 时，结果与进度保存在磁盘上，中断后再次调用会跳过已完成的文件。
+
+    参数:
+    - base_path: str，数据目录
+    - file_indices: 可迭代的文件编号，如 range(0, 8001)
+    - probes: 探针列表，(i, j[, k]) 索引或 (x, y[, z]) 坐标（单位：μm）
+    - variables: tuple of str，要读取的变量名，如 ('Electric_Field_Ex_Core_TT', ...)
+    - file_prefix, file_suffix: str，文件名前后缀，文件名为 f"{prefix}{index:04d}{suffix}"
+    - coords: 'index' 或 'um'，probes 的含义
+    - n_workers: int 或 None，进程数，None 为 CPU 核数，1 为在当前进程串行
+    - chunk_size: int，每个任务处理的文件数
+    - checkpoint: str 或 None，断点文件路径前缀（生成 .npy、.done.npy 与记录探针、变量和文件列表的 .json）
+
+    返回:
+    - series: ndarray，形状 (n_files, n_probes, n_components)，缺失文件为 NaN
+    """
+    file_indices = list(file_indices)
+    file_paths = [os.path.join(base_path, f"{file_prefix}{i:04d}{file_suffix}") for i in file_indices]
+    first = next((p for p in file_paths if os.path.exists(p)), None)
+    if first is None:
+        raise FileNotFoundError(f"{base_path} 中没有找到 {file_prefix}****{file_suffix} 文件")
+    idx = probe_indices(first, probes, coords)
+
+    shape = (len(file_paths), len(idx), len(variables))
+    if checkpoint is not None:
+        key = {"probes": idx.tolist(), "variables": list(variables),
+               "files": [os.path.abspath(p) for p in file_paths]}
+        result, done = _open_checkpoint(checkpoint, shape, key)
+    else:
+        result = np.full(shape, np.nan)
+        done = np.zeros(shape[0], dtype=bool)
+
+    todo = np.flatnonzero(~done)
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    if len(todo) < len(file_paths):
+        print(f"从断点恢复：已完成 {len(file_paths) - len(todo)}/{len(file_paths)} 个文件")
+
+    def _store(rows, chunk):
+        # 缺失的文件不标记为完成，文件补齐后再次调用会重新读取
+        values, found = chunk
+        result[rows] = values
+        done[rows] = found
+        if checkpoint is not None:
+            result.flush()
+            done.flush()
+
+    if n_workers == 1:
+        for rows in chunks:
+            _store(rows, _read_chunk([file_paths[r] for r in rows], variables, idx))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = {pool.submit(_read_chunk, [file_paths[r] for r in rows], variables, idx): rows
+                       for rows in chunks}
+            for future in as_completed(futures):
+                _store(futures[future], future.result())
+
+    return np.array(result)
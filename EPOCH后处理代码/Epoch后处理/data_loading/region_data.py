@@ -0,0 +1,118 @@
+import numpy as np
+
+from .sdf_cache import get_sdf
+from .sdf_lazy import LazySDF, BLOCKTYPE_PLAIN_MESH
+from .memory import as_array, report_memory
+from .instrument import traced
+
+NC = 0.17419597124e28  # 临界密度，单位 m⁻³（对应 1 μm 波长）
+
+
+@traced(cat="select")
+def range_to_slice(axis, value_range):
+    """
+    将坐标范围 [min, max]（闭区间）转换为单调坐标轴上的索引切片。
+
+    参数:
+    - axis: ndarray，一维单调递增坐标
+    - value_range: tuple(min, max)、slice 或 None（全范围）
+
+    返回:
+    - slice，与 (axis >= min) & (axis <= max) 选中的元素一致
+    """
+    if value_range is None:
+        return slice(0, len(axis))
+    if isinstance(value_range, slice):
+        return slice(*value_range.indices(len(axis)))
+    start = int(np.searchsorted(axis, value_range[0], side="left"))
+    stop = int(np.searchsorted(axis, value_range[1], side="right"))
+    if stop <= start:
+        raise ValueError(f"范围 {tuple(value_range)} 内无数据")
+    return slice(start, stop)
+
+
+def grid_axes(file_path, name):
+    """
+    返回网格变量所在网格的中心坐标，只读取坐标轴，不读取变量本身。
+
+    参数:
+    - file_path: str，SDF 文件路径，也可以是已打开的数据对象
+    - name: str，变量名，如 'Derived_Number_Density_Photon'
+
+    返回:
+    - axes: tuple of ndarray，(x, y[, z])，单位 μm
+    """
+    data = get_sdf(file_path)
+    if isinstance(data, LazySDF):
+        block = getattr(data, name)
+        for mesh in data.blocks.values():
+            if mesh.blocktype == BLOCKTYPE_PLAIN_MESH and mesh.id == block.meshid:
+                mid = data.blocks.get(mesh.name + "_mid")
+                grid = mid if mid is not None and tuple(mid.dims) == tuple(block.dims) else mesh
+                return tuple(np.asarray(a) / 1e-6 for a in grid.data)
+    return tuple(np.asarray(a) / 1e-6 for a in data.Grid_Grid_mid.data)
+
+
+@traced(cat="load")
+@report_memory
+def load_region(file_path, name, x_range=None, y_range=None, z_range=None, slices=None, dtype=None, out=None):
+    """
+    只读取网格变量的一个子区域（hyperslab），并返回对应的坐标轴。
+
+    数据以内存映射方式访问，只有落在子区域内的字节会被读入内存；
+    SDF 按 Fortran 顺序存储，x 方向连续，因此 y、z 窄通道的读取量与子区域大小成正比。
+
+    参数:
+    - file_path: str，SDF 文件路径
+    - name: str，变量名，如 'Derived_Number_Density_Photon'
+    - x_range, y_range, z_range: tuple(min, max) 或 None，坐标范围（单位：μm，闭区间）
+    - slices: tuple of slice 或 None，直接按索引切片，给出时忽略坐标范围
+    - dtype: numpy dtype 或 None，结果类型，类型转换在读取时完成，None 为保持文件中的类型
+    - out: ndarray 或 None，写入子区域数据的缓冲区（形状与子区域相同）
+
+    返回:
+    - sub: ndarray，子区域数据
+    - axes: tuple of ndarray，对应的坐标轴 (x, y[, z])，单位 μm
+    """
+    data = get_sdf(file_path)
+    arr = getattr(data, name).data
+    axes = grid_axes(data, name)
+
+    if slices is None:
+        ranges = (x_range, y_range, z_range)[:arr.ndim]
+        slices = tuple(range_to_slice(a, r) for a, r in zip(axes, ranges))
+    else:
+        slices = tuple(range_to_slice(a, s) for a, s in zip(axes, slices))
+
+    sub = as_array(arr[slices], dtype, True, out)
+    return sub, tuple(a[s] for a, s in zip(axes, slices))
+
+
+@traced(cat="load")
+def load_ne_region(file_path, species='Photon', x_range=None, y_range=None, z_range=None, slices=None,
+                   dtype=None, out=None):
+    """
+    读取指定区域内的归一化数密度（单位：ne / nc），参数含义同 load_region。
+
+    返回:
+    - ne: ndarray，子区域归一化密度
+    - axes: tuple of ndarray，坐标轴，单位 μm
+    """
+    ne, axes = load_region(file_path, f"Derived_Number_Density_{species}",
+                           x_range, y_range, z_range, slices, dtype, out)
+    ne /= NC
+    return ne, axes
+
+
+@traced(cat="load")
+def load_ek_region(file_path, species='Photon', x_range=None, y_range=None, z_range=None, slices=None,
+                   dtype=None, out=None):
+    """
+    读取指定区域内的平均粒子能量（单位：J），参数含义同 load_region。
+
+    返回:
+    - ek: ndarray，子区域平均能量
+    - axes: tuple of ndarray，坐标轴，单位 μm
+    """
+    return load_region(file_path, f"Derived_Average_Particle_Energy_{species}",
+                       x_range, y_range, z_range, slices, dtype, out)
@@ -0,0 +1,436 @@
+import argparse
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# 缓存目录、字节预算与开关，可用环境变量覆盖；默认关闭，EPOCH_RESULT_CACHE=1 时开启
+DEFAULT_CACHE_DIR = os.environ.get("EPOCH_RESULT_CACHE_DIR",
+                                   os.path.join(os.path.expanduser("~"), ".cache", "epoch_results"))
+DEFAULT_MAX_BYTES = int(os.environ.get("EPOCH_RESULT_CACHE_BYTES", 2 * 1024 ** 3))
+ENABLED = os.environ.get("EPOCH_RESULT_CACHE", "0") == "1"
+
+# 内存中的数组超过此大小时不计算内容哈希，直接调用原函数
+MAX_HASH_BYTES = 64 * 1024 ** 2
+_HASH_CHUNK = 16 * 1024 ** 2
+
+# (路径, 大小, mtime) -> 文件内容哈希，同一进程中每个文件版本只计算一次
+_CONTENT_HASHES = {}
+# (源文件, 大小, mtime) -> 模块源码哈希
+_SOURCE_HASHES = {}
+
+
+class Uncacheable(Exception):
+    """参数无法生成稳定的键，或返回值无法存为 .npz"""
+
+
+def _file_identity(path, hash_content):
+    """文件标识：(绝对路径, 大小, mtime[, 内容哈希])"""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    ident = [path, st.st_size, st.st_mtime_ns]
+    if hash_content:
+        key = tuple(ident)
+        if key not in _CONTENT_HASHES:
+            h = hashlib.blake2b(digest_size=16)
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+                    h.update(chunk)
+            _CONTENT_HASHES[key] = h.hexdigest()
+        ident.append(_CONTENT_HASHES[key])
+    return ident
+
+
+def _array_key(arr, hash_content):
+    """数组的键：只读内存映射数组用文件标识与视图位置，其他数组（含可写映射）用内容哈希"""
+    geometry = [arr.dtype.str, list(arr.shape), list(arr.strides)]
+    if isinstance(arr, np.memmap) and getattr(arr, "filename", None) and not arr.flags.writeable:
+        root = arr
+        while isinstance(root.base, np.ndarray):
+            root = root.base
+        offset = root.offset + arr.__array_interface__["data"][0] - root.__array_interface__["data"][0]
+        return ["memmap", _file_identity(arr.filename, hash_content), offset] + geometry
+    if arr.nbytes > MAX_HASH_BYTES:
+        raise Uncacheable(f"内存中的数组过大（{arr.nbytes} 字节），不计算内容哈希")
+    if arr.dtype.hasobject:
+        raise Uncacheable("不支持 object 类型的数组")
+    h = hashlib.blake2b(np.ascontiguousarray(arr).view(np.uint8), digest_size=16)
+    return ["array", h.hexdigest()] + geometry
+
+
+def _key_part(value, hash_content, depth=0):
+    """把参数转换为可 JSON 序列化、内容稳定的结构"""
+    if depth > 8:
+        raise Uncacheable("参数嵌套过深")
+    if value is None or isinstance(value, (bool, int, float, str)):
+        if isinstance(value, str) and os.path.isfile(value):
+            return ["file", _file_identity(value, hash_content)]
+        return value
+    if isinstance(value, os.PathLike):
+        return _key_part(os.fspath(value), hash_content, depth + 1)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return _array_key(value, hash_content)
+    if isinstance(value, slice):
+        return ["slice", value.start, value.stop, value.step]
+    if isinstance(value, (tuple, list)):
+        return [type(value).__name__] + [_key_part(v, hash_content, depth + 1) for v in value]
+    if isinstance(value, dict):
+        return ["dict"] + [[str(k), _key_part(v, hash_content, depth + 1)]
+                           for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))]
+    if hasattr(value, "__dict__"):
+        # 普通对象（如 RegionSelector、RadialBins）按类名与属性区分
+        return ["object", type(value).__qualname__, _key_part(vars(value), hash_content, depth + 1)]
+    raise Uncacheable(f"无法为 {type(value).__name__} 类型的参数生成键")
+
+
+def _source_hash(func):
+    """函数所在模块的源码哈希：同一模块中的辅助函数（如 _merge、RadialBins.__init__）改动时键也随之变化"""
+    path = func.__code__.co_filename
+    try:
+        st = os.stat(path)
+    except OSError:
+        return ""
+    key = (path, st.st_size, st.st_mtime_ns)
+    if key not in _SOURCE_HASHES:
+        with open(path, "rb") as f:
+            _SOURCE_HASHES[key] = hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+    return _SOURCE_HASHES[key]
+
+
+def _code_version(func, version):
+    code = func.__code__
+    h = hashlib.blake2b(code.co_code, digest_size=8)
+    h.update(repr(code.co_consts).encode())
+    return f"{version}:{h.hexdigest()}:{_source_hash(func)}"
+
+
+# ---------------------------------------------------------------- 结果的 .npz 编码
+
+def _encode(value, arrays):
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            raise Uncacheable("不支持缓存 object 类型的数组")
+        name = f"a{len(arrays)}"
+        arrays[name] = value
+        return {"t": "a", "k": name}
+    if isinstance(value, np.generic):
+        # numpy 标量存为 0 维数组，命中时返回同一类型（如 np.float64），与直接计算一致
+        if value.dtype.hasobject:
+            raise Uncacheable("不支持缓存 object 类型的标量")
+        name = f"a{len(arrays)}"
+        arrays[name] = np.asarray(value)
+        return {"t": "s", "k": name}
+    if isinstance(value, pd.DataFrame):
+        return {"t": "df", "columns": [str(c) for c in value.columns],
+                "items": [_encode(value[c].to_numpy(), arrays) for c in value.columns],
+                "index": _encode(value.index.to_numpy(), arrays)}
+    if isinstance(value, (tuple, list)):
+        return {"t": type(value).__name__, "items": [_encode(v, arrays) for v in value]}
+    if isinstance(value, dict):
+        if not all(isinstance(k, str) for k in value):
+            raise Uncacheable("只支持以字符串为键的 dict")
+        return {"t": "dict", "keys": list(value), "items": [_encode(v, arrays) for v in value.values()]}
+    return {"t": "v", "v": _encode_plain(value)}
+
+
+def _encode_plain(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    raise Uncacheable(f"不支持缓存 {type(value).__name__} 类型的返回值")
+
+
+def _decode(layout, arrays):
+    t = layout["t"]
+    if t == "a":
+        return arrays[layout["k"]]
+    if t == "s":
+        return arrays[layout["k"]][()]
+    if t == "v":
+        return layout["v"]
+    if t == "df":
+        columns = [_decode(item, arrays) for item in layout["items"]]
+        return pd.DataFrame(dict(zip(layout["columns"], columns)), index=_decode(layout["index"], arrays))
+    items = [_decode(item, arrays) for item in layout["items"]]
+    if t == "tuple":
+        return tuple(items)
+    if t == "list":
+        return items
+    return dict(zip(layout["keys"], items))
+
+
+class ResultCache:
+    """
+    派生分析结果的磁盘缓存（内容寻址，按字节预算 LRU 淘汰）。
+
+    键由输入文件标识（路径、大小、mtime，可选内容哈希）、函数名、参数与代码版本
+    （函数字节码与所在模块的源码哈希，另加 version）共同决定；
+    内存映射的 SDF 变量按所在文件与视图位置区分，不需要读取数据。
+    每个结果保存为一个压缩的 .npz 文件，命中时更新其修改时间，超出预算时删除最久未使用的条目。
+    共享的 result_cache 默认关闭，需设置环境变量 EPOCH_RESULT_CACHE=1 或 result_cache.enabled = True。
+
+    参数:
+    - cache_dir: str，缓存目录
+    - max_bytes: int，缓存占用的字节上限
+    - enabled: bool，False 时被装饰的函数直接计算（默认由 EPOCH_RESULT_CACHE 决定）
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, enabled=ENABLED):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_bytes)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.uncacheable = 0
+        self.time_saved = 0.0
+
+    def _entry_path(self, func_name, key):
+        digest = hashlib.blake2b(json.dumps(key, sort_keys=True).encode(), digest_size=20).hexdigest()
+        return os.path.join(self.cache_dir, f"{func_name}-{digest}.npz")
+
+    def load(self, path):
+        """读取一个条目，返回 (结果, 元数据)；不存在或已损坏时返回 None"""
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                meta = json.loads(str(npz["__meta__"]))
+                arrays = {k: npz[k] for k in npz.files if k != "__meta__"}
+        except (OSError, ValueError, KeyError):
+            return None
+        return _decode(meta["layout"], arrays), meta
+
+    def store(self, path, result, meta):
+        arrays = {}
+        meta = dict(meta, layout=_encode(result, arrays))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez_compressed(tmp, __meta__=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, path)
+        with self._lock:
+            self.stores += 1
+        self.evict()
+
+    def entries(self):
+        """缓存中的条目，按最近使用时间从旧到新排列，每项为 (路径, 字节数, 最近使用时间)"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        items = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz") or name.endswith(".tmp.npz"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            items.append((path, st.st_size, st.st_mtime))
+        return sorted(items, key=lambda e: e[2])
+
+    @property
+    def nbytes(self):
+        """缓存目录中条目的总字节数"""
+        return sum(e[1] for e in self.entries())
+
+    def evict(self, max_bytes=None):
+        """删除最久未使用的条目，直到总大小不超过 max_bytes（默认为 self.max_bytes），返回删除的条目数"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(e[1] for e in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def prune(self, older_than=None, function=None):
+        """
+        删除部分条目。
+
+        参数:
+        - older_than: float 或 None，删除超过此秒数未使用的条目
+        - function: str 或 None，只删除该函数（名称前缀匹配）的条目
+
+        返回:
+        - removed: int，删除的条目数
+        """
+        now = time.time()
+        removed = 0
+        for path, _, used in self.entries():
+            if function is not None and not os.path.basename(path).startswith(function):
+                continue
+            if older_than is not None and now - used < older_than:
+                continue
+            os.remove(path)
+            removed += 1
+        return removed
+
+    def clear(self):
+        """删除全部条目"""
+        return self.prune()
+
+    def info(self):
+        """
+        返回本进程的缓存统计与缓存目录的占用情况。
+
+        返回:
+        - dict，包含 hits、misses、stores、evictions、uncacheable、time_saved（s）、
+          entries、nbytes、max_bytes、cache_dir
+        """
+        entries = self.entries()
+        return {
+            "hits": self.hits, "misses": self.misses, "stores": self.stores,
+            "evictions": self.evictions, "uncacheable": self.uncacheable,
+            "time_saved": self.time_saved,
+            "entries": len(entries), "nbytes": sum(e[1] for e in entries),
+            "max_bytes": self.max_bytes, "cache_dir": self.cache_dir,
+        }
+
+    def call(self, func, func_name, version, hash_content, args, kwargs):
+        """按缓存调用 func，见 cached_result"""
+        if not self.enabled:
+            return func(*args, **kwargs)
+        try:
+            bound = inspect.signature(func).bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = {"function": func_name, "version": _code_version(func, version),
+                   "arguments": {k: _key_part(v, hash_content) for k, v in bound.arguments.items()}}
+        except (Uncacheable, OSError):
+            with self._lock:
+                self.uncacheable += 1
+            return func(*args, **kwargs)
+
+        path = self._entry_path(func_name, key)
+        cached = self.load(path) if os.path.exists(path) else None
+        if cached is not None:
+            result, meta = cached
+            os.utime(path)
+            with self._lock:
+                self.hits += 1
+                self.time_saved += meta.get("elapsed", 0.0)
+            return result
+
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.misses += 1
+        try:
+            self.store(path, result, {"function": func_name, "elapsed": elapsed, "created": time.time()})
+        except Uncacheable:
+            with self._lock:
+                self.uncacheable += 1
+        return result
+
+
+# 进程级共享的结果缓存
+result_cache = ResultCache()
+
+
+def cached_result(func=None, version=1, hash_content=False, cache=None):
+    """
+    装饰器：将函数结果缓存到磁盘，参数与输入文件不变时直接读取上次的结果。
+    缓存关闭时（默认）直接调用原函数。
+
+    用法:
+        @cached_result(version=2)
+        def xsum_profile(ne, slices): ...
+
+    参数:
+    - version: int 或 str，代码版本；函数所在模块的源码变化时键会自动变化，
+      结果依赖的其他模块（如 data_loading 中的加载函数）改变了语义时需手动增加
+    - hash_content: bool，是否对输入文件计算内容哈希（更可靠，但需要读取整个文件）
+    - cache: ResultCache 或 None，默认为共享的 result_cache
+
+    返回值可以是数组、标量、字符串、tuple/list/dict（字符串键）的任意嵌套，或 pandas.DataFrame；
+    无法生成键或无法存储时照常计算，计入 uncacheable。
+    """
+    def decorate(f):
+        func_name = f"{f.__module__}.{f.__qualname__}".replace("<", "").replace(">", "")
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            return (cache or result_cache).call(f, func_name, version, hash_content, args, kwargs)
+
+        wrapper.uncached = f
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+def _format_bytes(n):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024 or unit == "GiB":
+            return f"{n:.1f} {unit}" if unit != "B" else f"{n} B"
+        n /= 1024
+
+
+def main(argv=None):
+    """命令行入口：python -m data_loading.result_cache {info,list,prune,clear}"""
+    parser = argparse.ArgumentParser(prog="python -m data_loading.result_cache",
+                                     description="查看与清理分析结果缓存")
+    parser.add_argument("--dir", default=DEFAULT_CACHE_DIR, help="缓存目录")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("info", help="条目数、占用与各函数的统计")
+    p_list = sub.add_parser("list", help="列出最近使用的条目")
+    p_list.add_argument("-n", type=int, default=20, help="显示的条目数")
+    p_prune = sub.add_parser("prune", help="按大小、时间或函数删除条目")
+    p_prune.add_argument("--max-bytes", type=float, default=None, help="淘汰最久未使用的条目直到不超过该大小")
+    p_prune.add_argument("--older-than", type=float, default=None, help="删除超过该天数未使用的条目")
+    p_prune.add_argument("--function", default=None, help="只删除该函数（名称前缀）的条目")
+    sub.add_parser("clear", help="删除全部条目")
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.dir)
+    if args.command == "info":
+        entries = cache.entries()
+        by_function = {}
+        for path, size, _ in entries:
+            name = os.path.basename(path).rsplit("-", 1)[0]
+            count, nbytes = by_function.get(name, (0, 0))
+            by_function[name] = (count + 1, nbytes + size)
+        print(f"缓存目录：{cache.cache_dir}")
+        print(f"条目：{len(entries)}，占用：{_format_bytes(sum(e[1] for e in entries))}"
+              f"（上限 {_format_bytes(cache.max_bytes)}）")
+        for name, (count, nbytes) in sorted(by_function.items()):
+            print(f"  {name}: {count} 个，{_format_bytes(nbytes)}")
+    elif args.command == "list":
+        now = time.time()
+        for path, size, used in reversed(cache.entries()[-args.n:]):
+            loaded = cache.load(path)
+            elapsed = loaded[1].get("elapsed", 0.0) if loaded else float("nan")
+            print(f"{os.path.basename(path)}  {_format_bytes(size):>10}  "
+                  f"{(now - used) / 3600:8.1f} h 前使用  计算耗时 {elapsed:.3f} s")
+    elif args.command == "prune":
+        removed = 0
+        if args.older_than is not None or args.function is not None:
+            older = None if args.older_than is None else args.older_than * 86400
+            removed += cache.prune(older, args.function)
+        if args.max_bytes is not None:
+            removed += cache.evict(int(args.max_bytes))
+        print(f"已删除 {removed} 个条目")
+    elif args.command == "clear":
+        print(f"已删除 {cache.clear()} 个条目")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .sdf_lazy import LazySDF
+from .instrument import traced
+
+# 默认缓存预算（字节），可用环境变量 EPOCH_SDF_CACHE_BYTES 覆盖
+DEFAULT_MAX_BYTES = int(os.environ.get("EPOCH_SDF_CACHE_BYTES", 4 * 1024 ** 3))
+
+# 打开文件的后端：'lazy'（默认，按需读取变量）或 'sdf_helper'（sh.getdata 整文件解析）
+SDF_BACKEND = os.environ.get("EPOCH_SDF_BACKEND", "lazy")
+
+
+@traced(cat="decode")
+def open_sdf(file_path):
+    """
+    按 SDF_BACKEND 打开 SDF 文件。
+
+    参数:
+    - file_path: str，SDF 文件路径
+
+    返回:
+    - data: LazySDF 或 sh.getdata 返回的对象，二者都支持 data.<变量名>.data 访问
+    """
+    if SDF_BACKEND == "sdf_helper":
+        import sdf_helper as sh
+        return sh.getdata(file_path)
+    return LazySDF(file_path)
+
+
+def _estimate_nbytes(data):
+    """
+    估算一个已打开 SDF 对象占用的内存（字节）。
+
+    参数:
+    - data: LazySDF 或 sh.getdata 返回的对象
+
+    返回:
+    - nbytes: int，已读取数据块 .data 数组的字节数之和
+    """
+    if isinstance(data, LazySDF):
+        return data.nbytes_loaded
+    nbytes = 0
+    for block in vars(data).values():
+        arr = getattr(block, "data", None)
+        if isinstance(arr, np.ndarray):
+            nbytes += arr.nbytes
+        elif isinstance(arr, (tuple, list)):
+            nbytes += sum(a.nbytes for a in arr if isinstance(a, np.ndarray))
+    return nbytes
+
+
+def _release(data):
+    """释放 LazySDF 已打开的内存映射；sh.getdata 的对象交给垃圾回收"""
+    if isinstance(data, LazySDF):
+        data.release()
+
+
+class SDFCache:
+    """
+    进程内共享的 SDF 文件句柄缓存（LRU，按字节预算淘汰）。
+
+    以 (绝对路径, mtime) 为键：文件被重新写入后 mtime 改变，旧句柄自动失效。
+    LazySDF 句柄的占用随变量被读取而增长，因此每次访问时按当前占用重新检查预算。
+    最近使用的一个句柄即使超出预算也会保留，保证对单个大文件的多次读取仍能命中。
+
+    参数:
+    - max_bytes: int，缓存占用的字节上限
+    - opener: callable，打开文件的函数，默认 open_sdf
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, opener=None):
+        self.max_bytes = int(max_bytes)
+        self.opener = opener if opener is not None else open_sdf
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # path -> (mtime, data)
+        self._lock = threading.RLock()
+
+    def get(self, file_path):
+        """
+        返回 file_path 对应的 SDF 对象，未缓存或文件已变化时重新打开。
+
+        参数:
+        - file_path: str，SDF 文件路径
+
+        返回:
+        - data: opener 返回的 SDF 对象
+        """
+        path = os.path.abspath(file_path)
+        mtime = os.stat(path).st_mtime_ns
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == mtime:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                self._evict()
+                return entry[1]
+            self.misses += 1
+
+        data = self.opener(path)
+
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None and old[1] is not data:
+                _release(old[1])
+            self._entries[path] = (mtime, data)
+            self._evict()
+        return data
+
+    def _evict(self):
+        while len(self._entries) > 1 and self.nbytes > self.max_bytes:
+            _, (_, data) = self._entries.popitem(last=False)
+            _release(data)
+            self.evictions += 1
+
+    @property
+    def nbytes(self):
+        """当前缓存占用的字节数"""
+        return sum(_estimate_nbytes(data) for _, data in self._entries.values())
+
+    def set_max_bytes(self, max_bytes):
+        """调整字节预算，并立即按新预算淘汰"""
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._evict()
+
+    def invalidate(self, file_path=None):
+        """
+        使缓存失效。
+
+        参数:
+        - file_path: str 或 None，指定文件则只移除该文件，None 则清空全部
+
+        被移除的 LazySDF 会释放其内存映射；调用方已取得的数组不受影响。
+        """
+        with self._lock:
+            if file_path is None:
+                entries = list(self._entries.values())
+                self._entries.clear()
+            else:
+                entry = self._entries.pop(os.path.abspath(file_path), None)
+                entries = [entry] if entry is not None else []
+        for _, data in entries:
+            _release(data)
+
+    def close(self):
+        """清空缓存（释放已打开的内存映射）并重置计数器"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            for _, data in entries:
+                _release(data)
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        """
+        返回缓存统计信息。
+
+        返回:
+        - dict，包含 hits, misses, evictions, entries, nbytes, max_bytes
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "nbytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# 进程级共享缓存，所有 load_* 函数都通过它读取文件
+sdf_cache = SDFCache()
+
+
+def get_sdf(file_path):
+    """
+    通过共享缓存打开 SDF 文件，替代直接调用 sh.getdata。
+    默认返回 LazySDF：只有被访问的变量才会从磁盘读取。
+
+    参数:
+    - file_path: str，SDF 文件路径；也可以是已打开的数据对象（如 ArrayStore 中的输出），原样返回
+
+    返回:
+    - data: SDF 数据对象
+    """
+    if not isinstance(file_path, (str, os.PathLike)):
+        return file_path
+    return sdf_cache.get(file_path)
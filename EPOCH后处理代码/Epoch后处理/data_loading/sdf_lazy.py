@@ -0,0 +1,300 @@
+import os
+import re
+import struct
+
+import numpy as np
+
+from .instrument import traced
+
+# SDF 文件格式常量（参见 EPOCH SDF/FORTRAN/src/sdf_common.f90）
+SDF_MAGIC = b"SDF1"
+SDF_ENDIANNESS = 16911887
+ID_LENGTH = 32
+
+BLOCKTYPE_PLAIN_MESH = 1
+BLOCKTYPE_POINT_MESH = 2
+BLOCKTYPE_PLAIN_VARIABLE = 3
+BLOCKTYPE_POINT_VARIABLE = 4
+BLOCKTYPE_CONSTANT = 5
+BLOCKTYPE_ARRAY = 6
+BLOCKTYPE_PLAIN_DERIVED = 14
+BLOCKTYPE_POINT_DERIVED = 15
+
+_DATATYPES = {
+    1: "i4",
+    2: "i8",
+    3: "f4",
+    4: "f8",
+    6: "S1",
+    7: "u1",
+}
+
+
+def sdf_varname(name):
+    """
+    将 SDF 块名转换为 sdf_helper 使用的属性名，
+    如 'Derived/Number_Density/Photon' -> 'Derived_Number_Density_Photon'
+    """
+    return re.sub(r"[^0-9A-Za-z_]", "_", name)
+
+
+def _decode(raw):
+    return raw.split(b"\x00", 1)[0].decode("latin-1").strip()
+
+
+class _Reader:
+    """按给定字节序顺序解析一段二进制元数据"""
+
+    def __init__(self, buf, endian):
+        self.buf = buf
+        self.pos = 0
+        self.endian = endian
+
+    def unpack(self, fmt, count=None):
+        """count 为 None 时返回标量，否则返回长度为 count 的元组"""
+        fmt = f"{self.endian}{count or 1}{fmt}"
+        values = struct.unpack_from(fmt, self.buf, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return values if count is not None else values[0]
+
+    def ids(self, count=None):
+        values = tuple(_decode(self.buf[self.pos + i * ID_LENGTH:self.pos + (i + 1) * ID_LENGTH])
+                       for i in range(count or 1))
+        self.pos += (count or 1) * ID_LENGTH
+        return values if count is not None else values[0]
+
+
+class LazyBlock:
+    """
+    SDF 数据块的惰性句柄：打开文件时只解析块头与元数据，
+    第一次访问 .data 时才以只读内存映射方式读取数据，需要修改时请显式复制。
+
+    属性:
+    - name: str，sdf_helper 风格的变量名
+    - id: str，块 ID
+    - blocktype: int，SDF 块类型
+    - dtype: numpy.dtype，数据类型
+    - dims: tuple，网格变量的形状；网格为各轴长度；粒子数据为 (npoints,)
+    - units, meshid: str，单位与所属网格
+    """
+
+    def __init__(self, file_path, name, block_id, blocktype, dtype, ndims,
+                 data_location, data_length):
+        self.file_path = file_path
+        self.name = name
+        self.id = block_id
+        self.blocktype = blocktype
+        self.dtype = dtype
+        self.ndims = ndims
+        self.data_location = data_location
+        self.data_length = data_length
+        self.dims = ()
+        self.units = ""
+        self.meshid = ""
+        self.extents = None
+        self.value = None
+        self._data = None
+
+    def __repr__(self):
+        return f"<LazyBlock {self.name} dims={self.dims} dtype={self.dtype}>"
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    @property
+    def nbytes(self):
+        """已读取数据的字节数，未读取时为 0"""
+        if self._data is None:
+            return 0
+        if isinstance(self._data, tuple):
+            return sum(a.nbytes for a in self._data)
+        return getattr(self._data, "nbytes", 0)
+
+    def _memmap(self, offset, shape, order="C"):
+        return np.memmap(self.file_path, dtype=self.dtype, mode="r",
+                         offset=offset, shape=shape, order=order)
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self._read()
+        return self._data
+
+    def _read(self):
+        if self.blocktype == BLOCKTYPE_CONSTANT:
+            return self.value
+        if self.dtype is None:
+            return None
+
+        if self.blocktype == BLOCKTYPE_PLAIN_MESH:
+            # 各轴坐标依次连续存放
+            axes, offset = [], self.data_location
+            for n in self.dims:
+                axes.append(self._memmap(offset, (n,)))
+                offset += n * self.dtype.itemsize
+            return tuple(axes)
+
+        if self.blocktype == BLOCKTYPE_POINT_MESH:
+            # x[npoints], y[npoints], z[npoints] 依次连续存放
+            npoints = self.dims[0]
+            return tuple(self._memmap(self.data_location + i * npoints * self.dtype.itemsize, (npoints,))
+                         for i in range(self.ndims))
+
+        # 网格变量为 Fortran 顺序（x 变化最快）
+        return self._memmap(self.data_location, self.dims, order="F")
+
+    def release(self):
+        """释放已读取的数据（内存映射随之关闭）"""
+        self._data = None
+
+
+class _MidGridBlock(LazyBlock):
+    """由节点网格派生的网格中心坐标块，对应 sdf_helper 的 Grid_Grid_mid"""
+
+    def __init__(self, node_block):
+        super().__init__(node_block.file_path, node_block.name + "_mid", node_block.id + "_mid",
+                         node_block.blocktype, node_block.dtype, node_block.ndims,
+                         node_block.data_location, node_block.data_length)
+        self.node_block = node_block
+        self.dims = tuple(max(n - 1, 0) for n in node_block.dims)
+        self.units = node_block.units
+
+    def _read(self):
+        return tuple(0.5 * (a[1:] + a[:-1]) for a in self.node_block.data)
+
+
+class LazySDF:
+    """
+    惰性 SDF 数据集：打开时只读取文件头与各块的块头/元数据，
+    变量数据在第一次访问时才从磁盘映射，峰值内存只与实际用到的变量有关。
+
+    用法与 sh.getdata 返回的对象一致，例如:
+        data = LazySDF(file_path)
+        ne = data.Derived_Number_Density_Photon.data
+
+    参数:
+    - file_path: str，SDF 文件路径
+    """
+
+    def __init__(self, file_path):
+        self.file_path = os.path.abspath(file_path)
+        self.blocks = {}
+        self.header = {}
+        self._parse()
+
+    @traced(cat="decode", name="LazySDF.parse")
+    def _parse(self):
+        with open(self.file_path, "rb") as f:
+            head = f.read(128)
+            if head[:4] != SDF_MAGIC:
+                raise ValueError(f"不是有效的 SDF 文件：{self.file_path}")
+            endian = "<" if struct.unpack_from("<i", head, 4)[0] == SDF_ENDIANNESS else ">"
+            r = _Reader(head, endian)
+            r.pos = 8
+            version, revision = r.unpack("i", 2)
+            code_name = r.ids()
+            first_block_location, summary_location = r.unpack("q", 2)
+            summary_size, nblocks, block_header_length, step = r.unpack("i", 4)
+            time = r.unpack("d")
+            jobid1, jobid2, string_length, code_io_version = r.unpack("i", 4)
+            self.header = {
+                "file_version": version,
+                "file_revision": revision,
+                "code_name": code_name,
+                "step": step,
+                "time": time,
+                "jobid1": jobid1,
+                "jobid2": jobid2,
+                "code_io_version": code_io_version,
+                "nblocks": nblocks,
+            }
+
+            location = first_block_location
+            for _ in range(nblocks):
+                f.seek(location)
+                raw = f.read(block_header_length)
+                r = _Reader(raw, endian)
+                next_location, data_location = r.unpack("q", 2)
+                block_id = r.ids()
+                data_length = r.unpack("q")
+                blocktype, datatype, ndims = r.unpack("i", 3)
+                name = _decode(raw[r.pos:r.pos + string_length])
+                r.pos += string_length
+                info_length = r.unpack("i")
+                info = f.read(info_length) if info_length > 0 else b""
+
+                dtype = _DATATYPES.get(datatype)
+                dtype = np.dtype(endian + dtype) if dtype else None
+                block = LazyBlock(self.file_path, sdf_varname(name), block_id, blocktype,
+                                  dtype, ndims, data_location, data_length)
+                self._parse_info(block, _Reader(info, endian))
+                self.blocks[block.name] = block
+                if blocktype == BLOCKTYPE_PLAIN_MESH and ndims > 0:
+                    mid = _MidGridBlock(block)
+                    self.blocks.setdefault(mid.name, mid)
+                location = next_location
+
+    def _parse_info(self, block, r):
+        nd = block.ndims
+        try:
+            if block.blocktype in (BLOCKTYPE_PLAIN_MESH, BLOCKTYPE_POINT_MESH):
+                r.unpack("d", nd)                       # mults
+                r.ids(nd)                               # labels
+                block.units = r.ids(nd)
+                r.unpack("i")                           # geometry
+                minval = r.unpack("d", nd)
+                maxval = r.unpack("d", nd)
+                block.extents = (minval, maxval)
+                if block.blocktype == BLOCKTYPE_PLAIN_MESH:
+                    block.dims = r.unpack("i", nd)
+                else:
+                    block.dims = (r.unpack("q"),)
+            elif block.blocktype in (BLOCKTYPE_PLAIN_VARIABLE, BLOCKTYPE_PLAIN_DERIVED):
+                r.unpack("d")                           # mult
+                block.units = r.ids()
+                block.meshid = r.ids()
+                block.dims = r.unpack("i", nd)
+            elif block.blocktype in (BLOCKTYPE_POINT_VARIABLE, BLOCKTYPE_POINT_DERIVED):
+                r.unpack("d")                           # mult
+                block.units = r.ids()
+                block.meshid = r.ids()
+                block.dims = (r.unpack("q"),)
+            elif block.blocktype == BLOCKTYPE_ARRAY:
+                block.dims = r.unpack("i", nd)
+            elif block.blocktype == BLOCKTYPE_CONSTANT and block.dtype is not None:
+                block.value = np.frombuffer(r.buf, dtype=block.dtype, count=1)[0]
+        except struct.error:
+            # 未知或截断的元数据：保留块名，数据不可读
+            block.dtype = None
+
+    def __getattr__(self, name):
+        blocks = self.__dict__.get("blocks", {})
+        if name in blocks:
+            return blocks[name]
+        raise AttributeError(f"SDF 文件中没有变量 {name}：{self.__dict__.get('file_path')}")
+
+    def __dir__(self):
+        return list(super().__dir__()) + list(self.blocks)
+
+    def __contains__(self, name):
+        return name in self.blocks
+
+    def keys(self):
+        """返回全部变量名"""
+        return list(self.blocks)
+
+    def list_variables(self):
+        """打印变量名、形状与数据类型（不读取数据），对应 sh.list_variables"""
+        for name, block in self.blocks.items():
+            print(f"{name} {block.dims} {block.dtype}")
+
+    @property
+    def nbytes_loaded(self):
+        """已读取（或已映射）的数据字节数"""
+        return sum(b.nbytes for b in self.blocks.values())
+
+    def release(self):
+        """释放所有已读取的数据"""
+        for block in self.blocks.values():
+            block.release()
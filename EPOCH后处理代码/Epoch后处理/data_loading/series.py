@@ -0,0 +1,164 @@
+import os
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .sdf_cache import open_sdf
+from .instrument import traced
+
+Frame = namedtuple("Frame", ["index", "path", "data", "header"])
+
+
+@traced(cat="load", name="DumpSeries.load")
+def _load_dump(file_path, variables):
+    """后台线程任务：打开文件并把所需变量读入内存，返回 (data, header, 耗时)"""
+    start = time.perf_counter()
+    if not os.path.exists(file_path):
+        return None, None, time.perf_counter() - start
+    sdf = open_sdf(file_path)
+    header = dict(getattr(sdf, "header", None) or {})
+    if variables is None:
+        data = sdf
+    else:
+        data = {}
+        for name in variables:
+            if not hasattr(sdf, name):
+                raise ValueError(f"{os.path.basename(file_path)} 中没有变量 {name}")
+            values = getattr(sdf, name).data
+            # 复制出内存映射，保证读盘发生在后台线程中
+            if isinstance(values, (tuple, list)):
+                data[name] = tuple(np.array(v) for v in values)
+            else:
+                data[name] = np.array(values)
+    return data, header, time.perf_counter() - start
+
+
+class DumpSeries:
+    """
+    按编号顺序遍历一系列输出，在处理当前输出的同时由后台线程预读后面的输出。
+
+    缓冲区最多保存 prefetch 个已读取或正在读取的输出，内存占用固定为约 prefetch + 1 个输出。
+    遍历结束后可用 stats() 查看预读命中率与等待读盘的时间，判断循环受限于计算还是磁盘。
+
+    用法:
+        series = DumpSeries('distfun{:04d}.sdf', range(1, 81), ['Grid_en_Photon', 'dist_fn_en_Photon'],
+                            base_path=base_path)
+        for frame in series:
+            E = frame.data['Grid_en_Photon'][0]
+            ...
+        series.report()
+
+    参数:
+    - pattern: str，文件名格式，如 'distfun{:04d}.sdf'，以编号调用 pattern.format(index)
+    - indices: 可迭代的文件编号
+    - variables: list of str 或 None，要读取的变量名；None 时产出打开后的 SDF 对象（lazy 后端下不预读数据）
+    - base_path: str 或 None，数据目录，None 时 pattern 为完整路径
+    - prefetch: int，预读的输出个数
+    - n_threads: int 或 None，读取线程数，默认等于 prefetch
+    """
+
+    def __init__(self, pattern, indices, variables=None, base_path=None, prefetch=2, n_threads=None):
+        if prefetch < 1:
+            raise ValueError("prefetch 应不小于 1")
+        self.pattern = pattern
+        self.indices = list(indices)
+        self.variables = None if variables is None else list(variables)
+        self.base_path = base_path
+        self.prefetch = int(prefetch)
+        self.n_threads = n_threads or self.prefetch
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.frames = 0
+        self.hits = 0
+        self.missing = 0
+        self.io_wait = 0.0
+        self.load_time = 0.0
+        self.compute_time = 0.0
+
+    def path(self, index):
+        name = self.pattern.format(index)
+        return name if self.base_path is None else os.path.join(self.base_path, name)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __iter__(self):
+        self._reset_stats()
+        pool = ThreadPoolExecutor(max_workers=self.n_threads)
+        pending = deque()
+        upcoming = iter(self.indices)
+
+        def submit():
+            for index in upcoming:
+                path = self.path(index)
+                pending.append((index, path, pool.submit(_load_dump, path, self.variables)))
+                return
+
+        try:
+            for _ in range(self.prefetch):
+                submit()
+            while pending:
+                index, path, future = pending.popleft()
+                # 取出时已读完即为命中，否则计入等待读盘的时间
+                if future.done():
+                    self.hits += 1
+                start = time.perf_counter()
+                data, header, elapsed = future.result()
+                self.io_wait += time.perf_counter() - start
+                self.load_time += elapsed
+                submit()
+
+                if data is None:
+                    print(f"File {os.path.basename(path)} not found.")
+                    self.missing += 1
+                    continue
+                self.frames += 1
+                yielded = time.perf_counter()
+                yield Frame(index, path, data, header)
+                self.compute_time += time.perf_counter() - yielded
+        finally:
+            for _, _, future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    def stats(self):
+        """
+        返回上一次遍历的统计信息。
+
+        返回:
+        - dict，包含 frames、missing、hits、hit_rate（取出时已读完的比例）、
+          io_wait（主循环等待读盘的总时间，s）、load_time（后台读取耗时之和，s）、
+          compute_time（主循环处理各输出的总时间，s）
+        """
+        total = self.frames + self.missing
+        return {
+            "frames": self.frames,
+            "missing": self.missing,
+            "hits": self.hits,
+            "hit_rate": self.hits / total if total else 0.0,
+            "io_wait": self.io_wait,
+            "load_time": self.load_time,
+            "compute_time": self.compute_time,
+        }
+
+    def report(self):
+        """打印统计信息，并给出循环受限于磁盘还是计算的判断"""
+        s = self.stats()
+        bound = "磁盘" if s["io_wait"] > s["compute_time"] else "计算"
+        print(f"输出：{s['frames']}（缺失 {s['missing']}），预读命中率：{s['hit_rate']:.0%}")
+        print(f"等待读盘：{s['io_wait']:.2f} s，后台读取：{s['load_time']:.2f} s，处理：{s['compute_time']:.2f} s")
+        print(f"循环主要受限于{bound}")
+        return s
+
+
+def iter_series(pattern, indices, variables=None, base_path=None, prefetch=2, n_threads=None):
+    """
+    逐个产出一系列输出，并在后台预读，参数含义同 DumpSeries。
+
+    产出:
+    - frame: Frame(index, path, data, header)，data 为变量名 -> 数组的 dict（未给出 variables 时为 SDF 对象）
+    """
+    return iter(DumpSeries(pattern, indices, variables, base_path, prefetch, n_threads))
@@ -0,0 +1,26 @@
+from .pipeline import load_spectrum,load_spectra,iter_spectra,dataset_files,plot_spectrum_groups
+from .rebin import rebin,rebin_spectra,dnde,uniform_edges,log_edges,merge_edges,edges_from_centers
+from .histogram import particle_histogram,HistogramDump
+from .polarization import polarization_spectrum,polarization_spectrogram,stokes_parameters,polarization_degrees
+
+
+__all__ = [
+    'load_spectrum',
+    'load_spectra',
+    'iter_spectra',
+    'dataset_files',
+    'plot_spectrum_groups',
+    'rebin',
+    'rebin_spectra',
+    'dnde',
+    'uniform_edges',
+    'log_edges',
+    'merge_edges',
+    'edges_from_centers',
+    'particle_histogram',
+    'HistogramDump',
+    'polarization_spectrum',
+    'polarization_spectrogram',
+    'stokes_parameters',
+    'polarization_degrees',
+]
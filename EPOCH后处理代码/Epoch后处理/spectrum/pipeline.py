@@ -0,0 +1,208 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from data_loading.sdf_cache import get_sdf
+from .rebin import rebin_spectra
+from data_loading.instrument import traced
+
+E_J_TO_MEV = 1.0 / 1.6e-13  # 焦耳转换成 MeV 的系数
+
+
+def dataset_files(datasets):
+    """
+    展开 datasets 配置，得到每个数据集的文件路径与标签。
+
+    参数:
+    - datasets: list of dict，每项包含 base_dir、file_nums，可选 file_prefix、file_suffix、custom_labels
+
+    返回:
+    - paths: list of list of str，paths[i][j] 为第 i 个数据集第 j 个文件
+    - labels: list of list of str，对应标签（默认为去掉后缀的文件名）
+    """
+    paths, labels = [], []
+    for dataset in datasets:
+        prefix = dataset.get('file_prefix', 'distfun')
+        suffix = dataset.get('file_suffix', '.sdf')
+        custom_labels = dataset.get('custom_labels', None)
+        run_paths, run_labels = [], []
+        for idx, num in enumerate(dataset['file_nums']):
+            fname = f"{prefix}{num:04d}{suffix}"
+            run_paths.append(os.path.join(dataset['base_dir'], fname))
+            run_labels.append(custom_labels[idx] if custom_labels else os.path.splitext(fname)[0])
+        paths.append(run_paths)
+        labels.append(run_labels)
+    return paths, labels
+
+
+def _cache_path(cache_dir, file_path, species, variable, step, edges):
+    st = os.stat(file_path)
+    key = f"{os.path.abspath(file_path)}|{st.st_size}|{st.st_mtime_ns}|{species}|{variable}|{step}"
+    if edges is not None:
+        key += "|" + hashlib.sha1(np.asarray(edges, dtype=np.float64).tobytes()).hexdigest()
+    return os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".npz")
+
+
+@traced(cat='load')
+def load_spectrum(file_path, species='Photon', variable='allenergy0', step=2, cache_dir=None,
+                  edges=None):
+    """
+    读取单个 distfun 文件的能谱并重分 bin（计数守恒，见 rebin_spectra）。
+
+    参数:
+    - file_path: str，distfun SDF 文件路径，也可以是 particle_histogram 返回的 HistogramDump
+    - species: str，粒子种类，如 'Photon'、'Electron'
+    - variable: str，分布函数名中间部分，读取 Grid_{variable}_{species} 与 dist_fn_{variable}_{species}
+    - step: int，合并 bin 的大小，末尾不足 step 的 bin 单独成 bin
+    - cache_dir: str 或 None，结果缓存目录，命中时不再读取 SDF 文件
+    - edges: ndarray 或 None，自定义 bin 边界（单位：MeV），给出时忽略 step
+
+    返回:
+    - E: ndarray，新 bin 中心能量（单位：MeV）
+    - spectrum: ndarray，dN/dE
+    """
+    cache_file = None
+    if cache_dir is not None and isinstance(file_path, (str, os.PathLike)):
+        cache_file = _cache_path(cache_dir, file_path, species, variable, step, edges)
+        if os.path.exists(cache_file):
+            with np.load(cache_file) as cached:
+                return cached['E'], cached['spectrum']
+
+    data = get_sdf(file_path)
+    E_J = np.asarray(getattr(data, f'Grid_{variable}_{species}').data[0])
+    dN = np.asarray(getattr(data, f'dist_fn_{variable}_{species}').data)
+    E, spectrum, _ = rebin_spectra(E_J * E_J_TO_MEV, dN, edges=edges, step=step)
+
+    if cache_file is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(cache_file, E=E, spectrum=spectrum)
+    return E, spectrum
+
+
+def _load_task(run_idx, file_idx, file_path, species, variable, step, cache_dir, edges):
+    if isinstance(file_path, (str, os.PathLike)) and not os.path.exists(file_path):
+        print(f"File {os.path.basename(file_path)} not found.")
+        return None
+    E, spectrum = load_spectrum(file_path, species, variable, step, cache_dir, edges)
+    return run_idx, file_idx, E, spectrum
+
+
+def iter_spectra(datasets, species='Photon', variable='allenergy0', step=2,
+                 n_workers=None, cache_dir=None, edges=None):
+    """
+    并行读取多个数据集的能谱，按完成顺序逐个产出结果（流式）。
+
+    参数:
+    - datasets, species, variable, step, cache_dir, edges: 同 load_spectra
+    - n_workers: int 或 None，进程数，1 为在当前进程串行
+
+    产出:
+    - (run_idx, file_idx, E, spectrum)，缺失的文件打印提示后跳过
+    """
+    paths, _ = dataset_files(datasets)
+    tasks = [(i, j, p) for i, run_paths in enumerate(paths) for j, p in enumerate(run_paths)]
+
+    if n_workers == 1:
+        for i, j, p in tasks:
+            result = _load_task(i, j, p, species, variable, step, cache_dir, edges)
+            if result is not None:
+                yield result
+        return
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        futures = [pool.submit(_load_task, i, j, p, species, variable, step, cache_dir, edges)
+                   for i, j, p in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            if result is not None:
+                yield result
+
+
+def load_spectra(datasets, species='Photon', variable='allenergy0', step=2,
+                 n_workers=None, cache_dir=None, on_result=None, edges=None):
+    """
+    并行读取并合并 datasets 中全部文件的能谱，返回堆叠后的数组。
+
+    参数:
+    - datasets: list of dict，与 02-多文件分组对比.ipynb 中的配置相同
+    - species: str，粒子种类
+    - variable: str，分布函数名，默认 'allenergy0'
+    - step: int，合并 bin 的大小
+    - n_workers: int 或 None，进程数，None 为 CPU 核数
+    - cache_dir: str 或 None，能谱缓存目录，重复运行时直接复用
+    - on_result: callable 或 None，每读完一个文件调用 on_result(run_idx, file_idx, E, spectrum)
+    - edges: ndarray 或 None，自定义 bin 边界（单位：MeV，均匀、对数或任意），给出时忽略 step
+
+    返回:
+    - energies: ndarray，形状 (n_runs, n_bins)，各数据集的能量轴（单位：MeV）
+    - spectra: ndarray，形状 (n_runs, n_files, n_bins)，文件数不足的数据集与缺失的文件以 NaN 补齐
+    - labels: list of list of str，各文件标签
+
+    未给出 edges 时，所有文件的 bin 数必须相同，同一数据集内各文件的能量轴也必须一致，否则抛出 ValueError。
+    """
+    paths, labels = dataset_files(datasets)
+    n_files = max(len(p) for p in paths)
+    energies, spectra = None, None
+    first = {}
+
+    for i, j, E, spectrum in iter_spectra(datasets, species, variable, step, n_workers, cache_dir, edges):
+        if spectra is None:
+            energies = np.full((len(paths), len(E)), np.nan)
+            spectra = np.full((len(paths), n_files, len(E)), np.nan)
+        if len(E) != energies.shape[1]:
+            raise ValueError(f"{labels[i][j]} 的能谱有 {len(E)} 个 bin，与其他文件的 {energies.shape[1]} 个不同，"
+                             f"请用 edges 指定统一的 bin 边界")
+        if i in first:
+            if not np.allclose(E, energies[i], rtol=1e-9, atol=0):
+                raise ValueError(f"{labels[i][j]} 的能量轴与同一数据集的 {labels[i][first[i]]} 不同，"
+                                 f"请用 edges 指定统一的 bin 边界")
+        else:
+            first[i] = j
+            energies[i] = E
+        spectra[i, j] = spectrum
+        if on_result is not None:
+            on_result(i, j, E, spectrum)
+
+    if spectra is None:
+        raise FileNotFoundError("datasets 中的文件都不存在")
+    return energies, spectra, labels
+
+
+def plot_spectrum_groups(energies, spectra, labels, group_size=5, species='Photon',
+                         xlim=(0, 100), save_dir=None):
+    """
+    按组绘制已读入内存的能谱（对应 02-多文件分组对比.ipynb 的绘图部分）。
+
+    参数:
+    - energies, spectra, labels: load_spectra 的返回值
+    - group_size: int，每张图的曲线数
+    - species: str，坐标轴标签中的粒子种类
+    - xlim: tuple，x 轴范围（单位：MeV）
+    - save_dir: str 或 None，给出时保存为 spectrum_group_N.png
+    """
+    curves = [(energies[i], spectra[i, j], labels[i][j])
+              for i in range(len(labels)) for j in range(len(labels[i]))]
+
+    for g in range(0, len(curves), group_size):
+        group = curves[g:g + group_size]
+        fig, ax = plt.subplots(figsize=(7, 6))
+        for E, S, label in group:
+            ax.semilogy(E, S, label=label, linewidth=2, alpha=0.8)
+
+        ax.set_xlabel(f'{species} Energy $E$ (MeV)', fontsize=14)
+        ax.set_ylabel(r'd$N$/d$E$', fontsize=14)
+        ax.set_title(f'Energy Spectra Comparison: Files {g + 1} to {g + len(group)}', fontsize=15)
+        ax.set_xlim(*xlim)
+        ax.tick_params(axis='both', direction='in', which='both', labelsize=12)
+        ax.legend(fontsize=10)
+        plt.tight_layout()
+
+        if save_dir is not None:
+            os.makedirs(save_dir, exist_ok=True)
+            save_path = os.path.join(save_dir, f'spectrum_group_{g // group_size + 1}.png')
+            plt.savefig(save_path, dpi=300)
+            print(f"Saved figure: {save_path}")
+        plt.show()
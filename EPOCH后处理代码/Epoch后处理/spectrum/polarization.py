@@ -0,0 +1,162 @@
+import numpy as np
+from scipy import fft as sfft
+from scipy.signal import get_window
+
+from data_loading.result_cache import cached_result
+from data_loading.instrument import traced
+
+
+def _one_sided(spec, n, norm):
+    """双边谱换算为单边振幅谱：除以 norm，除直流与奈奎斯特频率外乘 2"""
+    spec /= norm
+    stop = spec.shape[0] - 1 if n % 2 == 0 else spec.shape[0]
+    spec[1:stop] *= 2
+    return spec
+
+
+def _band_mask(freq, band):
+    if band is None:
+        return np.ones(len(freq), dtype=bool)
+    mask = (freq >= band[0]) & (freq <= band[1])
+    if not mask.any():
+        raise ValueError(f"频段 {tuple(band)} 内没有频率点")
+    return mask
+
+
+def stokes_parameters(a, b):
+    """
+    由两个正交分量的复振幅谱计算斯托克斯参数。
+
+    参数:
+    - a, b: 复数 ndarray，同形状，如 Ey 与 Ez 的频谱
+
+    返回:
+    - S: ndarray，形状 (4,) + a.shape，依次为 S0、S1、S2、S3
+    """
+    aa = a.real ** 2 + a.imag ** 2
+    bb = b.real ** 2 + b.imag ** 2
+    ab = a * np.conj(b)
+    return np.stack((aa + bb, aa - bb, 2 * ab.real, 2 * ab.imag))
+
+
+def polarization_degrees(S):
+    """
+    由斯托克斯参数计算偏振度与椭圆参数。
+
+    参数:
+    - S: ndarray，形状 (4, ...)，依次为 S0、S1、S2、S3（可以是单个频率或频段求和后的值）
+
+    返回:
+    - degrees: dict，与 S[0] 同形状的数组：
+      P（总偏振度）、P_lin（线偏振度）、P_circ（圆偏振度，带符号）、
+      ellipticity（椭圆率 tan χ，χ = atan2(S3, sqrt(S1² + S2²)) / 2）、psi（方位角，rad）
+    """
+    S0, S1, S2, S3 = S
+    lin = np.hypot(S1, S2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'P': np.sqrt(lin ** 2 + S3 ** 2) / S0,
+            'P_lin': lin / S0,
+            'P_circ': S3 / S0,
+            'ellipticity': np.tan(0.5 * np.arctan2(S3, lin)),
+            'psi': 0.5 * np.arctan2(S2, S1),
+        }
+
+
+@traced(cat='reduce')
+@cached_result
+def polarization_spectrum(series, dt, components=(1, 2), band=None, n_threads=None):
+    """
+    多个探针点的偏振频谱分析（对应 FFT/FFTV2.ipynb），所有探针一次完成。
+
+    对两个横向分量沿时间轴做实数 FFT（rfft，沿探针轴批量计算），
+    得到各频率的斯托克斯参数，并在频段内求和得到每个探针的偏振度。
+
+    参数:
+    - series: ndarray，形状 (n_time, n_probes, n_components)，如 extract_probes 的输出（Ex, Ey, Ez）；
+      也可以是 (n_time, n_components) 的单个探针
+    - dt: float，时间间隔（s）
+    - components: tuple(int, int)，参与计算的两个分量，默认 (1, 2) 即 Ey 与 Ez
+    - band: tuple(f_min, f_max) 或 None，求和的频段（Hz，闭区间），None 为全部频率
+    - n_threads: int 或 None，FFT 使用的线程数，None 为单线程，-1 为全部 CPU 核
+
+    返回:
+    - result: dict，包含
+      freq（n_freq，Hz）、S（形状 (4, n_freq, n_probes) 的各频率斯托克斯参数）、
+      S_band（形状 (4, n_probes) 的频段内求和值），以及由 S_band 计算的
+      P、P_lin、P_circ、ellipticity、psi（各为 n_probes 长的数组，见 polarization_degrees）
+    """
+    series = np.asarray(series, dtype=np.float64)
+    if series.ndim == 2:
+        series = series[:, None, :]
+    n = series.shape[0]
+    fields = series[:, :, list(components)]
+    spec = _one_sided(sfft.rfft(fields, axis=0, workers=n_threads), n, n)
+    freq = sfft.rfftfreq(n, d=dt)
+
+    S = stokes_parameters(spec[..., 0], spec[..., 1])
+    S_band = S[:, _band_mask(freq, band)].sum(axis=1)
+    result = {'freq': freq, 'S': S, 'S_band': S_band}
+    result.update(polarization_degrees(S_band))
+    return result
+
+
+@traced(cat='reduce')
+@cached_result
+def polarization_spectrogram(series, dt, nperseg=256, noverlap=None, window='hann',
+                             components=(1, 2), band=None, n_threads=None,
+                             keep_spectra=False, max_frames=64):
+    """
+    短时偏振分析（谱图）：沿时间加窗分段做 rfft，得到偏振随时间的演化，所有探针一次完成。
+
+    每次只取出并变换 max_frames 段，内存占用与序列长度无关。
+
+    参数:
+    - series, dt, components, band, n_threads: 同 polarization_spectrum
+    - nperseg: int，每段的采样点数
+    - noverlap: int 或 None，相邻段重叠的点数，默认 nperseg // 2
+    - window: str 或 tuple，窗函数，见 scipy.signal.get_window
+    - keep_spectra: bool，是否返回频段内各频率的斯托克斯参数
+    - max_frames: int，每批处理的段数
+
+    返回:
+    - result: dict，包含
+      time（各段中心时刻，s）、freq（频段内的频率，Hz）、
+      S_band（形状 (4, n_frames, n_probes)）、P、P_lin、P_circ、ellipticity、psi（形状 (n_frames, n_probes)），
+      keep_spectra=True 时另有 S（形状 (4, n_frames, n_freq_band, n_probes)）
+    """
+    series = np.asarray(series, dtype=np.float64)
+    if series.ndim == 2:
+        series = series[:, None, :]
+    n, n_probes = series.shape[:2]
+    if nperseg > n:
+        raise ValueError(f"nperseg={nperseg} 大于序列长度 {n}")
+    noverlap = nperseg // 2 if noverlap is None else noverlap
+    step = nperseg - noverlap
+    if step <= 0:
+        raise ValueError("noverlap 应小于 nperseg")
+
+    win = get_window(window, nperseg)
+    freq = sfft.rfftfreq(nperseg, d=dt)
+    mask = _band_mask(freq, band)
+    starts = np.arange(0, n - nperseg + 1, step)
+    fields = series[:, :, list(components)]
+
+    S_band = np.empty((4, len(starts), n_probes))
+    S_keep = np.empty((4, len(starts), int(mask.sum()), n_probes)) if keep_spectra else None
+    for i in range(0, len(starts), max_frames):
+        batch = starts[i:i + max_frames]
+        # (段, 段内时间, 探针, 分量)
+        segments = fields[batch[:, None] + np.arange(nperseg)] * win[None, :, None, None]
+        spec = _one_sided(np.moveaxis(sfft.rfft(segments, axis=1, workers=n_threads), 1, 0),
+                          nperseg, win.sum())
+        S = stokes_parameters(spec[mask, ..., 0], spec[mask, ..., 1])  # (4, 频率, 段, 探针)
+        S_band[:, i:i + len(batch)] = S.sum(axis=1)
+        if keep_spectra:
+            S_keep[:, i:i + len(batch)] = np.moveaxis(S, 1, 2)
+
+    result = {'time': (starts + nperseg / 2) * dt, 'freq': freq[mask], 'S_band': S_band}
+    result.update(polarization_degrees(S_band))
+    if keep_spectra:
+        result['S'] = S_keep
+    return result
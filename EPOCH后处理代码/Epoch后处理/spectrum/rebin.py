@@ -0,0 +1,139 @@
+import numpy as np
+
+from data_loading.instrument import traced
+
+
+def edges_from_centers(centers):
+    """
+    由 bin 中心求 bin 边界：相邻中心取中点，两端按相邻间距外推。
+
+    参数:
+    - centers: ndarray，一维单调递增的 bin 中心
+
+    返回:
+    - edges: ndarray，长度 len(centers) + 1
+    """
+    centers = np.asarray(centers, dtype=np.float64)
+    if centers.size < 2:
+        raise ValueError("至少需要 2 个 bin 才能确定边界")
+    mid = 0.5 * (centers[1:] + centers[:-1])
+    return np.concatenate(([2 * centers[0] - mid[0]], mid, [2 * centers[-1] - mid[-1]]))
+
+
+def uniform_edges(e_min, e_max, n_bins):
+    """均匀 bin 边界，共 n_bins 个 bin"""
+    return np.linspace(e_min, e_max, n_bins + 1)
+
+
+def log_edges(e_min, e_max, n_bins):
+    """对数 bin 边界，共 n_bins 个 bin，要求 e_min > 0"""
+    if e_min <= 0:
+        raise ValueError("对数 bin 的下界必须大于 0")
+    return np.geomspace(e_min, e_max, n_bins + 1)
+
+
+def merge_edges(edges, step):
+    """
+    每 step 个原始 bin 合并为一个，返回新的边界。
+    长度不能被 step 整除时，最后一个 bin 包含剩余的原始 bin（不丢弃数据）。
+    """
+    edges = np.asarray(edges)
+    merged = edges[::step]
+    if merged[-1] != edges[-1]:
+        merged = np.append(merged, edges[-1])
+    return merged
+
+
+def rebin(counts, edges_in, edges_out):
+    """
+    将计数重新分配到新的 bin 上，按 bin 重叠比例分配，计数守恒。
+
+    假设每个原始 bin 内粒子均匀分布：先求原始边界上的累积计数，
+    再在新边界处线性插值并做差分。新边界范围之外的计数被舍弃，范围之内严格守恒。
+    所有谱共享同一组插值索引，整批计算没有 Python 循环。
+
+    参数:
+    - counts: ndarray，形状 (n_in,) 或 (n_spectra, n_in)，每个 bin 的粒子数
+    - edges_in: ndarray，原始 bin 边界，长度 n_in + 1，单调递增
+    - edges_out: ndarray，新的 bin 边界，长度 n_out + 1，单调递增
+
+    返回:
+    - new_counts: ndarray，形状 (n_out,) 或 (n_spectra, n_out)
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    edges_in = np.asarray(edges_in, dtype=np.float64)
+    edges_out = np.asarray(edges_out, dtype=np.float64)
+    if edges_in.size != counts.shape[-1] + 1:
+        raise ValueError(f"edges_in 长度应为 {counts.shape[-1] + 1}，实际为 {edges_in.size}")
+
+    squeeze = counts.ndim == 1
+    counts = np.atleast_2d(counts)
+    cumulative = np.zeros((counts.shape[0], counts.shape[1] + 1))
+    np.cumsum(counts, axis=1, out=cumulative[:, 1:])
+
+    # 新边界在原始边界中的位置：所在 bin 的索引与 bin 内的比例
+    e = np.clip(edges_out, edges_in[0], edges_in[-1])
+    k = np.clip(np.searchsorted(edges_in, e, side='right') - 1, 0, edges_in.size - 2)
+    frac = (e - edges_in[k]) / (edges_in[k + 1] - edges_in[k])
+
+    at_edges = cumulative[:, k] + frac * (cumulative[:, k + 1] - cumulative[:, k])
+    new_counts = np.diff(at_edges, axis=1)
+    return new_counts[0] if squeeze else new_counts
+
+
+def dnde(counts, edges):
+    """
+    由每个 bin 的计数求 dN/dE（按各 bin 自身宽度归一化）。
+
+    返回:
+    - centers: ndarray，bin 中心
+    - spectrum: ndarray，与 counts 形状相同
+    - widths: ndarray，bin 宽度
+    """
+    edges = np.asarray(edges, dtype=np.float64)
+    widths = np.diff(edges)
+    return 0.5 * (edges[1:] + edges[:-1]), np.asarray(counts) / widths, widths
+
+
+@traced(cat='reduce')
+def rebin_spectra(energy, counts, edges=None, step=None, scale='uniform', n_bins=None,
+                  e_range=None):
+    """
+    批量重分 bin 并计算 dN/dE，替代各脚本中 reshape(-1, step) 合并 bin 的写法。
+
+    新的 bin 边界按以下优先级确定：
+    - edges：直接给出的边界（任意非均匀 bin）
+    - step：每 step 个原始 bin 合并，末尾不足 step 的部分单独成 bin
+    - n_bins + scale：在 e_range（默认为原始能量范围）内生成 'uniform' 或 'log' bin
+
+    参数:
+    - energy: ndarray，原始能量轴，bin 中心（长度 n_in）或边界（长度 n_in + 1）
+    - counts: ndarray，形状 (n_in,) 或 (n_spectra, n_in)，每个 bin 的粒子数
+    - edges, step, scale, n_bins, e_range: 见上
+
+    返回:
+    - centers: ndarray，新 bin 中心
+    - spectrum: ndarray，dN/dE，形状 (n_out,) 或 (n_spectra, n_out)
+    - widths: ndarray，新 bin 宽度
+    """
+    counts = np.asarray(counts)
+    energy = np.asarray(energy, dtype=np.float64)
+    edges_in = energy if energy.size == counts.shape[-1] + 1 else edges_from_centers(energy)
+
+    if edges is None:
+        if step is not None:
+            edges = merge_edges(edges_in, step)
+        elif n_bins is not None:
+            lo, hi = e_range if e_range is not None else (edges_in[0], edges_in[-1])
+            if scale == 'uniform':
+                edges = uniform_edges(lo, hi, n_bins)
+            elif scale == 'log':
+                if lo <= 0:
+                    lo = edges_in[edges_in > 0][0]
+                edges = log_edges(lo, hi, n_bins)
+            else:
+                raise ValueError(f"不支持的 bin 类型：{scale}，可选值为 ['uniform', 'log']")
+        else:
+            edges = edges_in
+
+    return dnde(rebin(counts, edges_in, edges), edges)
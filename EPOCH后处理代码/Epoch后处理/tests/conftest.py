@@ -0,0 +1,13 @@
+import os
+import sys
+
+# 测试使用 lazy 后端；结果缓存保持默认关闭，不写入用户目录
+os.environ.setdefault("EPOCH_SDF_BACKEND", "lazy")
+os.environ.pop("EPOCH_RESULT_CACHE", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 没有安装 sdf_helper 时使用 benchmarks 中的本地替代，utils_3d 的部分模块在导入时需要它
+from benchmarks.sdf_helper_standin import install  # noqa: E402
+
+install()
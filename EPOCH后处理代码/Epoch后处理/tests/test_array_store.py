@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_dataset
+from data_loading import ArrayStore, LazySDF, convert_run, load_ne
+
+
+@pytest.fixture(scope="module")
+def run_dir(tmp_path_factory):
+    out = str(tmp_path_factory.mktemp("run"))
+    make_dataset(out, size=((10, 4, 4), 50), kinds=("density", "idall"), n_dumps=2)
+    return out
+
+
+def test_round_trip(run_dir, tmp_path):
+    store_dir = str(tmp_path / "store")
+    assert convert_run(run_dir, store_dir, chunk_x=3, verbose=False) == \
+        ["density0000", "density0001", "idall0000", "idall0001"]
+    assert convert_run(run_dir, store_dir, chunk_x=3, verbose=False) == []
+
+    store = ArrayStore(store_dir)
+    assert store.select("density") == ["density0000", "density0001"]
+    src = os.path.join(run_dir, "density0001.sdf")
+    dump = store[("density", 1)]
+    assert dump.header["step"] == LazySDF(src).header["step"]
+    np.testing.assert_array_equal(load_ne(dump, "Photon"), load_ne(src, "Photon"))
+
+    sdf = LazySDF(os.path.join(run_dir, "idall0000.sdf"))
+    for name in ("Particles_ID_subset_testp_Photon", "Grid_Particles_subset_testp_Photon"):
+        expected, stored = getattr(sdf, name).data, getattr(store["idall0000"], name).data
+        for a, b in zip(np.atleast_2d(expected), np.atleast_2d(stored)):
+            np.testing.assert_array_equal(a, b)
+
+
+@pytest.mark.parametrize("key", [
+    np.s_[2:8], np.s_[::-1], np.s_[7:1:-2], np.s_[4], np.s_[-1, 1:3], np.s_[5:5], np.s_[[0, 9]],
+])
+def test_chunked_array_slicing(run_dir, tmp_path, key):
+    store_dir = str(tmp_path / "store")
+    convert_run(run_dir, store_dir, kinds=("density",), chunk_x=3, verbose=False)
+    chunked = ArrayStore(store_dir)["density0000"].Derived_Number_Density_Photon.data
+    expected = np.asarray(LazySDF(os.path.join(run_dir, "density0000.sdf")).Derived_Number_Density_Photon.data)
+    assert len(chunked.chunks) == 4
+    np.testing.assert_array_equal(np.asarray(chunked), expected)
+    np.testing.assert_array_equal(chunked[key], expected[key])
+
+
+def test_reconvert_with_new_chunk_size(run_dir, tmp_path):
+    store_dir = str(tmp_path / "store")
+    convert_run(run_dir, store_dir, kinds=("density",), chunk_x=3, verbose=False)
+    convert_run(run_dir, store_dir, kinds=("density",), chunk_x=5, verbose=False)
+    dump_dir = os.path.join(store_dir, "density0000")
+    block = ArrayStore(store_dir)["density0000"].Derived_Number_Density_Photon
+    entries = list(ArrayStore(store_dir).index["dumps"]["density0000"]["variables"].values())
+    entries += [c for e in entries for c in e.get("components", [])]
+    listed = {c[2] for e in entries for c in e.get("chunks", [])}
+    assert len(block.entry["chunks"]) == 2
+    assert {f for f in os.listdir(dump_dir) if f.endswith(".npy")} == listed
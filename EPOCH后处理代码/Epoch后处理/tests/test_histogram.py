@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from spectrum.histogram import _bin_index
+
+
+def _counts(values, edges):
+    idx = _bin_index(values, edges)
+    return np.bincount(idx[idx >= 0], minlength=len(edges) - 1)
+
+
+@pytest.mark.parametrize("edges", [
+    np.logspace(np.log10(1.6e-16), np.log10(1.6e-12), 40),  # 能量（J），对数 bin
+    np.array([0.0, 1e-21, 3e-21, 4e-21, 1e-20]),             # 动量，非均匀 bin
+    np.linspace(-5e-6, 5e-6, 51),                           # 位置（m），均匀 bin
+    np.linspace(0.0, 100.0, 201),                           # MeV，均匀 bin
+])
+def test_bin_index_matches_np_histogram(edges):
+    rng = np.random.default_rng(0)
+    span = edges[-1] - edges[0]
+    parts = [rng.uniform(edges[0] - 0.1 * span, edges[-1] + 0.1 * span, 1000), edges, [np.nan, np.inf, -np.inf]]
+    if edges[0] > 0:
+        # 对数分布的值，每个对数 bin 中都有粒子
+        parts.append(np.exp(rng.uniform(np.log(edges[0]), np.log(edges[-1]), 1000)))
+    values = np.concatenate(parts)
+    expected, _ = np.histogram(values[np.isfinite(values)], bins=edges)
+    np.testing.assert_array_equal(_counts(values, edges), expected)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from data_loading.particle_table import join_by_id
+
+
+def test_join_by_id_inner_and_left():
+    left = {"id": np.array([5, 1, 7, 3]), "x": np.array([0.5, 0.1, 0.7, 0.3])}
+    right = {"id": np.array([3, 9, 5, 1]), "x": np.array([-1.0, -1.0, -1.0, -1.0]),
+             "px": np.array([30.0, 90.0, 50.0, 10.0])}
+
+    inner = join_by_id(left, right)
+    np.testing.assert_array_equal(inner["id"], [5, 1, 3])
+    np.testing.assert_array_equal(inner["x"], [0.5, 0.1, 0.3])
+    np.testing.assert_array_equal(inner["px"], [50.0, 10.0, 30.0])
+
+    joined = join_by_id(left, right, how="left")
+    np.testing.assert_array_equal(joined["id"], left["id"])
+    np.testing.assert_array_equal(joined["px"], [50.0, 10.0, np.nan, 30.0])
+
+
+def test_join_by_id_empty_right_and_bad_how():
+    left = {"id": np.array([1, 2])}
+    right = {"id": np.array([], dtype=int), "px": np.array([])}
+    assert len(join_by_id(left, right)["px"]) == 0
+    assert np.isnan(join_by_id(left, right, how="left")["px"]).all()
+    with pytest.raises(ValueError):
+        join_by_id(left, right, how="outer")
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from utils_3d.radial_profile import RadialBins
+
+
+def _brute_force(arr, y, z, radii, weight=None):
+    r2 = y[:, None] ** 2 + z[None, :] ** 2
+    values = arr if weight is None else arr * weight
+    return np.array([[layer[r2 < r ** 2].sum() for r in radii] for layer in values])
+
+
+@pytest.mark.parametrize("radii", [
+    [0.5, 1.5, 1.6],       # 最外层的环为空
+    [0.5, 0.6, 1.5],       # 中间的环为空
+    [0.1],                 # 没有格点在圆内
+    [0.5, 1.0, 2.0, 3.0],
+])
+def test_integrate_matches_mask(radii):
+    y = z = np.linspace(-2, 2, 5)
+    rng = np.random.default_rng(1)
+    arr = rng.random((7, 5, 5))
+    weight = rng.random((7, 5, 5))
+    bins = RadialBins(y, z, radii)
+    np.testing.assert_allclose(bins.integrate(arr, chunk_x=3), _brute_force(arr, y, z, radii))
+    np.testing.assert_allclose(bins.integrate(arr, weight, chunk_x=4), _brute_force(arr, y, z, radii, weight))
+
+
+def test_counts_of_rings():
+    y = z = np.linspace(-2, 2, 5)
+    bins = RadialBins(y, z, [0.5, 1.5, 1.6])
+    np.testing.assert_array_equal(bins.counts, [1, 8, 0])
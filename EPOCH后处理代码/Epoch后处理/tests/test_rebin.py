@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from spectrum.rebin import merge_edges, rebin, rebin_spectra
+
+
+@pytest.mark.parametrize("n_in, step", [(12, 3), (13, 3), (10, 1), (5, 7)])
+def test_merge_edges_keeps_range(n_in, step):
+    edges = np.linspace(0.0, 1.0, n_in + 1)
+    merged = merge_edges(edges, step)
+    assert merged[0] == edges[0] and merged[-1] == edges[-1]
+    assert len(merged) - 1 == -(-n_in // step)
+
+
+def test_rebin_step_matches_reshape_sum():
+    rng = np.random.default_rng(0)
+    edges = np.linspace(0.0, 3.0, 13)
+    counts = rng.random((4, 12))
+    new = rebin(counts, edges, merge_edges(edges, 3))
+    np.testing.assert_allclose(new, counts.reshape(4, -1, 3).sum(axis=2))
+
+
+@pytest.mark.parametrize("step, n_bins, scale", [(3, None, "uniform"), (7, None, "uniform"),
+                                                 (None, 17, "uniform"), (None, 9, "log")])
+def test_rebin_spectra_conserves_counts(step, n_bins, scale):
+    rng = np.random.default_rng(1)
+    energy = np.linspace(1.0, 50.0, 200)
+    counts = rng.random((3, 200)) * 1e6
+    _, spectrum, widths = rebin_spectra(energy, counts, step=step, n_bins=n_bins, scale=scale)
+    np.testing.assert_allclose((spectrum * widths).sum(axis=1), counts.sum(axis=1))
+
+
+def test_rebin_non_uniform_edges():
+    edges_in = np.array([0.0, 1.0, 3.0, 4.0])
+    counts = np.array([2.0, 4.0, 1.0])
+    new = rebin(counts, edges_in, [0.0, 2.0, 4.0])
+    np.testing.assert_allclose(new, [4.0, 3.0])
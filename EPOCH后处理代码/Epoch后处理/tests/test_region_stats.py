@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from utils_3d.region_stats import region_moments
+
+
+@pytest.mark.parametrize("chunk_x", [1, 3, 32])
+def test_region_moments_matches_numpy(chunk_x):
+    rng = np.random.default_rng(0)
+    arr = rng.normal(5.0, 2.0, (10, 6, 7))
+    weights = rng.random((10, 6, 7))
+    slices = (slice(1, 9), slice(0, 5), slice(2, 7))
+    sub, w = arr[slices], weights[slices]
+
+    stats = region_moments(arr, slices, weights, chunk_x=chunk_x)
+    assert stats["count"] == sub.size
+    np.testing.assert_allclose(stats["mean"], sub.mean())
+    np.testing.assert_allclose(stats["variance"], sub.var())
+    np.testing.assert_allclose(stats["std"], sub.std())
+    assert stats["min"] == sub.min() and stats["max"] == sub.max()
+    np.testing.assert_allclose(stats["weight_sum"], w.sum())
+    mean = np.average(sub, weights=w)
+    np.testing.assert_allclose(stats["weighted_mean"], mean)
+    np.testing.assert_allclose(stats["weighted_variance"], np.average((sub - mean) ** 2, weights=w))
+
+
+def test_region_moments_empty_region():
+    with pytest.raises(ValueError):
+        region_moments(np.ones((4, 4)), (slice(2, 2), slice(None)))
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import SDFWriter
+from data_loading import ResultCache, cached_result, get_sdf, result_cache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / "cache"), enabled=True)
+
+
+def test_shared_cache_is_opt_in():
+    assert result_cache.enabled is False
+
+
+def test_hit_returns_same_types(cache):
+    calls = []
+
+    @cached_result(cache=cache)
+    def summary(arr, scale=1.0):
+        calls.append(1)
+        return {"count": int(arr.size), "mean": arr.mean() * scale, "flag": np.bool_(True),
+                "profile": arr.sum(axis=0), "pair": (np.float32(1.5), "x"),
+                "table": pd.DataFrame({"a": arr[:, 0]})}
+
+    arr = np.arange(12.0).reshape(4, 3)
+    miss, hit = summary(arr), summary(arr)
+    assert len(calls) == 1 and cache.hits == 1
+    for key in ("count", "mean", "flag"):
+        assert type(hit[key]) is type(miss[key]) and hit[key] == miss[key]
+    assert type(hit["pair"][0]) is np.float32 and hit["pair"] == miss["pair"]
+    np.testing.assert_array_equal(hit["profile"], miss["profile"])
+    pd.testing.assert_frame_equal(hit["table"], miss["table"])
+
+    summary(arr, scale=2.0)
+    arr[0, 0] = 100.0
+    summary(arr)
+    assert len(calls) == 3
+
+
+def test_memmap_keys(cache, tmp_path):
+    path = str(tmp_path / "field0000.sdf")
+    with SDFWriter(path) as w:
+        w.plain_mesh("Grid/Grid", "grid", [np.linspace(0, 1, 9)])
+        w.plain_variable("Electric Field/Ex", "grid", np.arange(8.0))
+
+    @cached_result(cache=cache)
+    def total(arr):
+        return arr.sum()
+
+    ex = get_sdf(path).Electric_Field_Ex.data
+    assert total(ex) == total(ex) == 28.0 and cache.hits == 1
+
+    # 可写的映射按内容区分，原地修改后不会返回旧结果
+    writable = np.memmap(path, dtype=ex.dtype, mode="c", offset=ex.offset, shape=ex.shape)
+    assert total(writable) == 28.0
+    writable *= 2
+    assert total(writable) == 56.0
+
+
+def test_disabled_cache_writes_nothing(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), enabled=False)
+    f = cached_result(cache=cache)(lambda x: x + 1)
+    assert f(1) == 2
+    assert not (tmp_path / "cache").exists()
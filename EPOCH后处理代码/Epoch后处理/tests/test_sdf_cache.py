@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+
+from benchmarks.synthetic import SDFWriter
+from data_loading.sdf_cache import SDFCache
+
+
+def _write(path, value):
+    with SDFWriter(str(path)) as w:
+        w.plain_mesh("Grid/Grid", "grid", [np.linspace(0, 1, 9)])
+        w.plain_variable("Electric Field/Ex", "grid", np.full(8, value))
+    return str(path)
+
+
+def test_lru_eviction_releases_data(tmp_path):
+    paths = [_write(tmp_path / f"field{i:04d}.sdf", i) for i in range(3)]
+    cache = SDFCache(max_bytes=2 * 64)
+    opened = [cache.get(p) for p in paths[:2]]
+    for data in opened:
+        data.Electric_Field_Ex.data
+    assert cache.get(paths[0]) is opened[0] and cache.hits == 1
+
+    cache.get(paths[2]).Electric_Field_Ex.data
+    cache.get(paths[2])
+    # 最久未使用的 paths[1] 被淘汰，其内存映射被释放
+    assert cache.evictions == 1
+    assert opened[1].nbytes_loaded == 0
+    assert cache.get(paths[0]) is opened[0]
+
+
+def test_changed_file_is_reopened(tmp_path):
+    path = _write(tmp_path / "field0000.sdf", 1.0)
+    cache = SDFCache()
+    old = cache.get(path)
+    old.Electric_Field_Ex.data
+    _write(path, 2.0)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    new = cache.get(path)
+    assert new is not old and old.nbytes_loaded == 0
+    np.testing.assert_array_equal(new.Electric_Field_Ex.data, 2.0)
+
+    cache.invalidate(path)
+    assert new.nbytes_loaded == 0 and cache.nbytes == 0
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import SDFWriter
+from data_loading.sdf_lazy import LazySDF
+
+
+@pytest.fixture
+def sdf_file(tmp_path):
+    rng = np.random.default_rng(0)
+    edges = [np.linspace(0, 1, 5), np.linspace(-1, 1, 4), np.linspace(-1, 1, 3)]
+    values = rng.random((4, 3, 2))
+    coords = tuple(rng.random(6) for _ in range(3))
+    ids = np.arange(6, dtype=np.int64) + 1
+    path = str(tmp_path / "test0003.sdf")
+    with SDFWriter(path, step=3, time=2e-15) as w:
+        w.plain_mesh("Grid/Grid", "grid", edges)
+        w.plain_variable("Electric Field/Ex", "grid", values)
+        w.point_mesh("Grid/Particles/subset_testp/Photon", "grid/testp", coords, "Photon")
+        w.point_variable("Particles/ID/subset_testp/Photon", "grid/testp", ids, "Photon")
+    return path, edges, values, coords, ids
+
+
+def test_header_and_variables(sdf_file):
+    path, edges, values, coords, ids = sdf_file
+    data = LazySDF(path)
+    assert data.header["step"] == 3
+    assert data.header["time"] == pytest.approx(2e-15)
+    assert data.Electric_Field_Ex.dims == values.shape
+    np.testing.assert_array_equal(data.Electric_Field_Ex.data, values)
+    for axis, expected in zip(data.Grid_Grid.data, edges):
+        np.testing.assert_array_equal(axis, expected)
+    for axis, expected in zip(data.Grid_Grid_mid.data, edges):
+        np.testing.assert_allclose(axis, 0.5 * (expected[1:] + expected[:-1]))
+    for axis, expected in zip(data.Grid_Particles_subset_testp_Photon.data, coords):
+        np.testing.assert_array_equal(axis, expected)
+    np.testing.assert_array_equal(data.Particles_ID_subset_testp_Photon.data, ids)
+
+
+def test_data_is_read_only_and_released(sdf_file):
+    data = LazySDF(sdf_file[0])
+    assert data.nbytes_loaded == 0
+    ex = data.Electric_Field_Ex.data
+    assert not ex.flags.writeable
+    assert data.nbytes_loaded == ex.nbytes
+    data.release()
+    assert data.nbytes_loaded == 0
+
+
+def test_rejects_non_sdf(tmp_path):
+    path = tmp_path / "bad.sdf"
+    path.write_bytes(b"not an sdf file" * 10)
+    with pytest.raises(ValueError):
+        LazySDF(str(path))
@@ -1,7 +1,13 @@
 from .densit_plot import nd_plot_xy,nd_plot_yz,nd_plot_xsum
 from .calculate_energy_stats import ek_stats
+from .region_stats import region_stats,region_moments,sdf_region_moments
+from .region_selector import RegionSelector,GridAxis
+from .radial_profile import beam_core_profile,RadialBins,range_peaks
 from .fields_plot import ef_plot_xy
-from .angular_momentum import calc_angmom_x
+from .angular_momentum import calc_angmom_x,angmom_stats,angmom_from_file,angmom_series
+from .pulse_width import pulse_widths,dump_pulse_widths,crossing_widths,window_profiles
+from .pulse_train import segment_pulses,segment_dumps,pulse_x_ranges
+from .movie import export_movie,render_frames,encode_frames
 
 
 # from your_package import *
@@ -13,4 +19,25 @@ __all__ = [
     'nd_plot_xsum',      
     'ef_plot_xy',     
     'calc_angmom_x',   
+    'region_stats',
+    'region_moments',
+    'sdf_region_moments',
+    'RegionSelector',
+    'GridAxis',
+    'beam_core_profile',
+    'RadialBins',
+    'range_peaks',
+    'angmom_stats',
+    'angmom_from_file',
+    'angmom_series',
+    'pulse_widths',
+    'dump_pulse_widths',
+    'crossing_widths',
+    'window_profiles',
+    'segment_pulses',
+    'segment_dumps',
+    'pulse_x_ranges',
+    'export_movie',
+    'render_frames',
+    'encode_frames',
 ]
\ No newline at end of file
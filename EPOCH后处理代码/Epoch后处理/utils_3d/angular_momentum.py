@@ -1,7 +1,101 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import numpy as np
-import sdf_helper as sh
 import pandas as pd
 
+from data_loading.sdf_cache import get_sdf
+from data_loading.idall_data import particle_prefix, load_ppos
+from data_loading.instrument import traced
+
+DEFAULT_CHUNK = 1 << 20  # 每块粒子数
+COMPONENTS = ('Lx', 'Ly', 'Lz')
+
+
+@traced(cat='reduce')
+def angmom_stats(x, y, z, px, py, pz, weight=1.0,
+                 x_range=None, y_range=None, z_range=None,
+                 chunk_size=DEFAULT_CHUNK, pos_unit=1.0):
+    """
+    分块计算加权角动量矢量 L = r × p 的统计量：
+    Lx = y*pz - z*py，Ly = z*px - x*pz，Lz = x*py - y*px。
+
+    位置筛选、加权与求和在同一次遍历中完成，临时数组只有 chunk_size 大小，
+    输入可以是 LazySDF 返回的内存映射。
+
+    参数:
+    - x, y, z: 一维数组，位置
+    - px, py, pz: 一维数组，动量
+    - weight: 标量或一维数组，权重
+    - x_range, y_range, z_range: tuple(min, max) 或 None，筛选粒子位置范围（与 x / pos_unit 同单位）
+    - chunk_size: int，每块粒子数
+    - pos_unit: float，位置的单位，如直接读取 SDF 时传入 1e-6 将 m 换算为 μm
+
+    返回:
+    - stats: dict，包含 count、weight_sum、x/y/z 的 min/max，
+      以及 Lx/Ly/Lz 的 sum、mean（总和 / 权重和）、min、max（按粒子加权后的值），
+      如 stats['Lx_sum']
+    """
+    n = len(x)
+    scalar_weight = np.ndim(weight) == 0
+    chunk_size = min(chunk_size, max(n, 1))
+    r = [np.empty(chunk_size) for _ in range(3)]
+    L = np.empty(chunk_size)
+    tmp = np.empty(chunk_size)
+    mask = np.empty(chunk_size, dtype=bool)
+    cmp = np.empty(chunk_size, dtype=bool)
+
+    stats = {'count': 0, 'weight_sum': 0.0}
+    for c in 'xyz':
+        stats[f'{c}_min'], stats[f'{c}_max'] = np.inf, -np.inf
+    for name in COMPONENTS:
+        stats[f'{name}_sum'], stats[f'{name}_min'], stats[f'{name}_max'] = 0.0, np.inf, -np.inf
+
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        k = stop - start
+        m, t, lc = mask[:k], cmp[:k], L[:k]
+        for d, arr in enumerate((x, y, z)):
+            np.divide(arr[start:stop], pos_unit, out=r[d][:k])
+        m[:] = True
+        for d, rng in enumerate((x_range, y_range, z_range)):
+            if rng is None:
+                continue
+            np.greater_equal(r[d][:k], rng[0], out=t)
+            m &= t
+            np.less_equal(r[d][:k], rng[1], out=t)
+            m &= t
+        count = int(np.count_nonzero(m))
+        if count == 0:
+            continue
+
+        rx, ry, rz = (a[:k] for a in r)
+        p = (px[start:stop], py[start:stop], pz[start:stop])
+        w = weight if scalar_weight else weight[start:stop]
+        stats['count'] += count
+        stats['weight_sum'] += w * count if scalar_weight else np.add.reduce(w, where=m)
+        for c, a in zip('xyz', (rx, ry, rz)):
+            stats[f'{c}_min'] = min(stats[f'{c}_min'], np.minimum.reduce(a, where=m, initial=np.inf))
+            stats[f'{c}_max'] = max(stats[f'{c}_max'], np.maximum.reduce(a, where=m, initial=-np.inf))
+
+        # (a, b, c, d) 表示 L = a*c - b*d
+        for name, (a, b, pa, pb) in zip(COMPONENTS, ((ry, rz, p[2], p[1]),
+                                                     (rz, rx, p[0], p[2]),
+                                                     (rx, ry, p[1], p[0]))):
+            np.multiply(a, pa, out=lc)
+            np.multiply(b, pb, out=tmp[:k])
+            lc -= tmp[:k]
+            lc *= w
+            stats[f'{name}_sum'] += np.add.reduce(lc, where=m)
+            stats[f'{name}_min'] = min(stats[f'{name}_min'], np.minimum.reduce(lc, where=m, initial=np.inf))
+            stats[f'{name}_max'] = max(stats[f'{name}_max'], np.maximum.reduce(lc, where=m, initial=-np.inf))
+
+    for name in COMPONENTS:
+        stats[f'{name}_mean'] = stats[f'{name}_sum'] / stats['weight_sum'] if stats['weight_sum'] != 0 else 0.0
+    return stats
+
+
+@traced(cat='analysis')
 def calc_angmom_x(
     py, pz, x, y, z, weight=1.0,
     x_range=None, y_range=None, z_range=None,):
@@ -10,55 +104,109 @@ def calc_angmom_x(
     可按位置范围筛选粒子。
 
     参数:
-    - py, pz, x, y, z: 一维 ndarray，动量和位置数据
+    - py, pz, x, y, z: 一维 ndarray，动量和位置数据；
+      文件大于内存时可传入 load_pm 的内存映射与 load_ppos(..., lazy=True) 的视图，计算按块进行
     - weight: 标量或数组，权重，默认 1.0
     - x_range, y_range, z_range: tuple(min, max) 或 None，筛选粒子位置范围
 
     返回:
     - total_Lx: float，加权角动量总和
     - mean_Lx: float，加权角动量均值
+    - min_Lx, max_Lx: float，加权角动量最小值与最大值
     """
+    # px 不参与 Lx 的计算，用 py 占位
+    stats = angmom_stats(x, y, z, py, py, pz, weight, x_range, y_range, z_range)
+    if stats['count'] == 0:
+        raise ValueError("筛选后无匹配粒子。")
 
-    # 建立筛选掩码
-    mask = np.ones_like(x, dtype=bool)
-    if x_range is not None:
-        mask &= (x >= x_range[0]) & (x <= x_range[1])
-    if y_range is not None:
-        mask &= (y >= y_range[0]) & (y <= y_range[1])
-    if z_range is not None:
-        mask &= (z >= z_range[0]) & (z <= z_range[1])
-
-    # 筛选数据
-    py_sel = py[mask]
-    pz_sel = pz[mask]
-    x_sel = x[mask]
-    y_sel = y[mask]
-    z_sel = z[mask]
-
-    # 更鲁棒的权重处理
-    if isinstance(weight, (int, float)):
-        weight_sel = weight
-        total_weight = weight * len(py_sel)
-    else:
-        weight = np.asarray(weight)
-        weight_sel = weight[mask]
-        total_weight = weight_sel.sum()
-
-    # 计算加权角动量
-    Lx = (y_sel * pz_sel - z_sel * py_sel) * weight_sel
-
-    total_Lx = Lx.sum()
-    mean_Lx = total_Lx / total_weight if total_weight != 0 else 0.0
-    max_Lx = Lx.max()
-    min_Lx = Lx.min()
+    total_Lx = stats['Lx_sum']
+    mean_Lx = stats['Lx_mean']
+    max_Lx = stats['Lx_max']
+    min_Lx = stats['Lx_min']
 
     # 打印筛选后的位置范围和角动量
-    print(f"x范围: [{x_sel.min()}, {x_sel.max()}]")
-    print(f"y范围: [{y_sel.min()}, {y_sel.max()}]")
-    print(f"z范围: [{z_sel.min()}, {z_sel.max()}]")
+    print(f"x范围: [{stats['x_min']}, {stats['x_max']}]")
+    print(f"y范围: [{stats['y_min']}, {stats['y_max']}]")
+    print(f"z范围: [{stats['z_min']}, {stats['z_max']}]")
     print(f"加权角动量总和 Lx = {total_Lx}")
     print(f"加权角动量均值 mean_Lx = {mean_Lx}")
     print(f"加权角动量最小值 min_Lx = {min_Lx}")
     print(f"加权角动量最大值 max_Lx = {max_Lx}")
 
     return total_Lx, mean_Lx, min_Lx, max_Lx
+
+
+@traced(cat='analysis')
+def angmom_from_file(file_path, species='Photon', weight=1.0,
+                     x_range=None, y_range=None, z_range=None, chunk_size=DEFAULT_CHUNK):
+    """
+    直接从 idall SDF 文件计算角动量矢量统计量，位置以 μm 为单位筛选。
+    粒子数组以内存映射方式分块读取，不整体载入内存。
+
+    参数:
+    - file_path: str，idall SDF 文件路径
+    - species: str，'Photon' 或 'Electron'
+    - weight: 标量、一维数组，或 'file' 表示读取文件中的 Particles_Weight 变量
+    - 其余参数同 angmom_stats
+
+    返回:
+    - stats: dict，见 angmom_stats，另含 step 与 time
+    """
+    data = get_sdf(file_path)
+    prefix = particle_prefix(species)
+    x, y, z = load_ppos(file_path, species, lazy=True)
+    px = getattr(data, f"Particles_Px_{prefix}_{species}").data
+    py = getattr(data, f"Particles_Py_{prefix}_{species}").data
+    pz = getattr(data, f"Particles_Pz_{prefix}_{species}").data
+    if isinstance(weight, str) and weight == 'file':
+        weight = getattr(data, f"Particles_Weight_{prefix}_{species}").data
+
+    stats = angmom_stats(x, y, z, px, py, pz, weight, x_range, y_range, z_range, chunk_size)
+    header = getattr(data, 'header', {})
+    stats['step'] = header.get('step')
+    stats['time'] = header.get('time')
+    return stats
+
+
+def _series_task(file_index, file_path, species, weight, ranges, chunk_size):
+    if not os.path.exists(file_path):
+        print(f"File {os.path.basename(file_path)} not found.")
+        return None
+    stats = angmom_from_file(file_path, species, weight, *ranges, chunk_size=chunk_size)
+    stats['file_index'] = file_index
+    return stats
+
+
+@traced(cat='analysis')
+def angmom_series(base_path, file_indices, species='Photon', weight=1.0,
+                  x_range=None, y_range=None, z_range=None,
+                  file_prefix='idall', file_suffix='.sdf',
+                  n_workers=None, chunk_size=DEFAULT_CHUNK):
+    """
+    并行计算一系列 idall 文件的角动量矢量，返回时间序列表。
+
+    参数:
+    - base_path: str，数据目录
+    - file_indices: 可迭代的文件编号，文件名为 f"{prefix}{index:04d}{suffix}"
+    - species, weight, x_range, y_range, z_range, chunk_size: 同 angmom_from_file
+    - n_workers: int 或 None，进程数，None 为 CPU 核数，1 为在当前进程串行
+
+    返回:
+    - table: pandas.DataFrame，每个文件一行，按文件编号排序，
+      列包括 file_index、step、time、count、weight_sum 与 Lx/Ly/Lz 的 sum、mean、min、max
+    """
+    ranges = (x_range, y_range, z_range)
+    tasks = [(i, os.path.join(base_path, f"{file_prefix}{i:04d}{file_suffix}")) for i in file_indices]
+
+    if n_workers == 1:
+        results = [_series_task(i, p, species, weight, ranges, chunk_size) for i, p in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(_series_task, i, p, species, weight, ranges, chunk_size) for i, p in tasks]
+            results = [f.result() for f in as_completed(futures)]
+
+    rows = [r for r in results if r is not None]
+    columns = ['file_index', 'step', 'time', 'count', 'weight_sum'] + \
+              [f'{name}_{s}' for name in COMPONENTS for s in ('sum', 'mean', 'min', 'max')]
+    table = pd.DataFrame(rows, columns=columns)
+    return table.sort_values('file_index').reset_index(drop=True)
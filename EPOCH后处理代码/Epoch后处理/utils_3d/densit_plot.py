@@ -3,7 +3,15 @@ import numpy as np
 import matplotlib.pyplot as plt
 import os
 
-def nd_plot_xy(ne, x, y, z=None, z_pos=None, x_range=None, y_range=None, ax=None):
+from .region_selector import RegionSelector
+from .render import render_2d
+from data_loading.sdf_cache import get_sdf
+from data_loading.region_data import NC
+from data_loading.result_cache import cached_result
+from data_loading.instrument import traced
+
+@traced(cat='analysis')
+def nd_plot_xy(ne, x, y, z=None, z_pos=None, x_range=None, y_range=None, ax=None, selector=None):
     """
     绘制二维电子数密度 (x,y) 切片图，支持 x、y 方向范围裁剪，z方向用z_pos定位切片层。
 
@@ -14,39 +22,40 @@ def nd_plot_xy(ne, x, y, z=None, z_pos=None, x_range=None, y_range=None, ax=None
     - z_pos: float 或 None，z方向实际坐标，自动寻找最近层切片，默认中间层
     - x_range, y_range: tuple/list 或 None，裁剪范围
     - ax: matplotlib.axes.Axes 对象，传入则绘制在该ax上，否则新建图形
+    - selector: RegionSelector 或 None，同一网格反复绘图时传入，此时 x、y、z 可为 None
     """
 
+    if selector is None:
+        if ne.ndim == 3 and z is None:
+            raise ValueError("三维数据时必须传入z坐标数组z")
+        selector = RegionSelector(x, y, z)
+
     # 三维数据时，选取z层切片
     if ne.ndim == 3:
-        if z is None:
+        if selector.z is None:
             raise ValueError("三维数据时必须传入z坐标数组z")
         if z_pos is None:
             z_index = ne.shape[2] // 2  # 默认中间层
         else:
-            z_index = np.abs(z - z_pos).argmin()
+            z_index = selector.nearest('z', z_pos)
         ne = ne[:, :, z_index]
-        z_actual = z[z_index]
+        z_actual = selector.z.values[z_index]
     else:
         z_actual = None
 
-    # 裁剪 x 范围
-    if x_range is not None and len(x_range) == 2:
-        mask_x = (x >= x_range[0]) & (x <= x_range[1])
-        x = x[mask_x]
-        ne = ne[mask_x, :]
-    
-    # 裁剪 y 范围
-    if y_range is not None and len(y_range) == 2:
-        mask_y = (y >= y_range[0]) & (y <= y_range[1])
-        y = y[mask_y]
-        ne = ne[:, mask_y]
-
-    X, Y = np.meshgrid(x, y, indexing='ij')
+    # 裁剪 x、y 范围（切片视图，不复制数据）
+    x_range = x_range if x_range is not None and len(x_range) == 2 else None
+    y_range = y_range if y_range is not None and len(y_range) == 2 else None
+    x_slice, y_slice = selector.slices(x_range, y_range)[:2]
+    x = selector.x.values[x_slice]
+    y = selector.y.values[y_slice]
+    ne = ne[x_slice, y_slice]
 
     if ax is None:
         fig, ax = plt.subplots(figsize=(10, 6))
 
-    c = ax.pcolormesh(X, Y, ne, shading='auto', cmap='OrRd', rasterized=True)
+    # 均匀网格用 imshow 绘制，并按像素分辨率做最大值降采样
+    c = render_2d(ax, ne, x, y, 'OrRd', pool='max', uniform=selector.x.uniform and selector.y.uniform)
     plt.colorbar(c, ax=ax, label='$n_e / n_c$')
 
     title_z = f", z = {z_actual:.2f} μm" if z_actual is not None else ""
@@ -60,7 +69,9 @@ def nd_plot_xy(ne, x, y, z=None, z_pos=None, x_range=None, y_range=None, ax=None
 
     return ne
 
-def nd_plot_yz(ne, x, y, z, x_value=None, x_range=None, y_range=None, z_range=None, ax=None):
+@traced(cat='analysis')
+def nd_plot_yz(ne, x, y, z, x_value=None, x_range=None, y_range=None, z_range=None, ax=None,
+               selector=None):
     """
     绘制 YZ 切片图，支持单一切片或范围内的求和切片，并可指定 y 和 z 的范围。
 
@@ -71,44 +82,40 @@ def nd_plot_yz(ne, x, y, z, x_value=None, x_range=None, y_range=None, z_range=No
     - x_range: tuple，x 的范围 (x_min, x_max)（绘制范围内的求和切片）
     - y_range, z_range: tuple，可选，指定 y, z 范围
     - ax: matplotlib.axes.Axes 对象，可选，传入则绘制在该ax上
+    - selector: RegionSelector 或 None，同一网格反复绘图时传入，此时 x、y、z 可为 None
     """
 
     if x_value is not None and x_range is not None:
         raise ValueError("只能指定 x_value 或 x_range 中的一个，不能同时指定。")
+    if selector is None:
+        selector = RegionSelector(x, y, z)
+
+    # y、z 范围先转换为切片，只对所需区域求和
+    _, y_slice, z_slice = selector.slices(None, y_range, z_range)
+    y = selector.y.values[y_slice]
+    z = selector.z.values[z_slice]
 
     if x_value is not None:
-        x_idx = np.abs(x - x_value).argmin()
-        x_actual = x[x_idx]
-        ne_slice = ne[x_idx, :, :]  # shape (Ny, Nz)
+        x_idx = selector.nearest('x', x_value)
+        x_actual = selector.x.values[x_idx]
+        ne_slice = ne[x_idx, y_slice, z_slice]  # shape (Ny, Nz)
         title = f'YZ slice at x = {x_actual:.2f} μm'
     elif x_range is not None:
-        mask_x = (x >= x_range[0]) & (x <= x_range[1])
-        if not np.any(mask_x):
+        try:
+            x_slice = selector.x.index_range(x_range)
+        except ValueError:
             raise ValueError("x_range范围内无数据")
-        ne_slice = np.sum(ne[mask_x, :, :], axis=0)  # shape (Ny, Nz)
+        ne_slice = np.sum(ne[x_slice, y_slice, z_slice], axis=0)  # shape (Ny, Nz)
         title = f'YZ slice: x in [{x_range[0]}, {x_range[1]}] μm'
     else:
         raise ValueError("必须指定 x_value 或 x_range 中的一个。")
 
-    # 裁剪 y 范围
-    if y_range is not None:
-        mask_y = (y >= y_range[0]) & (y <= y_range[1])
-        y = y[mask_y]
-        ne_slice = ne_slice[mask_y, :]
-    # 裁剪 z 范围
-    if z_range is not None:
-        mask_z = (z >= z_range[0]) & (z <= z_range[1])
-        z = z[mask_z]
-        ne_slice = ne_slice[:, mask_z]
-
-    # 生成网格，注意 Y 和 Z 对应数据维度 (len(y), len(z))
-    Y, Z = np.meshgrid(y, z, indexing='ij')
-
     # 创建图形或使用传入ax
     if ax is None:
         fig, ax = plt.subplots(figsize=(10, 6))
 
-    c = ax.pcolormesh(Y, Z, ne_slice, shading='auto', cmap="OrRd", rasterized=True)
+    # ne_slice 的维度为 (len(y), len(z))
+    c = render_2d(ax, ne_slice, y, z, 'OrRd', pool='max', uniform=selector.y.uniform and selector.z.uniform)
     plt.colorbar(c, ax=ax, label='$n_e / n_c$')
     ax.set_title(title + f'\ny range: [{y.min():.2f}, {y.max():.2f}] μm, z range: [{z.min():.2f}, {z.max():.2f}] μm')
     ax.set_xlabel('y (μm)')
@@ -120,54 +127,56 @@ def nd_plot_yz(ne, x, y, z, x_value=None, x_range=None, y_range=None, z_range=No
 
     return ne_slice
 
-def nd_plot_xsum(ne, x, y, z, x_range=None, y_range=None, z_range=None, ax=None):
+@traced(cat='reduce')
+@cached_result
+def xsum_profile(file_path, species, slices):
+    """
+    SDF 文件中归一化数密度（ne / nc）在子区域内沿 y、z 求和得到的 x 方向剖面。
+
+    直接从文件读取子区域（lazy 后端下只读取该区域），开启 result_cache 时结果按文件、粒子种类与切片
+    缓存到磁盘（见 data_loading.result_cache），不需要对内存中的大数组计算内容哈希。
+    """
+    ne = getattr(get_sdf(file_path), f"Derived_Number_Density_{species}").data
+    return np.sum(ne[slices], axis=(1, 2)) / NC
+
+@traced(cat='analysis')
+def nd_plot_xsum(ne, x, y, z, x_range=None, y_range=None, z_range=None, ax=None, selector=None,
+                 species='Photon'):
     """
     在给定的 x、y 和 z 范围内对电子数密度数据求和，并绘制 x 方向的折线图。
 
     参数:
-    - ne: ndarray，三维电子数密度数据 (x, y, z)
+    - ne: ndarray，三维电子数密度数据 (x, y, z)；
+      也可以是 SDF 文件路径，此时只读取子区域，剖面按文件缓存（见 xsum_profile），x、y、z 可为 None
     - x, y, z: ndarray，分别是三个方向的坐标（单位：μm）
     - x_range: tuple/list 或 None，裁剪 x 范围 (x_min, x_max)
     - y_range: tuple/list 或 None，裁剪 y 范围 (y_min, y_max)
     - z_range: tuple/list 或 None，裁剪 z 范围 (z_min, z_max)
     - ax: matplotlib.axes.Axes 对象，传入则绘制在该ax上，否则新建图形
+    - selector: RegionSelector 或 None，同一网格反复绘图时传入，此时 x、y、z 可为 None
+    - species: str，ne 为文件路径时读取的粒子种类
     """
-
-    # 确定 x 范围索引
-    if x_range is None:
-        x_start, x_end = 0, len(x)
-    else:
-        x_indices = np.where((x >= x_range[0]) & (x <= x_range[1]))[0]
-        if len(x_indices) == 0:
-            raise ValueError("指定的 x_range 没有匹配的索引。")
-        x_start, x_end = x_indices[0], x_indices[-1] + 1
-
-    # 确定 y 范围索引
-    if y_range is None:
-        y_start, y_end = 0, len(y)
+    from_file = isinstance(ne, (str, os.PathLike))
+    if selector is None:
+        selector = RegionSelector.from_sdf(ne) if from_file and x is None else RegionSelector(x, y, z)
+
+    # 确定 x、y、z 范围索引
+    slices = []
+    for label, rng in (('x', x_range), ('y', y_range), ('z', z_range)):
+        try:
+            slices.append(getattr(selector, label).index_range(rng))
+        except ValueError:
+            raise ValueError(f"指定的 {label}_range 没有匹配的索引。")
+    slices = tuple(slices)
+
+    # 提取指定范围内的数据（视图）并对 y 和 z 方向求和
+    if from_file:
+        ne_sum = xsum_profile(ne, species, slices)
     else:
-        y_indices = np.where((y >= y_range[0]) & (y <= y_range[1]))[0]
-        if len(y_indices) == 0:
-            raise ValueError("指定的 y_range 没有匹配的索引。")
-        y_start, y_end = y_indices[0], y_indices[-1] + 1
-
-    # 确定 z 范围索引
-    if z_range is None:
-        z_start, z_end = 0, len(z)
-    else:
-        z_indices = np.where((z >= z_range[0]) & (z <= z_range[1]))[0]
-        if len(z_indices) == 0:
-            raise ValueError("指定的 z_range 没有匹配的索引。")
-        z_start, z_end = z_indices[0], z_indices[-1] + 1
-
-    # 提取指定范围内的数据
-    ne_sub = ne[x_start:x_end, y_start:y_end, z_start:z_end]
-
-    # 对 y 和 z 方向求和
-    ne_sum = np.sum(ne_sub, axis=(1, 2))
+        ne_sum = np.sum(ne[slices], axis=(1, 2))
 
     # 取对应 x 范围的坐标
-    x_sub = x[x_start:x_end]
+    x_sub = selector.x.values[slices[0]]
 
     # 绘图
     if ax is None:
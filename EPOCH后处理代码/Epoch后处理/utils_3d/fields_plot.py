@@ -1,9 +1,13 @@
-import numpy as np
 import matplotlib.pyplot as plt
 import os
 
+from .region_selector import RegionSelector
+from .render import render_2d
+from data_loading.instrument import traced
+
+@traced(cat='analysis')
 def ef_plot_xy(x, y, z=None, field_data=None, field_name=None, 
-                     x_range=None, y_range=None, z_value=None, ax=None):
+                     x_range=None, y_range=None, z_value=None, ax=None, selector=None):
     """
     绘制单一电场分量在指定 z 切片的 XY 面热力图。
 
@@ -15,6 +19,7 @@ def ef_plot_xy(x, y, z=None, field_data=None, field_name=None,
     - x_range, y_range: tuple，裁剪范围 (min, max)，默认全范围。
     - z_value: float，指定绘制的 z 层坐标，默认中间层。
     - ax: matplotlib.axes.Axes 对象，传入则绘制在此轴，否则新建图。
+    - selector: RegionSelector 或 None，同一网格反复绘图时传入，此时 x、y、z 可为 None。
     """
 
     if field_data is None:
@@ -22,40 +27,41 @@ def ef_plot_xy(x, y, z=None, field_data=None, field_name=None,
     if field_name is None:
         field_name = "Field"
 
+    if selector is None:
+        if field_data.ndim == 3 and z is None:
+            raise ValueError("三维数据时必须传入 z 坐标数组")
+        selector = RegionSelector(x, y, z)
+
     # 处理三维数据，选取z切片
     if field_data.ndim == 3:
-        if z is None:
+        if selector.z is None:
             raise ValueError("三维数据时必须传入 z 坐标数组")
         if z_value is None:
             z_idx = field_data.shape[2] // 2
         else:
-            z_idx = np.abs(z - z_value).argmin()
+            z_idx = selector.nearest('z', z_value)
         field_slice = field_data[:, :, z_idx]
-        z_actual = z[z_idx]
+        z_actual = selector.z.values[z_idx]
     elif field_data.ndim == 2:
         field_slice = field_data
         z_actual = None
     else:
         raise ValueError("field_data 维度应为2或3维")
 
-    # 裁剪 x
-    if x_range is not None and len(x_range) == 2:
-        mask_x = (x >= x_range[0]) & (x <= x_range[1])
-        x = x[mask_x]
-        field_slice = field_slice[mask_x, :]
-
-    # 裁剪 y
-    if y_range is not None and len(y_range) == 2:
-        mask_y = (y >= y_range[0]) & (y <= y_range[1])
-        y = y[mask_y]
-        field_slice = field_slice[:, mask_y]
-
-    X, Y = np.meshgrid(x, y, indexing='ij')
+    # 裁剪 x、y（切片视图，不复制数据）
+    x_range = x_range if x_range is not None and len(x_range) == 2 else None
+    y_range = y_range if y_range is not None and len(y_range) == 2 else None
+    x_slice, y_slice = selector.slices(x_range, y_range)[:2]
+    x = selector.x.values[x_slice]
+    y = selector.y.values[y_slice]
+    field_slice = field_slice[x_slice, y_slice]
 
     if ax is None:
         fig, ax = plt.subplots(figsize=(10, 6))
 
-    c = ax.pcolormesh(X, Y, field_slice, shading='auto', cmap='RdBu_r', rasterized=True)
+    # 正负交替的场按绝对值最大降采样，保留峰值及其符号
+    c = render_2d(ax, field_slice, x, y, 'RdBu_r', pool='absmax',
+                  uniform=selector.x.uniform and selector.y.uniform)
     plt.colorbar(c, ax=ax, label=field_name)
 
     title_z = f", z = {z_actual:.2f} μm" if z_actual is not None else ""
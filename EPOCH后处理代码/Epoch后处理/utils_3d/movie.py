@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import matplotlib.pyplot as plt
+from data_loading.instrument import traced
+
+FRAME_NAME = "frame_{:04d}.png"
+MANIFEST_NAME = "frames.json"  # 记录每帧的来源文件与绘图设置
+
+
+def _settings_key(plot_frame, figsize, dpi, kwargs):
+    """绘图函数、kwargs、figsize 与 dpi 的哈希，任一项改变时已有的帧需要重新绘制"""
+    h = hashlib.sha1()
+    h.update(f"{getattr(plot_frame, '__module__', '')}.{getattr(plot_frame, '__qualname__', repr(plot_frame))}"
+             f"|{tuple(figsize)}|{dpi}".encode())
+    for name in sorted(kwargs):
+        value = kwargs[name]
+        h.update(f"|{name}=".encode())
+        if isinstance(value, np.ndarray):
+            # repr 会省略大数组的中间部分，数组按内容哈希
+            h.update(f"{value.dtype.str}{value.shape}".encode())
+            h.update(np.ascontiguousarray(value).tobytes())
+        else:
+            h.update(repr(value).encode())
+    return h.hexdigest()
+
+
+def _read_manifest(frame_dir):
+    try:
+        with open(os.path.join(frame_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(frame_dir, manifest):
+    path = os.path.join(frame_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def _render_frame(plot_frame, file_path, file_index, png_path, figsize, dpi, kwargs):
+    """子进程任务：用 Agg 后端绘制一帧并保存为 PNG，返回 (编号, 绘图耗时, 保存耗时)"""
+    plt.switch_backend('Agg')
+    fig, ax = plt.subplots(figsize=figsize, dpi=dpi)
+    try:
+        t0 = time.perf_counter()
+        plot_frame(ax, file_path, file_index, **kwargs)
+        t1 = time.perf_counter()
+        # 先写临时文件再改名，中断时不会留下不完整的帧
+        tmp = png_path + ".tmp.png"
+        fig.savefig(tmp, dpi=dpi)
+        os.replace(tmp, png_path)
+        t2 = time.perf_counter()
+    finally:
+        plt.close(fig)
+    return file_index, t1 - t0, t2 - t1
+
+
+@traced(cat='render')
+def render_frames(plot_frame, base_path, file_indices, frame_dir, file_prefix='density', file_suffix='.sdf',
+                  figsize=(6, 6), dpi=100, n_workers=None, overwrite=False, **kwargs):
+    """
+    并行把一系列输出逐帧绘制为 PNG。
+
+    每帧在独立进程中用 Agg 后端绘制，读取与绘图同时在多个进程中进行；
+    已存在、比对应 SDF 文件新、且绘图设置（plot_frame、kwargs、figsize、dpi）未变的帧直接跳过，
+    各帧的来源文件与设置记录在 frame_dir 中的 frames.json。
+
+    参数:
+    - plot_frame: 可调用对象，plot_frame(ax, file_path, file_index, **kwargs) 在 ax 上绘制一帧；
+      多进程时必须是模块级函数（可被 pickle）
+    - base_path: str，数据目录
+    - file_indices: 可迭代的文件编号，文件名为 f"{prefix}{index:04d}{suffix}"
+    - frame_dir: str，PNG 帧的保存目录，文件名为 frame_<编号>.png
+    - figsize, dpi: 每帧的图像大小与分辨率
+    - n_workers: int 或 None，进程数，None 为 CPU 核数，1 为在当前进程串行
+    - overwrite: bool，是否重新绘制已存在的帧
+    - **kwargs: 传给 plot_frame 的其他参数
+
+    返回:
+    - frames: list of str，按 file_indices 顺序排列的 PNG 路径（缺失的输出不包含在内）
+    - timing: dict，包含 frames、rendered、skipped、missing、render_wall（墙钟时间）、
+      plot_cpu 与 save_cpu（各帧绘图与保存耗时之和），单位 s
+    """
+    os.makedirs(frame_dir, exist_ok=True)
+    key = _settings_key(plot_frame, figsize, dpi, kwargs)
+    manifest = _read_manifest(frame_dir)
+    frames, tasks = [], []
+    timing = {'frames': 0, 'rendered': 0, 'skipped': 0, 'missing': 0,
+              'render_wall': 0.0, 'plot_cpu': 0.0, 'save_cpu': 0.0}
+    for i in file_indices:
+        file_path = os.path.join(base_path, f"{file_prefix}{i:04d}{file_suffix}")
+        if not os.path.exists(file_path):
+            print(f"File {os.path.basename(file_path)} not found.")
+            timing['missing'] += 1
+            continue
+        png_path = os.path.join(frame_dir, FRAME_NAME.format(i))
+        frames.append(png_path)
+        entry = {"source": os.path.abspath(file_path), "settings": key}
+        if not overwrite and os.path.exists(png_path) and \
+                manifest.get(os.path.basename(png_path)) == entry and \
+                os.path.getmtime(png_path) >= os.path.getmtime(file_path):
+            timing['skipped'] += 1
+            continue
+        tasks.append((file_path, i, png_path))
+
+    def _done(task, result):
+        results.append(result)
+        manifest[os.path.basename(task[2])] = {"source": os.path.abspath(task[0]), "settings": key}
+
+    start = time.perf_counter()
+    results = []
+    try:
+        if n_workers == 1 or len(tasks) <= 1:
+            for p, i, png in tasks:
+                _done((p, i, png), _render_frame(plot_frame, p, i, png, figsize, dpi, kwargs))
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                futures = {pool.submit(_render_frame, plot_frame, p, i, png, figsize, dpi, kwargs): (p, i, png)
+                           for p, i, png in tasks}
+                for f in as_completed(futures):
+                    _done(futures[f], f.result())
+    finally:
+        # 中断时也记录已完成的帧，下次只补画其余帧
+        if tasks:
+            _write_manifest(frame_dir, manifest)
+    timing['render_wall'] = time.perf_counter() - start
+
+    timing['frames'] = len(frames)
+    timing['rendered'] = len(results)
+    timing['plot_cpu'] = sum(r[1] for r in results)
+    timing['save_cpu'] = sum(r[2] for r in results)
+    return frames, timing
+
+
+def encode_frames(frames, output, fps=5):
+    """
+    将 PNG 帧编码为动图或视频。
+
+    参数:
+    - frames: list of str，按顺序排列的 PNG 路径
+    - output: str，输出文件，.gif 使用 Pillow 编码，.mp4 等其他格式调用本机的 ffmpeg
+    - fps: float，帧率
+
+    返回:
+    - elapsed: float，编码耗时（s）
+    """
+    if not frames:
+        raise ValueError("没有可编码的帧")
+    start = time.perf_counter()
+    ext = os.path.splitext(output)[1].lower()
+    if ext == '.gif':
+        from PIL import Image
+        # 帧按需逐个读取，不会同时全部载入内存
+        first = Image.open(frames[0]).convert('RGB')
+        rest = (Image.open(f).convert('RGB') for f in frames[1:])
+        first.save(output, save_all=True, append_images=rest, duration=int(round(1000 / fps)), loop=0)
+    else:
+        ffmpeg = shutil.which('ffmpeg')
+        if ffmpeg is None:
+            raise ValueError(f"未找到 ffmpeg，无法编码 {ext} 文件，可改为输出 .gif")
+        cmd = [ffmpeg, '-y', '-loglevel', 'error', '-f', 'image2pipe', '-framerate', str(fps), '-i', '-',
+               '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', output]
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        for f in frames:
+            with open(f, 'rb') as fh:
+                proc.stdin.write(fh.read())
+        proc.stdin.close()
+        if proc.wait() != 0:
+            raise ValueError(f"ffmpeg 编码失败：{output}")
+    return time.perf_counter() - start
+
+
+@traced(cat='analysis')
+def export_movie(plot_frame, base_path, file_indices, output, frame_dir=None,
+                 file_prefix='density', file_suffix='.sdf', fps=5, figsize=(6, 6), dpi=100,
+                 n_workers=None, overwrite=False, **kwargs):
+    """
+    由一系列输出生成动画：先并行绘制 PNG 帧（见 render_frames），再编码为 GIF/MP4（见 encode_frames），
+    代替在 FuncAnimation 的 update 中逐帧读取文件。
+
+    用法:
+        def spectrum_frame(ax, file_path, index):
+            energy, counts = load_spectrum(file_path, variable='en', step=1)
+            ax.semilogy(energy, counts)
+            ax.set_title(f"Energy Spectrum - Frame {index}")
+
+        export_movie(spectrum_frame, base_path, range(1, 81), 'spectrum.gif', file_prefix='distfun')
+
+    参数:
+    - plot_frame, base_path, file_indices, file_prefix, file_suffix, figsize, dpi, n_workers, overwrite, **kwargs:
+      同 render_frames
+    - output: str，输出文件（.gif 或 .mp4）
+    - frame_dir: str 或 None，帧目录，默认为 output 去掉扩展名后加 '_frames'
+    - fps: float，帧率
+
+    返回:
+    - timing: dict，render_frames 的计时结果，另含 encode（编码耗时）与 total
+    """
+    start = time.perf_counter()
+    frame_dir = frame_dir or os.path.splitext(output)[0] + '_frames'
+    frames, timing = render_frames(plot_frame, base_path, file_indices, frame_dir, file_prefix, file_suffix,
+                                   figsize, dpi, n_workers, overwrite, **kwargs)
+    timing['encode'] = encode_frames(frames, output, fps)
+    timing['total'] = time.perf_counter() - start
+
+    print(f"帧：{timing['frames']}（绘制 {timing['rendered']}，跳过 {timing['skipped']}，缺失 {timing['missing']}）")
+    print(f"绘制：{timing['render_wall']:.2f} s（各帧绘图 {timing['plot_cpu']:.2f} s，保存 {timing['save_cpu']:.2f} s）")
+    print(f"编码：{timing['encode']:.2f} s，总计：{timing['total']:.2f} s -> {output}")
+    return timing
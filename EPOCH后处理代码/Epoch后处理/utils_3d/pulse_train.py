@@ -0,0 +1,212 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from scipy.ndimage import gaussian_filter1d
+
+from data_loading.sdf_cache import get_sdf
+from .radial_profile import beam_core_profile
+from data_loading.instrument import traced
+
+
+def _local_maxima(S, height):
+    """二维数组每行的局部极大值（不含端点，平台取左端），返回按 (行, 位置) 排序的索引"""
+    is_max = np.zeros(S.shape, dtype=bool)
+    is_max[:, 1:-1] = (S[:, 1:-1] > S[:, :-2]) & (S[:, 1:-1] >= S[:, 2:]) & (S[:, 1:-1] >= height[:, None])
+    return np.nonzero(is_max)
+
+
+def _segments(flat, rows, pos, n, nx):
+    """
+    以各行起点与各峰位置为分段起点，求每段最小值及其位置。
+    第 k 个峰左侧的谷为第 k 段之前一段的最小值，右侧的谷为第 k 段的最小值。
+    """
+    fpos = rows * nx + pos
+    starts = np.sort(np.concatenate((np.arange(n) * nx, fpos)))
+    seg_min = np.minimum.reduceat(flat, starts)
+    lengths = np.diff(np.append(starts, len(flat)))
+    hit = flat == np.repeat(seg_min, lengths)
+    seg_arg = np.minimum.reduceat(np.where(hit, np.arange(len(flat)), len(flat)), starts)
+    k = np.searchsorted(starts, fpos)
+    return seg_min, seg_arg, k
+
+
+@traced(cat='reduce')
+def segment_pulses(x, profiles, prominence=0.05, height=0.05, sigma=2.0, edge_level=0.01, extra=None):
+    """
+    将轴上积分剖面自动切分为单个阿秒脉冲，代替手工给出的 x_ranges。
+
+    先找出高于 height 的局部极大值，再反复去掉突出度不足的峰：
+    每个峰的突出度为峰值减去其与相邻峰之间两个谷中较高者，
+    每轮在每行中同时去掉所有“比两侧相邻峰都弱”的不合格峰，直到全部合格。
+    相邻脉冲以两峰之间的最低点为界，首尾脉冲的外侧边界为剖面降至 edge_level 倍峰值处。
+    所有行（多个输出、多个参数扫描）在展平的数组上一并处理，没有逐行循环。
+
+    参数:
+    - x: ndarray，一维坐标（各行共用）或与 profiles 同形状的二维坐标（单位：μm）
+    - profiles: ndarray，形状 (n_rows, nx) 或一维，每行一条剖面
+    - prominence: float，最小突出度，相对该行最大值
+    - height: float，峰值下限，相对该行最大值
+    - sigma: float，寻峰前高斯平滑的宽度（格点数），0 或 None 为不平滑；积分使用未平滑的剖面
+    - edge_level: float，首尾脉冲外侧边界的阈值，相对该峰峰值
+    - extra: dict 或 None，名称 -> 与 profiles 同形状的剖面，在同样的窗口内积分（如 {'nE': nE}）
+
+    返回:
+    - pulses: pandas.DataFrame，每个脉冲一行，列为 row、pulse、x_min、x_max、x_peak、peak、
+      prominence、integral（剖面 × dx 之和），以及 extra 中各剖面的 <name>_integral
+    """
+    P = np.atleast_2d(np.asarray(profiles, dtype=np.float64))
+    X = np.broadcast_to(np.asarray(x, dtype=np.float64), P.shape)
+    n, nx = P.shape
+    S = gaussian_filter1d(P, sigma, axis=1) if sigma else P
+    flat = S.ravel()
+    row_max = S.max(axis=1)
+
+    rows, pos = _local_maxima(S, height * row_max)
+    while len(rows):
+        seg_min, _, k = _segments(flat, rows, pos, n, nx)
+        prom = S[rows, pos] - np.maximum(seg_min[k - 1], seg_min[k])
+        weak = prom < prominence * row_max[rows]
+        if not weak.any():
+            break
+        # 与同一行的前后相邻峰比较 (突出度, 位置)，只去掉局部最弱的峰，避免相邻两峰同时被去掉
+        same_prev = np.r_[False, rows[1:] == rows[:-1]]
+        same_next = np.r_[rows[:-1] == rows[1:], False]
+        prev_prom = np.r_[np.inf, prom[:-1]]
+        next_prom = np.r_[prom[1:], np.inf]
+        below_prev = ~same_prev | (prom < prev_prom)
+        below_next = ~same_next | (prom <= next_prom)
+        keep = ~(weak & below_prev & below_next)
+        rows, pos = rows[keep], pos[keep]
+
+    columns = ['row', 'pulse', 'x_min', 'x_max', 'x_peak', 'peak', 'prominence', 'integral']
+    extra = dict(extra or {})
+    columns += [f'{name}_integral' for name in extra]
+    if len(rows) == 0:
+        return pd.DataFrame(columns=columns)
+
+    seg_min, seg_arg, k = _segments(flat, rows, pos, n, nx)
+    prom = S[rows, pos] - np.maximum(seg_min[k - 1], seg_min[k])
+    first = np.r_[True, rows[1:] != rows[:-1]]
+    last = np.r_[rows[:-1] != rows[1:], True]
+
+    # 首尾脉冲的外侧边界：向外第一个低于 edge_level * 峰值的格点
+    col = np.arange(nx)
+    level = edge_level * S[rows, pos]
+    below = S[rows] < level[:, None]
+    outer_left = np.where(below & (col < pos[:, None]), col, 0).max(axis=1)
+    outer_right = np.where(below & (col > pos[:, None]), col, nx - 1).min(axis=1)
+
+    start = np.where(first, outer_left, np.r_[0, seg_arg[k[:-1]] - rows[:-1] * nx])
+    stop = np.where(last, outer_right, seg_arg[k] - rows * nx)
+
+    # 窗口 [start, stop) 的积分，最后一个脉冲包含右边界
+    stop_excl = np.where(last, stop + 1, stop)
+    dx = np.abs(np.diff(X, axis=1)).mean(axis=1)
+    pulse = np.arange(len(rows)) - np.flatnonzero(first)[np.cumsum(first) - 1]
+
+    def integrate(arr):
+        arr = np.atleast_2d(np.asarray(arr, dtype=np.float64))
+        cum = np.concatenate((np.zeros((n, 1)), np.cumsum(arr, axis=1)), axis=1)
+        return (cum[rows, stop_excl] - cum[rows, start]) * dx[rows]
+
+    table = {
+        'row': rows, 'pulse': pulse,
+        'x_min': X[rows, start], 'x_max': X[rows, stop],
+        'x_peak': X[rows, pos], 'peak': S[rows, pos], 'prominence': prom,
+        'integral': integrate(P),
+    }
+    for name, arr in extra.items():
+        table[f'{name}_integral'] = integrate(arr)
+    return pd.DataFrame(table, columns=columns)
+
+
+def pulse_x_ranges(pulses, by='row'):
+    """
+    将 segment_pulses / segment_dumps 的结果转换为 x_ranges，可直接传给 pulse_widths 等函数。
+
+    参数:
+    - pulses: pandas.DataFrame，分段结果
+    - by: str，分组列，如 'row' 或 'file_index'
+
+    返回:
+    - x_ranges: dict，分组值 -> list of tuple(x_min, x_max)
+    """
+    return {key: list(zip(group['x_min'], group['x_max']))
+            for key, group in pulses.groupby(by, sort=True)}
+
+
+def _profile_task(run, file_index, file_path, species, radius, center):
+    if not os.path.exists(file_path):
+        print(f"File {os.path.basename(file_path)} not found.")
+        return None
+    profiles, _ = beam_core_profile(file_path, species, radii=(radius,), center=center)
+    header = getattr(get_sdf(file_path), 'header', {})
+    return (run, file_index, header.get('time'), profiles['x'],
+            profiles['ne'][:, 0], profiles['nE'][:, 0])
+
+
+@traced(cat='analysis')
+def segment_dumps(base_path, file_indices, species='Photon', radius=0.5, center=(0.0, 0.0),
+                  quantity='ne', prominence=0.05, height=0.05, sigma=2.0, edge_level=0.01,
+                  file_prefix='density', file_suffix='.sdf', n_workers=None, csv_path=None):
+    """
+    对多个输出（可跨多个参数扫描目录）的轴上积分剖面自动分段。
+
+    各输出的 r < radius 圆盘积分剖面（同 beam_core_profile）由进程池并行计算，
+    之后所有剖面一起交给 segment_pulses 一次完成分段。
+
+    参数:
+    - base_path: str 或 list of str，数据目录；给出多个目录时结果中 run 列为目录路径
+    - file_indices: 可迭代的文件编号，文件名为 f"{prefix}{index:04d}{suffix}"
+    - species: str，粒子种类
+    - radius: float，积分半径（单位：μm）
+    - center: tuple，轴线在 y–z 平面上的位置（单位：μm）
+    - quantity: 'ne' 或 'nE'，用于寻峰的剖面，另一个剖面同时积分
+    - prominence, height, sigma, edge_level: 同 segment_pulses
+    - n_workers: int 或 None，进程数，None 为 CPU 核数，1 为在当前进程串行
+    - csv_path: str 或 None，给出时将结果表写入 CSV
+
+    返回:
+    - pulses: pandas.DataFrame，每个脉冲一行，列为 run、file_index、time、pulse、x_min、x_max、x_peak、
+      peak、prominence、ne_integral、nE_integral
+    """
+    if quantity not in ('ne', 'nE'):
+        raise ValueError(f"不支持的物理量：{quantity}，可选值为 ['ne', 'nE']")
+    runs = [base_path] if isinstance(base_path, str) else list(base_path)
+    tasks = [(run, i, os.path.join(run, f"{file_prefix}{i:04d}{file_suffix}"))
+             for run in runs for i in file_indices]
+
+    if n_workers == 1:
+        results = [_profile_task(r, i, p, species, radius, center) for r, i, p in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(_profile_task, r, i, p, species, radius, center) for r, i, p in tasks]
+            results = [f.result() for f in as_completed(futures)]
+    results = sorted((r for r in results if r is not None), key=lambda r: (runs.index(r[0]), r[1]))
+
+    columns = ['run', 'file_index', 'time', 'pulse', 'x_min', 'x_max', 'x_peak', 'peak',
+               'prominence', 'ne_integral', 'nE_integral']
+    if not results:
+        return pd.DataFrame(columns=columns)
+    if len({len(r[3]) for r in results}) > 1:
+        raise ValueError("各输出的 x 网格点数不同，无法一起分段")
+
+    x = np.stack([r[3] for r in results])
+    ne = np.stack([r[4] for r in results])
+    nE = np.stack([r[5] for r in results])
+    other = 'nE' if quantity == 'ne' else 'ne'
+    pulses = segment_pulses(x, ne if quantity == 'ne' else nE, prominence, height, sigma, edge_level,
+                            extra={other: nE if other == 'nE' else ne})
+    pulses = pulses.rename(columns={'integral': f'{quantity}_integral'})
+    row = pulses['row'].to_numpy()
+    pulses.insert(0, 'run', np.array([r[0] for r in results], dtype=object)[row])
+    pulses.insert(1, 'file_index', np.array([r[1] for r in results])[row])
+    pulses.insert(2, 'time', np.array([np.nan if r[2] is None else r[2] for r in results])[row])
+    pulses = pulses[columns]
+
+    if csv_path is not None:
+        pulses.to_csv(csv_path, index=False)
+        print(f"已保存分段表：{csv_path}")
+    return pulses
@@ -0,0 +1,249 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from scipy.ndimage import gaussian_filter1d
+
+from data_loading.sdf_cache import get_sdf
+from data_loading.region_data import NC, range_to_slice, load_region, grid_axes
+from data_loading.instrument import traced
+
+HALF = 0.5
+ONE_OVER_E = 1 / np.e
+QUANTITIES = ('ne', 'nE')
+
+
+def _interp_crossing(x0, x1, y0, y1, level):
+    """两点间线性插值，求 y = level 的位置"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(y1 != y0, (level - y0) / (y1 - y0), 0.0)
+    return x0 + t * (x1 - x0)
+
+
+@traced(cat='reduce')
+def crossing_widths(coord, profiles, level=HALF, baseline=True):
+    """
+    对多条剖面同时计算峰值位置与给定高度处的宽度（如半高宽），不逐条插值。
+
+    每行取最高点为主峰，向两侧寻找第一个低于阈值的格点，
+    交点由相邻两格点线性插值得到；某侧没有低于阈值的格点时取该侧窗口端点。
+    剖面中的 NaN 表示窗口以外的位置（见 window_profiles）。
+
+    参数:
+    - coord: ndarray，一维坐标（各行共用）或与 profiles 同形状的二维坐标
+    - profiles: ndarray，形状 (n_rows, n_points) 或一维
+    - level: float，阈值相对峰高的比例，0.5 为半高宽，1/e 为 1/e 宽度
+    - baseline: bool，True 时以窗口内最小值为基线，阈值为 base + level * (peak - base)；
+      False 时阈值为 level * peak
+
+    返回:
+    - result: dict，各项为长度 n_rows 的数组：peak_pos、peak、baseline、level、left、right、width，
+      无有效峰值的行为 NaN
+    """
+    y = np.atleast_2d(np.asarray(profiles, dtype=np.float64))
+    x = np.broadcast_to(np.asarray(coord, dtype=np.float64), y.shape)
+    n, m = y.shape
+    rows = np.arange(n)
+    col = np.arange(m)
+
+    valid = np.isfinite(y) & np.isfinite(x)
+    first = np.argmax(valid, axis=1)
+    last = m - 1 - np.argmax(valid[:, ::-1], axis=1)
+    peak_idx = np.argmax(np.where(valid, y, -np.inf), axis=1)
+    peak = y[rows, peak_idx]
+    base = np.where(valid, y, np.inf).min(axis=1) if baseline else np.zeros(n)
+    lvl = base + level * (peak - base)
+
+    below = valid & (y < lvl[:, None])
+    left_i = np.where(below & (col < peak_idx[:, None]), col, -1).max(axis=1)
+    right_i = np.where(below & (col > peak_idx[:, None]), col, m).min(axis=1)
+
+    # 左交点位于 left_i 与 left_i + 1 之间，右交点位于 right_i - 1 与 right_i 之间
+    i0 = np.clip(left_i, 0, m - 1)
+    i1 = np.minimum(i0 + 1, m - 1)
+    left = np.where(left_i >= 0,
+                    _interp_crossing(x[rows, i0], x[rows, i1], y[rows, i0], y[rows, i1], lvl),
+                    x[rows, first])
+    j1 = np.clip(right_i, 0, m - 1)
+    j0 = np.maximum(j1 - 1, 0)
+    right = np.where(right_i < m,
+                     _interp_crossing(x[rows, j0], x[rows, j1], y[rows, j0], y[rows, j1], lvl),
+                     x[rows, last])
+
+    result = {'peak_pos': x[rows, peak_idx], 'peak': peak, 'baseline': base,
+              'level': lvl, 'left': left, 'right': right, 'width': right - left}
+    bad = ~valid.any(axis=1) | ~(peak > base)
+    for key in result:
+        result[key] = np.where(bad, np.nan, result[key])
+    return result
+
+
+def window_profiles(x, profile, x_ranges):
+    """
+    将一条剖面按多个坐标区间截取，拼成以 NaN 补齐的二维数组，供 crossing_widths 使用。
+
+    参数:
+    - x: ndarray，一维坐标（单位：μm）
+    - profile: ndarray，一维剖面
+    - x_ranges: list of tuple(min, max)，闭区间
+
+    返回:
+    - coords, values: ndarray，形状 (n_ranges, 最长窗口的点数)
+    """
+    slices = [range_to_slice(x, r) for r in x_ranges]
+    width = max(s.stop - s.start for s in slices)
+    coords = np.full((len(slices), width), np.nan)
+    values = np.full((len(slices), width), np.nan)
+    for k, s in enumerate(slices):
+        coords[k, :s.stop - s.start] = x[s]
+        values[k, :s.stop - s.start] = profile[s]
+    return coords, values
+
+
+def _window_sums(arr, x, x_ranges):
+    """用沿 x 的累加和一次求出各 x 区间内的和，arr 的第 0 维为 x"""
+    cum = np.concatenate((np.zeros((1,) + arr.shape[1:]), np.cumsum(arr, axis=0)))
+    slices = [range_to_slice(x, r) for r in x_ranges]
+    starts = np.array([s.start for s in slices])
+    stops = np.array([s.stop for s in slices])
+    return cum[stops] - cum[starts]
+
+
+def _load_quantity(file_path, species, quantity, x_range, y_range, z_range=None, slices=None):
+    """读取 ne/nc 或 (ne/nc)*E 的子区域"""
+    if quantity not in QUANTITIES:
+        raise ValueError(f"不支持的物理量：{quantity}，可选值为 {list(QUANTITIES)}")
+    ne, axes = load_region(file_path, f"Derived_Number_Density_{species}",
+                           x_range, y_range, z_range, slices)
+    ne /= NC
+    if quantity == 'nE':
+        ne *= load_region(file_path, f"Derived_Average_Particle_Energy_{species}",
+                          x_range, y_range, z_range, slices)[0]
+    return ne, axes
+
+
+@traced(cat='analysis')
+def dump_pulse_widths(file_path, x_ranges, species='Photon', quantity='ne',
+                      y_range=(-2, 2), z_range=(-2, 2), sigma=1.0, level=HALF, baseline=True,
+                      transverse=True, transverse_sigma=17.0):
+    """
+    单个 density 输出中各 x 窗口的脉冲宽度（对应 05-半高宽.ipynb 与 07-1_e密度统计 中的分析）。
+
+    纵向：对 y_range × z_range 内求和得到沿 x 的剖面，高斯平滑后在每个窗口内求主峰位置与半高宽；
+    横向（transverse=True）：窗口内沿 x 求和后取 y 中心线上的 z 剖面，求 1/e 宽度 z_left / z_right，
+    并统计窗口内 y、z ∈ [z_left, z_right] 的总密度（total_density）。
+
+    参数:
+    - file_path: str，density SDF 文件路径
+    - x_ranges: list of tuple(min, max)，x 窗口（单位：μm）
+    - species: str，粒子种类
+    - quantity: 'ne'（ne/nc）或 'nE'（ne/nc 乘平均能量）
+    - y_range, z_range: tuple(min, max) 或 None，纵向剖面的求和范围（单位：μm）
+    - sigma: float，纵向剖面的高斯平滑宽度（格点数），0 或 None 为不平滑
+    - level, baseline: 纵向宽度的阈值比例与是否扣除基线，见 crossing_widths
+    - transverse: bool，是否计算横向 1/e 宽度
+    - transverse_sigma: float，横向剖面的高斯平滑宽度（格点数）
+
+    返回:
+    - rows: list of dict，每个窗口一行
+    """
+    x_ranges = [tuple(r) for r in x_ranges]
+    span = (min(r[0] for r in x_ranges), max(r[1] for r in x_ranges))
+
+    slab, (x, _, _) = _load_quantity(file_path, species, quantity, span, y_range, z_range)
+    profile = slab.sum(axis=(1, 2))
+    if sigma:
+        profile = gaussian_filter1d(profile, sigma)
+    coords, values = window_profiles(x, profile, x_ranges)
+    lon = crossing_widths(coords, values, level, baseline)
+
+    rows = [{'x_min': lo, 'x_max': hi,
+             'x_peak(um)': lon['peak_pos'][k], 'peak': lon['peak'][k], 'baseline': lon['baseline'][k],
+             'x_left(um)': lon['left'][k], 'x_right(um)': lon['right'][k], 'fwhm(um)': lon['width'][k]}
+            for k, (lo, hi) in enumerate(x_ranges)]
+    if not transverse:
+        return rows
+
+    # y 中心线上的 (x, z) 切片，与整体读取后取 ne_sum[len(y) // 2, :] 一致
+    name = f"Derived_Number_Density_{species}"
+    x_all, y_all, _ = grid_axes(file_path, name)
+    center = len(y_all) // 2
+    line, (x, _, z) = _load_quantity(file_path, species, quantity, None, None, slices=(
+        range_to_slice(x_all, span), slice(center, center + 1), None))
+    sums = _window_sums(line[:, 0, :], x, x_ranges)
+    if transverse_sigma:
+        sums = gaussian_filter1d(sums, transverse_sigma, axis=1)
+    tra = crossing_widths(z, sums, ONE_OVER_E, baseline=False)
+
+    for k, (lo, hi) in enumerate(x_ranges):
+        left, right = tra['left'][k], tra['right'][k]
+        total = np.nan
+        if np.isfinite(left):
+            box, _ = _load_quantity(file_path, species, quantity, (lo, hi), (left, right), (left, right))
+            total = float(box.sum())
+        rows[k].update({'1e_width(um)': tra['width'][k], 'z_left(um)': left,
+                        'z_right(um)': right, 'total_density': total})
+    return rows
+
+
+def _series_task(file_index, file_path, x_ranges, kwargs):
+    if not os.path.exists(file_path):
+        print(f"File {os.path.basename(file_path)} not found.")
+        return None
+    rows = dump_pulse_widths(file_path, x_ranges, **kwargs)
+    header = getattr(get_sdf(file_path), 'header', {})
+    for row in rows:
+        row.update({'file_index': file_index, 'step': header.get('step'), 'time': header.get('time')})
+    return rows
+
+
+@traced(cat='analysis')
+def pulse_widths(base_path, file_indices, x_ranges, species='Photon', quantity='ne',
+                 y_range=(-2, 2), z_range=(-2, 2), sigma=1.0, level=HALF, baseline=True,
+                 transverse=True, transverse_sigma=17.0,
+                 file_prefix='density', file_suffix='.sdf', n_workers=None, csv_path=None):
+    """
+    并行计算多个 density 输出、多个 x 窗口的脉冲宽度，一次得到原先逐窗口手工整理的结果表。
+
+    参数:
+    - base_path: str，数据目录
+    - file_indices: 可迭代的文件编号，文件名为 f"{prefix}{index:04d}{suffix}"
+    - x_ranges: list of tuple(min, max)，所有输出共用的 x 窗口；
+      或 dict，文件编号 -> 该输出的窗口列表
+    - species, quantity, y_range, z_range, sigma, level, baseline, transverse, transverse_sigma:
+      同 dump_pulse_widths
+    - n_workers: int 或 None，进程数，None 为 CPU 核数，1 为在当前进程串行
+    - csv_path: str 或 None，给出时将结果表写入 CSV
+
+    返回:
+    - table: pandas.DataFrame，每个 (输出, 窗口) 一行，按文件编号与 x_min 排序，列为
+      file_index、step、time、x_min、x_max、x_peak(um)、peak、baseline、x_left(um)、x_right(um)、fwhm(um)，
+      transverse=True 时另有 1e_width(um)、z_left(um)、z_right(um)、total_density
+    """
+    kwargs = dict(species=species, quantity=quantity, y_range=y_range, z_range=z_range, sigma=sigma,
+                  level=level, baseline=baseline, transverse=transverse, transverse_sigma=transverse_sigma)
+    tasks = []
+    for i in file_indices:
+        windows = x_ranges[i] if isinstance(x_ranges, dict) else x_ranges
+        tasks.append((i, os.path.join(base_path, f"{file_prefix}{i:04d}{file_suffix}"), windows))
+
+    if n_workers == 1:
+        results = [_series_task(i, p, w, kwargs) for i, p, w in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(_series_task, i, p, w, kwargs) for i, p, w in tasks]
+            results = [f.result() for f in as_completed(futures)]
+
+    columns = ['file_index', 'step', 'time', 'x_min', 'x_max', 'x_peak(um)', 'peak', 'baseline',
+               'x_left(um)', 'x_right(um)', 'fwhm(um)']
+    if transverse:
+        columns += ['1e_width(um)', 'z_left(um)', 'z_right(um)', 'total_density']
+    rows = [row for r in results if r is not None for row in r]
+    table = pd.DataFrame(rows, columns=columns)
+    table = table.sort_values(['file_index', 'x_min'], kind='stable').reset_index(drop=True)
+
+    if csv_path is not None:
+        table.to_csv(csv_path, index=False)
+        print(f"已保存脉宽表：{csv_path}")
+    return table
@@ -0,0 +1,153 @@
+import csv
+
+import numpy as np
+import pandas as pd
+
+from data_loading.sdf_cache import get_sdf
+from data_loading.region_data import NC, range_to_slice
+from data_loading.result_cache import cached_result
+from data_loading.instrument import traced
+
+
+class RadialBins:
+    """
+    y–z 平面上的环形分箱，只需建立一次，之后对任意多个 x 层、任意多个半径同时积分。
+
+    第 k 个环包含满足 radii[k-1] <= r < radii[k] 的格点（与 R2 < r**2 的圆形掩膜一致），
+    环内格点按环编号排序保存，积分时先取出这些格点，再用 reduceat 求各环之和并沿半径累加。
+
+    参数:
+    - y, z: ndarray，一维坐标轴（单位：μm）
+    - radii: 可迭代的半径（单位：μm）
+    - center: tuple，轴线在 y–z 平面上的位置（单位：μm）
+    """
+
+    def __init__(self, y, z, radii, center=(0.0, 0.0)):
+        self.radii = np.sort(np.atleast_1d(np.asarray(radii, dtype=np.float64)))
+        y = np.asarray(y) - center[0]
+        z = np.asarray(z) - center[1]
+        r2 = (y[:, None] ** 2 + z[None, :] ** 2).ravel()
+        ring = np.searchsorted(self.radii ** 2, r2, side='right')
+
+        inside = np.flatnonzero(ring < len(self.radii))
+        order = inside[np.argsort(ring[inside], kind='stable')]
+        self.yi, self.zi = np.unravel_index(order, (len(y), len(z)))
+        self.counts = np.bincount(ring[order], minlength=len(self.radii))
+        self.starts = np.concatenate(([0], np.cumsum(self.counts)[:-1]))
+
+    @traced(cat='reduce')
+    @cached_result
+    def integrate(self, arr, weight=None, chunk_x=64):
+        """
+        对每个 x 层求半径 radii 内的圆盘积分（格点求和）。
+
+        参数:
+        - arr: ndarray（或内存映射），三维数据 (x, y, z)
+        - weight: ndarray 或 None，与 arr 同形状，给出时积分 arr * weight（如 n * E）
+        - chunk_x: int，每次处理的 x 层数
+
+        返回:
+        - sums: ndarray，形状 (nx, n_radii)
+        """
+        nx = arr.shape[0]
+        sums = np.zeros((nx, len(self.radii)))
+        n_inside = len(self.yi)
+        if n_inside == 0:
+            return sums
+        # reduceat 只用于非空环：相邻的相同起点会返回该格点的值而不是 0
+        filled = self.counts > 0
+        starts = self.starts[filled]
+        rings = np.zeros((min(chunk_x, nx), len(self.radii)))
+        for i in range(0, nx, chunk_x):
+            # 只取出圆盘内的格点，内存占用为 chunk_x * n_inside
+            values = np.asarray(arr[i:i + chunk_x][:, self.yi, self.zi], dtype=np.float64)
+            if weight is not None:
+                values *= weight[i:i + chunk_x][:, self.yi, self.zi]
+            k = len(values)
+            rings[:k, filled] = np.add.reduceat(values, starts, axis=1)
+            np.cumsum(rings[:k], axis=1, out=sums[i:i + chunk_x])
+        return sums
+
+
+def range_peaks(x, profile, x_ranges):
+    """
+    在每个 x 区间内寻找剖面的峰值。
+
+    参数:
+    - x: ndarray，一维坐标（单位：μm）
+    - profile: ndarray，形状 (nx,) 或 (nx, n_radii)
+    - x_ranges: list of tuple(min, max)，闭区间
+
+    返回:
+    - x_peak: ndarray，形状 (n_ranges,) 或 (n_ranges, n_radii)，峰值位置
+    - peak: ndarray，同形状，峰值
+    """
+    x_peak, peak = [], []
+    for x_range in x_ranges:
+        s = range_to_slice(x, x_range)
+        idx = np.argmax(profile[s], axis=0)
+        x_peak.append(x[s][idx])
+        peak.append(np.take_along_axis(profile[s], np.expand_dims(idx, 0), axis=0)[0]
+                    if profile.ndim > 1 else profile[s][idx])
+    return np.array(x_peak), np.array(peak)
+
+
+@traced(cat='analysis')
+def beam_core_profile(file_path, species='Photon', radii=(0.5,), x_ranges=None,
+                      csv_path=None, center=(0.0, 0.0), chunk_x=64):
+    """
+    轴线附近圆盘内的光子数密度与能量密度积分（对应 0.5半径密度能量密度求和.py），
+    一次调用同时计算多个半径，并提取每个 x 区间内的峰值。
+
+    参数:
+    - file_path: str，density SDF 文件路径
+    - species: str，粒子种类
+    - radii: 可迭代的半径（单位：μm），积分区域为 r < radius
+    - x_ranges: list of tuple(min, max) 或 None，峰值统计的 x 区间（单位：μm）
+    - csv_path: str 或 None，给出时将峰值表写入 CSV；
+      单个半径时列为 x_min, x_max, x_peak_ne, ne_max, x_peak_nE, nE_max，多个半径时首列为 radius
+    - center: tuple，轴线在 y–z 平面上的位置（单位：μm）
+    - chunk_x: int，每次处理的 x 层数
+
+    返回:
+    - profiles: dict，包含 x、radii、ne（ne/nc 积分）与 nE（n*E 积分），后两者形状 (nx, n_radii)
+    - peaks: pandas.DataFrame 或 None，每个 (半径, x 区间) 一行
+    """
+    data = get_sdf(file_path)
+    x, y, z = (np.asarray(a) / 1e-6 for a in data.Grid_Grid_mid.data)
+    n = getattr(data, f'Derived_Number_Density_{species}').data
+    E = getattr(data, f'Derived_Average_Particle_Energy_{species}').data
+
+    bins = RadialBins(y, z, radii, center)
+    profiles = {
+        'x': x,
+        'radii': bins.radii,
+        'ne': bins.integrate(n, chunk_x=chunk_x) / NC,
+        'nE': bins.integrate(n, weight=E, chunk_x=chunk_x),
+    }
+    if x_ranges is None:
+        return profiles, None
+
+    x_peak_ne, ne_max = range_peaks(x, profiles['ne'], x_ranges)
+    x_peak_nE, nE_max = range_peaks(x, profiles['nE'], x_ranges)
+    rows = []
+    for k, radius in enumerate(bins.radii):
+        for j, (x_min, x_max) in enumerate(x_ranges):
+            rows.append({
+                'radius': radius, 'x_min': x_min, 'x_max': x_max,
+                'x_peak_ne': x_peak_ne[j, k], 'ne_max': ne_max[j, k],
+                'x_peak_nE': x_peak_nE[j, k], 'nE_max': nE_max[j, k],
+            })
+    peaks = pd.DataFrame(rows)
+
+    if csv_path is not None:
+        columns = ['x_min', 'x_max', 'x_peak_ne', 'ne_max', 'x_peak_nE', 'nE_max']
+        if len(bins.radii) > 1:
+            columns = ['radius'] + columns
+        with open(csv_path, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow([row[c] for c in columns])
+        print(f"已保存峰值表：{csv_path}")
+    return profiles, peaks
@@ -0,0 +1,150 @@
+import numpy as np
+
+from data_loading.sdf_cache import get_sdf
+from data_loading.region_data import range_to_slice
+from data_loading.instrument import traced
+
+
+class GridAxis:
+    """
+    一维网格坐标轴，负责坐标（μm）到索引的转换。
+
+    均匀网格（EPOCH 默认）按 x0 + i * dx 直接计算索引，为 O(1)；
+    非均匀网格退回 searchsorted。范围为闭区间，与 (x >= min) & (x <= max) 选中的元素一致。
+
+    参数:
+    - values: ndarray，一维单调递增坐标（单位：μm）
+    - rtol: float，判断网格均匀的相对容差
+    """
+
+    def __init__(self, values, rtol=1e-6):
+        self.values = np.asarray(values)
+        self.n = len(self.values)
+        diff = np.diff(self.values)
+        self.uniform = self.n > 1 and np.allclose(diff, diff[0], rtol=rtol, atol=0)
+        self.x0 = self.values[0] if self.n else 0.0
+        self.dx = diff[0] if self.n > 1 else 0.0
+
+    def __len__(self):
+        return self.n
+
+    def __repr__(self):
+        kind = f"uniform dx={self.dx:.4g}" if self.uniform else "non-uniform"
+        return f"<GridAxis n={self.n} [{self.x0:.4g}, {self.values[-1]:.4g}] {kind}>"
+
+    def _first_ge(self, value):
+        """第一个 >= value 的索引"""
+        i = int(np.clip(np.ceil((value - self.x0) / self.dx), 0, self.n))
+        # 浮点舍入最多造成一个格点的偏差，在真实坐标上校正
+        while i > 0 and self.values[i - 1] >= value:
+            i -= 1
+        while i < self.n and self.values[i] < value:
+            i += 1
+        return i
+
+    def _first_gt(self, value):
+        """第一个 > value 的索引"""
+        i = int(np.clip(np.floor((value - self.x0) / self.dx) + 1, 0, self.n))
+        while i > 0 and self.values[i - 1] > value:
+            i -= 1
+        while i < self.n and self.values[i] <= value:
+            i += 1
+        return i
+
+    def index_range(self, value_range):
+        """
+        坐标范围转换为索引切片。
+
+        参数:
+        - value_range: tuple(min, max)、slice 或 None（全范围）
+
+        返回:
+        - slice
+        """
+        if not self.uniform or value_range is None or isinstance(value_range, slice):
+            return range_to_slice(self.values, value_range)
+        start, stop = self._first_ge(value_range[0]), self._first_gt(value_range[1])
+        if stop <= start:
+            raise ValueError(f"范围 {tuple(value_range)} 内无数据")
+        return slice(start, stop)
+
+    def nearest(self, value):
+        """与 value 最近的格点索引"""
+        if self.uniform:
+            i = int(np.clip(np.rint((value - self.x0) / self.dx), 0, self.n - 1))
+        else:
+            i = int(np.clip(np.searchsorted(self.values, value), 0, self.n - 1))
+        # 在相邻格点中取最近者，距离相同时取较小索引（与 argmin 一致）
+        lo = max(i - 1, 0)
+        return lo + int(np.abs(self.values[lo:i + 2] - value).argmin())
+
+
+class RegionSelector:
+    """
+    同一网格上反复选取子区域的选择器：坐标范围转换为切片，返回零拷贝视图。
+
+    utils_3d 中的绘图与统计函数都接受 selector= 参数，传入后不再逐次构造布尔掩码。
+
+    用法:
+        sel = RegionSelector.from_sdf(file_path)
+        sub = sel.view(ne, x_range=(10, 20), y_range=(-2, 2))
+        x_sub, y_sub, z_sub = sel.coords(x_range=(10, 20), y_range=(-2, 2))
+
+    参数:
+    - x, y: ndarray，一维坐标轴（单位：μm）
+    - z: ndarray 或 None，z 坐标轴，二维网格可不传
+    """
+
+    def __init__(self, x, y, z=None):
+        self.axes = tuple(GridAxis(a) for a in (x, y, z) if a is not None)
+        self._cache = {}
+
+    @classmethod
+    def from_sdf(cls, file_path):
+        """由 SDF 文件中的 Grid_Grid_mid 建立选择器（坐标单位换算为 μm）"""
+        return cls(*[np.asarray(a) / 1e-6 for a in get_sdf(file_path).Grid_Grid_mid.data])
+
+    @property
+    def x(self):
+        return self.axes[0]
+
+    @property
+    def y(self):
+        return self.axes[1]
+
+    @property
+    def z(self):
+        return self.axes[2] if len(self.axes) > 2 else None
+
+    @property
+    def ndim(self):
+        return len(self.axes)
+
+    @traced(cat='select', name='RegionSelector.slices')
+    def slices(self, x_range=None, y_range=None, z_range=None):
+        """
+        坐标范围转换为索引切片，相同范围的结果会被缓存。
+
+        返回:
+        - tuple of slice，长度等于网格维度
+        """
+        ranges = (x_range, y_range, z_range)[:self.ndim]
+        key = tuple(None if r is None else (r.start, r.stop, r.step) if isinstance(r, slice) else tuple(r)
+                    for r in ranges)
+        if key not in self._cache:
+            self._cache[key] = tuple(a.index_range(r) for a, r in zip(self.axes, ranges))
+        return self._cache[key]
+
+    def view(self, arr, x_range=None, y_range=None, z_range=None):
+        """返回 arr 在指定范围内的视图（不复制数据）"""
+        return arr[self.slices(x_range, y_range, z_range)[:arr.ndim]]
+
+    def coords(self, x_range=None, y_range=None, z_range=None):
+        """返回指定范围内的坐标轴视图 (x, y[, z])"""
+        return tuple(a.values[s] for a, s in zip(self.axes, self.slices(x_range, y_range, z_range)))
+
+    def nearest(self, axis, value):
+        """指定轴（0/1/2 或 'x'/'y'/'z'）上与 value 最近的格点索引"""
+        if isinstance(axis, str):
+            axis = 'xyz'.index(axis)
+        return self.axes[axis].nearest(value)
@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+
+from .region_selector import RegionSelector
+from data_loading.sdf_cache import get_sdf
+from data_loading.result_cache import cached_result
+from data_loading.instrument import traced
+
+def _chunk_moments(block, w=None):
+    """单个数据块的矩：(n, mean, M2, min, max[, W, wmean, wM2])"""
+    block = np.asarray(block, dtype=np.float64)
+    mean = block.mean()
+    moments = [block.size, mean, np.square(block - mean).sum(), block.min(), block.max()]
+    if w is not None:
+        w = np.asarray(w, dtype=np.float64)
+        W = w.sum()
+        wmean = (w * block).sum() / W if W != 0 else 0.0
+        moments += [W, wmean, (w * np.square(block - wmean)).sum()]
+    return moments
+
+
+def _merge_pair(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    """Chan 等人的并行合并公式，合并两组 (计数或权重和, 均值, 二阶中心矩和)"""
+    n = n_a + n_b
+    if n == 0:
+        return n, 0.0, 0.0
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n
+
+
+def _merge(a, b):
+    if a is None:
+        return b
+    merged = list(_merge_pair(a[0], a[1], a[2], b[0], b[1], b[2]))
+    merged += [min(a[3], b[3]), max(a[4], b[4])]
+    if len(a) > 5:
+        merged += list(_merge_pair(a[5], a[6], a[7], b[5], b[6], b[7]))
+    return merged
+
+
+@traced(cat='reduce')
+@cached_result
+def region_moments(arr, slices, weights=None, chunk_x=32):
+    """
+    单次遍历计算一个子区域的统计量，不构造掩码、不复制整个子区域。
+
+    子区域以切片视图表示，沿第 0 维（x）每次只取 chunk_x 层，
+    各块的均值与二阶矩用数值稳定的 Chan 合并公式累加。
+    开启 result_cache 时结果按输入文件与参数缓存到磁盘（见 data_loading.result_cache）。
+
+    参数:
+    - arr: ndarray（或内存映射），二维或三维数据
+    - slices: tuple of slice，子区域索引
+    - weights: ndarray 或 None，与 arr 同形状的权重（如数密度），给出时额外计算加权均值与方差
+    - chunk_x: int，每块的 x 层数
+
+    返回:
+    - stats: dict，包含 count、mean、variance、std、min、max（及加权统计量）
+    """
+    view = arr[slices]
+    wview = weights[slices] if weights is not None else None
+    if view.size == 0:
+        raise ValueError("筛选后无匹配数据。")
+
+    acc = None
+    for i in range(0, view.shape[0], chunk_x):
+        w = wview[i:i + chunk_x] if wview is not None else None
+        acc = _merge(acc, _chunk_moments(view[i:i + chunk_x], w))
+
+    stats = {
+        'count': int(acc[0]),
+        'mean': acc[1],
+        'variance': acc[2] / acc[0],
+        'std': np.sqrt(acc[2] / acc[0]),
+        'min': acc[3],
+        'max': acc[4],
+    }
+    if weights is not None:
+        stats['weight_sum'] = acc[5]
+        stats['weighted_mean'] = acc[6]
+        stats['weighted_variance'] = acc[7] / acc[5] if acc[5] != 0 else 0.0
+    return stats
+
+
+@traced(cat='reduce')
+@cached_result
+def sdf_region_moments(file_path, name, slices, weight_name=None, chunk_x=32):
+    """
+    同 region_moments，但数据与权重直接取自 SDF 文件中的变量（lazy 后端下只读取子区域）。
+
+    结果按文件标识、变量名与切片缓存，不需要对内存中的大数组（如 load_ne 的结果）计算内容哈希。
+
+    参数:
+    - file_path: str，SDF 文件路径
+    - name: str，变量名，如 'Derived_Average_Particle_Energy_Photon'
+    - slices: tuple of slice，子区域索引
+    - weight_name: str 或 None，权重变量名，如 'Derived_Number_Density_Photon'（权重为文件中的原始值）
+    - chunk_x: int，每块的 x 层数
+
+    返回:
+    - stats: dict，同 region_moments
+    """
+    data = get_sdf(file_path)
+    weights = getattr(data, weight_name).data if weight_name is not None else None
+    return region_moments.uncached(getattr(data, name).data, slices, weights, chunk_x)
+
+
+def _iter_regions(regions):
+    if isinstance(regions, dict):
+        regions = [dict(r, name=name) for name, r in regions.items()]
+    for n, r in enumerate(regions):
+        if not isinstance(r, dict):
+            r = dict(zip(('x_range', 'y_range', 'z_range'), r))
+        yield r.get('name', n), r
+
+
+@traced(cat='analysis')
+def region_stats(data, x, y, z=None, regions=None, weights=None, chunk_x=32, selector=None, file_path=None):
+    """
+    一次调用计算多个区域内数据（如平均能量 ek）的统计量，结果以表格返回。
+
+    坐标范围先转换为连续的索引切片（闭区间，与 (x >= min) & (x <= max) 一致），
+    每个区域只遍历一次数据，内存占用与 chunk_x 层的大小成正比。
+
+    参数:
+    - data: ndarray，二维或三维数据，形状 (len(x), len(y)[, len(z)])
+    - x, y: ndarray，一维单调递增坐标轴（单位：μm）
+    - z: ndarray 或 None，z 坐标轴（单位：μm），二维数据可不传
+    - regions: 区域列表，每项为 dict(name=..., x_range=..., y_range=..., z_range=...)
+      或 (x_range, y_range[, z_range]) 元组；也可为 {name: dict(x_range=...)}；None 为全范围
+    - weights: ndarray 或 None，与 data 同形状的权重，用于加权均值与方差
+    - chunk_x: int，每块的 x 层数
+    - selector: RegionSelector 或 None，同一网格反复统计时传入，此时 x、y、z 可为 None
+    - file_path: str 或 None，给出时 data 与 weights 为该 SDF 文件中的变量名，
+      统计量按文件缓存（见 sdf_region_moments），x、y、z 可为 None
+
+    返回:
+    - table: pandas.DataFrame，每个区域一行，列为区域名、实际坐标范围与统计量
+    """
+    names = None
+    if file_path is not None:
+        sdf = get_sdf(file_path)
+        names = (data, weights)
+        data = getattr(sdf, data).data
+        weights = getattr(sdf, weights).data if weights is not None else None
+        if selector is None and x is None:
+            selector = RegionSelector.from_sdf(file_path)
+    if data.ndim == 3 and z is None and (selector is None or selector.z is None):
+        raise ValueError("三维数据时必须传入 z 坐标数组")
+    if data.ndim not in (2, 3):
+        raise ValueError("数据维度应为2或3维")
+    if weights is not None and weights.shape != data.shape:
+        raise ValueError(f"weights 形状 {weights.shape} 与数据形状 {data.shape} 不一致")
+
+    if selector is None:
+        selector = RegionSelector(x, y, z)
+    rows = []
+    for name, r in _iter_regions(regions if regions is not None else [{}]):
+        slices = selector.slices(r.get('x_range'), r.get('y_range'), r.get('z_range'))[:data.ndim]
+        row = {'region': name}
+        for label, a, s in zip('xyz', selector.axes, slices):
+            row[f'{label}_min'] = a.values[s.start]
+            row[f'{label}_max'] = a.values[s.stop - 1]
+        if names is not None:
+            row.update(sdf_region_moments(file_path, names[0], slices, names[1], chunk_x))
+        else:
+            row.update(region_moments(data, slices, weights, chunk_x))
+        rows.append(row)
+    return pd.DataFrame(rows)
@@ -0,0 +1,101 @@
+import numpy as np
+import matplotlib as mpl
+from data_loading.instrument import traced
+
+OVERSAMPLE = 2  # 每个输出像素最多保留的数据点数，降采样后仍略高于显示分辨率
+POOL_MODES = ('max', 'mean', 'absmax')
+
+
+def norm_limits(data):
+    """数据的颜色范围 (nanmin, nanmax)"""
+    return float(np.nanmin(data)), float(np.nanmax(data))
+
+
+def _pool_axis(data, factor, axis, mode):
+    starts = np.arange(0, data.shape[axis], factor)
+    if mode == 'max':
+        return np.maximum.reduceat(data, starts, axis=axis)
+    if mode == 'mean':
+        counts = np.diff(np.append(starts, data.shape[axis]))
+        shape = [1] * data.ndim
+        shape[axis] = len(starts)
+        return np.add.reduceat(data, starts, axis=axis) / counts.reshape(shape)
+    # absmax：保留绝对值最大的值及其符号，适用于正负交替的场
+    hi = np.maximum.reduceat(data, starts, axis=axis)
+    lo = np.minimum.reduceat(data, starts, axis=axis)
+    return np.where(np.abs(lo) > np.abs(hi), lo, hi)
+
+
+@traced(cat='reduce')
+def pool_to_shape(data, target, mode='max'):
+    """
+    将二维数据按整数倍分块降采样，使每个方向的点数不超过 target 的对应值。
+
+    参数:
+    - data: ndarray，二维数据
+    - target: tuple(int, int)，每个方向的目标点数
+    - mode: 'max'（保留峰值，适用于密度）、'mean' 或 'absmax'（保留正负峰值，适用于场）
+
+    返回:
+    - pooled: ndarray，降采样后的数据
+    - factors: tuple(int, int)，每个方向的分块大小
+    """
+    if mode not in POOL_MODES:
+        raise ValueError(f"不支持的降采样方式：{mode}，可选值为 {list(POOL_MODES)}")
+    factors = tuple(max(n // max(t, 1), 1) for n, t in zip(data.shape, target))
+    pooled = data
+    for axis, f in enumerate(factors):
+        if f > 1:
+            pooled = _pool_axis(np.asarray(pooled, dtype=np.float64), f, axis, mode)
+    return pooled, factors
+
+
+def axes_pixels(ax):
+    """坐标轴区域在屏幕（或保存图片）上的像素数 (宽, 高)"""
+    bbox = ax.get_window_extent()
+    dpi = ax.figure.dpi
+    save_dpi = mpl.rcParams['savefig.dpi']
+    scale = max(1.0, save_dpi / dpi) if isinstance(save_dpi, (int, float)) else 1.0
+    return max(int(bbox.width * scale), 1), max(int(bbox.height * scale), 1)
+
+
+def _pool_coord(values, factor):
+    if factor == 1:
+        return values
+    starts = np.arange(0, len(values), factor)
+    counts = np.diff(np.append(starts, len(values)))
+    return np.add.reduceat(values, starts) / counts
+
+
+@traced(cat='render')
+def render_2d(ax, data, u, v, cmap, pool='max', uniform=True):
+    """
+    绘制二维数据（第 0 维为横轴 u，第 1 维为纵轴 v），代替 meshgrid + pcolormesh。
+
+    数据先降采样到坐标轴的像素分辨率；均匀网格用带 extent 的 imshow 绘制，
+    每个格点居中显示，与 pcolormesh(shading='auto') 的位置一致；非均匀网格退回 pcolormesh。
+    颜色范围取自未降采样的数据（见 norm_limits），与原先的图一致。
+
+    参数:
+    - ax: matplotlib.axes.Axes
+    - data: ndarray，形状 (len(u), len(v))
+    - u, v: ndarray，一维坐标
+    - cmap: str，颜色映射
+    - pool: 'max'、'mean' 或 'absmax'，见 pool_to_shape
+    - uniform: bool，u、v 是否为均匀网格
+
+    返回:
+    - mappable，可传给 colorbar
+    """
+    vmin, vmax = norm_limits(data)
+    w, h = axes_pixels(ax)
+    pooled, (fu, fv) = pool_to_shape(data, (w * OVERSAMPLE, h * OVERSAMPLE), pool)
+
+    if uniform and len(u) > 1 and len(v) > 1:
+        du, dv = u[1] - u[0], v[1] - v[0]
+        extent = (u[0] - du / 2, u[-1] + du / 2, v[0] - dv / 2, v[-1] + dv / 2)
+        return ax.imshow(pooled.T, origin='lower', extent=extent, aspect='auto',
+                         interpolation='nearest', cmap=cmap, vmin=vmin, vmax=vmax)
+
+    U, V = np.meshgrid(_pool_coord(u, fu), _pool_coord(v, fv), indexing='ij')
+    return ax.pcolormesh(U, V, pooled, shading='auto', cmap=cmap, vmin=vmin, vmax=vmax, rasterized=True)